@@ -0,0 +1,84 @@
+"""
+Measures the Markdown to Atlassian Document Format conversion on growing issue bodies.
+
+Time per KB and peak memory per KB of input should stay flat as bodies grow.
+Run it with `poetry run python -m benchmarks.bench_adf`.
+"""
+import time
+import timeit
+import tracemalloc
+
+from gitssues.adf import markdown_to_adf
+
+
+SECTION = """## Steps to reproduce
+
+1. Run `gitssues prepare` with **an empty** cache
+2. Open an issue with a [link](https://github.com/lecovi/gitssues) and snake_case_names
+- it *fails* with ~~an error~~ a traceback
+
+```python
+Traceback (most recent call last):
+  File "gitssues/server.py", line 42, in github
+    raise JiraException(msg)
+```
+
+| step | status |
+|------|--------|
+| post | 201 |
+| move | 204 |
+
+> Happens on every *redelivery* too.
+
+![screenshot](https://user-images.githubusercontent.com/1/screenshot.png)
+
+"""
+
+SIZES_KB = (64, 128, 256, 512, 1024)
+
+
+def body_of(size_kb):
+    return (SECTION * (size_kb * 1024 // len(SECTION) + 1))[: size_kb * 1024]
+
+
+def run():
+    results = []
+    for size_kb in SIZES_KB:
+        body = body_of(size_kb)
+
+        seconds = min(
+            timeit.repeat(lambda: markdown_to_adf(body, use_cache=False), number=1, repeat=3)
+        )
+
+        tracemalloc.start()
+        doc = markdown_to_adf(body, use_cache=False)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del doc
+
+        start = time.perf_counter()
+        markdown_to_adf(body)
+        markdown_to_adf(body)
+        cached = time.perf_counter() - start
+
+        results.append(
+            {
+                "size_kb": size_kb,
+                "seconds": seconds,
+                "ms_per_kb": seconds * 1000 / size_kb,
+                "peak_kb_per_kb": peak / 1024 / size_kb,
+                "cached_seconds": cached,
+            }
+        )
+
+    for result in results:
+        print(
+            f"{result['size_kb']:>5} KB: {result['seconds'] * 1000:8.1f} ms "
+            f"({result['ms_per_kb']:.3f} ms/KB, peak {result['peak_kb_per_kb']:.1f} KB/KB), "
+            f"first + cached call {result['cached_seconds'] * 1000:.1f} ms"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    run()
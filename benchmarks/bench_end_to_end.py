@@ -0,0 +1,250 @@
+"""
+Measures gitssues end to end against the local stand-in of Jira, GitHub and OpsGenie.
+
+- new_issue: latency of Jira.new_issue on a prepared project.
+- webhook: throughput of signed /github deliveries until their work is done, and latency
+  percentiles of their responses. Issue creations are answered once the issue is created,
+  comments once they are buffered for the coalescer.
+- cli: cold start time and peak memory of `python -m gitssues.cli --help`.
+
+Results are written as JSON, to compare versions:
+
+    poetry run python -m benchmarks.bench_end_to_end --output before.json
+"""
+import argparse
+import hmac
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from benchmarks.stub_server import StubServer, github_issue
+from gitssues import __version__
+
+
+ROOT = Path(__file__).resolve().parent.parent
+WEBHOOK_SECRET = "benchmark"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def summary(latencies):
+    return {
+        "count": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+@contextmanager
+def without_errors(stub):
+    """
+    Runs the setup of a benchmark without injected errors.
+    """
+    error_rate, stub.error_rate = stub.error_rate, 0.0
+    try:
+        yield
+    finally:
+        stub.error_rate = error_rate
+
+
+def bench_new_issue(stub, issues):
+    from gitssues.jira import Jira
+    from gitssues.jira.exc import JiraException
+
+    jira = Jira()
+    with without_errors(stub):
+        jira.prepare_jira()
+
+    requests_before = sum(stub.requests.values())
+    latencies = []
+    errors = 0
+    for number in range(issues):
+        start = time.perf_counter()
+        try:
+            jira.new_issue(title=f"Issue {number}", content="Something **broke**")
+        except JiraException:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    result = summary(latencies)
+    result["requests_per_issue"] = (sum(stub.requests.values()) - requests_before) / issues
+    result["error_rate"] = errors / issues
+    return result
+
+
+def delivery(event, payload):
+    data = json.dumps(payload).encode()
+    signature = hmac.new(WEBHOOK_SECRET.encode(), msg=data, digestmod="sha1").hexdigest()
+    headers = {
+        "X-GitHub-Event": event,
+        "X-GitHub-Delivery": str(uuid.uuid4()),
+        "X-Hub-Signature": f"sha1={signature}",
+        "Content-Type": "application/json",
+    }
+    return data, headers
+
+
+def bench_webhook(stub, deliveries, concurrency):
+    # Reads its settings and configuration at import
+    from gitssues import server
+
+    repository = {"full_name": "lecovi/gitssues"}
+    payloads = []
+    for number in range(1, deliveries + 1):
+        issue = github_issue(number)
+        if number % 2:
+            payloads.append(("issues", {"action": "opened", "issue": issue, "repository": repository}))
+        else:
+            comment = {"user": {"login": "octocat"}, "body": "Me too", "html_url": issue["html_url"]}
+            payloads.append(
+                (
+                    "issue_comment",
+                    {"action": "created", "issue": issue, "comment": comment, "repository": repository},
+                )
+            )
+
+    latencies = []
+    latencies_by_event = {"issues": [], "issue_comment": []}
+    errors = []
+    lock = threading.Lock()
+
+    def worker(share):
+        client = server.app.test_client()
+        for event, payload in share:
+            data, headers = delivery(event, payload)
+            start = time.perf_counter()
+            response = client.post("/github", data=data, headers=headers)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                latencies_by_event[event].append(elapsed)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+    # Prepares the project outside of the measure, like the warm snapshot does in production
+    with without_errors(stub):
+        server.contexts.get(server.router.default_project_key)
+
+    threads = [
+        threading.Thread(target=worker, args=(payloads[i::concurrency],))
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Buffered comments are sent to Jira in the background, the work is done once drained
+    server.coalescer.flush_all()
+    server.scheduler.drain()
+    elapsed = time.perf_counter() - start
+
+    result = summary(latencies)
+    # Creations are answered once done, comments once buffered, so they are far apart
+    result["opened"] = summary(latencies_by_event["issues"])
+    result["commented"] = summary(latencies_by_event["issue_comment"])
+    result["concurrency"] = concurrency
+    result["throughput_per_second"] = len(latencies) / elapsed
+    result["error_rate"] = len(errors) / len(latencies)
+    return result
+
+
+def bench_cli(runs, cwd):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "gitssues.cli", "--help"],
+            cwd=cwd,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        durations.append(time.perf_counter() - start)
+
+    result = summary(durations)
+    # Peak resident memory of the largest child, in KB on Linux
+    result["max_rss_kb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return result
+
+
+def run(args):
+    results = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "stub": {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate},
+    }
+
+    with tempfile.TemporaryDirectory() as directory, StubServer(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=0
+    ) as stub:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        os.environ.update(
+            GITHUB_WEBHOOK_SECRET=WEBHOOK_SECRET,
+            GITSSUES_SNAPSHOT_DIR=directory,
+            GITSSUES_JOURNAL_DIR=os.path.join(directory, "journals"),
+        )
+        try:
+            stub.write_config("gitssues.yml")
+            results["new_issue"] = bench_new_issue(stub, args.issues)
+            results["webhook"] = bench_webhook(stub, args.deliveries, args.concurrency)
+            results["cli"] = bench_cli(args.cli_runs, directory)
+        finally:
+            os.chdir(cwd)
+
+    lines = [
+        ("new_issue", results["new_issue"]),
+        ("webhook", results["webhook"]),
+        ("opened", results["webhook"]["opened"]),
+        ("commented", results["webhook"]["commented"]),
+        ("cli", results["cli"]),
+    ]
+    for name, result in lines:
+        print(
+            f"{name:>9}: p50 {result['p50_ms']:8.1f} ms, p99 {result['p99_ms']:8.1f} ms "
+            f"over {result['count']} runs"
+        )
+    print(
+        f"  webhook: {results['webhook']['throughput_per_second']:.1f} deliveries/s, "
+        f"{results['webhook']['error_rate']:.1%} errors"
+    )
+    print(f"      cli: peak {results['cli']['max_rss_kb'] / 1024:.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.005, help="Stub jitter in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of failed stub responses.")
+    parser.add_argument("--issues", type=int, default=50, help="new_issue calls.")
+    parser.add_argument("--deliveries", type=int, default=200, help="Webhook deliveries.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent webhook clients.")
+    parser.add_argument("--cli-runs", type=int, default=5, help="CLI cold starts.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,86 @@
+"""
+Compares the slotted Jira models against the previous dict-dumping dataclasses.
+
+Run it with `poetry run python -m benchmarks.bench_models`.
+"""
+import pickle
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+
+from gitssues.jira.jira import IssueType
+
+
+# Trimmed down issue type from /issue/createmeta
+ISSUE_TYPE_DATA = {
+    "self": "https://example.atlassian.net/rest/api/3/issuetype/10004",
+    "id": "10004",
+    "description": "A problem which impairs or prevents the functions of the product.",
+    "iconUrl": "https://example.atlassian.net/secure/viewavatar?size=medium&avatarId=10303",
+    "name": "Bug",
+    "untranslatedName": "Bug",
+    "subtask": False,
+    "hierarchyLevel": 0,
+    "expand": "fields",
+    "fields": {
+        name: {"required": False, "schema": {"type": "string", "system": name}, "name": name}
+        for name in ("summary", "description", "labels", "priority", "assignee", "reporter")
+    },
+}
+
+
+@dataclass
+class LegacyIssueType:
+    name: str = None
+
+    def update_from_dict(self, data):
+        for key, value in data.items():
+            setattr(self, key, value)
+
+
+def _legacy_from(data):
+    issue_type = LegacyIssueType()
+    issue_type.update_from_dict(data)
+    return issue_type
+
+
+def memory_per_object(factory, count=10000):
+    """
+    Bytes still allocated per object once the API responses are released.
+    """
+    tracemalloc.start()
+    # Every API call returns a fresh response
+    responses = [pickle.loads(pickle.dumps(ISSUE_TYPE_DATA)) for _ in range(count)]
+    objects = [factory(data) for data in responses]
+    del responses
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return retained / count
+
+
+def run():
+    results = {}
+    for name, from_data in (
+        ("legacy", _legacy_from),
+        ("slotted", IssueType.from_dict),
+    ):
+        build = lambda: from_data(ISSUE_TYPE_DATA)  # noqa: E731
+        seconds = min(timeit.repeat(build, number=10000, repeat=5)) / 10000
+        results[name] = {
+            "construct_us": seconds * 1e6,
+            "bytes_per_object": memory_per_object(from_data),
+            "pickle_bytes": len(pickle.dumps(build())),
+        }
+
+    for name, result in results.items():
+        print(
+            f"{name:>8}: {result['construct_us']:.2f} us/object, "
+            f"{result['bytes_per_object']:.0f} B/object retained, "
+            f"{result['pickle_bytes']} B pickled"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,248 @@
+"""
+An in-process stand-in for the Jira REST and Agile, GitHub and OpsGenie endpoints used by gitssues.
+
+Every response waits latency seconds, give or take jitter, and a share of error_rate of
+them fails with 503, so benchmarks run offline with realistic upstream timings:
+
+    with StubServer(latency=0.05, jitter=0.01) as stub:
+        stub.write_config("gitssues.yml")
+        ...
+
+Jira lives under /jira/rest, GitHub under /github and OpsGenie under /opsgenie/v2.
+"""
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import yaml
+
+
+PROJECT_KEY = "BENCH"
+ISSUE_TYPE = "Bug"
+USERS = [{"accountId": f"account-{i}", "emailAddress": f"user{i}@example.com"} for i in range(5)]
+
+_JIRA = "/jira/rest"
+_GITHUB = "/github"
+_OPSGENIE = "/opsgenie/v2"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, payload, headers = self.server.stub.respond(self.command, self.path, body)
+
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, github_issues=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.github_issues = github_issues
+        self.requests = Counter()
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+        self._routes = [
+            ("GET", _JIRA + r"/agile/[^/]+/board", "board", self._board),
+            ("GET", _JIRA + r"/agile/[^/]+/board/\d+/project", "board_project", self._project),
+            ("GET", _JIRA + r"/agile/[^/]+/board/\d+/sprint", "board_sprint", self._sprint),
+            ("POST", _JIRA + r"/agile/[^/]+/sprint/\d+/issue", "sprint_issue", self._no_content),
+            ("GET", _JIRA + r"/api/[^/]+/issue/createmeta", "createmeta", self._createmeta),
+            ("POST", _JIRA + r"/api/[^/]+/issue", "issue_create", self._issue_create),
+            ("GET", _JIRA + r"/api/[^/]+/search", "search", self._search),
+            ("GET", _JIRA + r"/api/[^/]+/user/assignable/search", "user_assignable", self._users),
+            ("GET", _JIRA + r"/api/[^/]+/user/search", "user_search", self._users),
+            ("PUT", _JIRA + r"/api/[^/]+/issue/[^/]+/assignee", "issue_assignee", self._no_content),
+            ("POST", _JIRA + r"/api/[^/]+/issue/[^/]+/comment", "issue_comment", self._comment),
+            ("POST", _JIRA + r"/api/[^/]+/issue/[^/]+/attachments", "issue_attachments", self._attachments),
+            ("GET", _JIRA + r"/api/[^/]+/issue/[^/]+/transitions", "issue_transitions", self._transitions),
+            ("POST", _JIRA + r"/api/[^/]+/issue/[^/]+/transitions", "issue_transition", self._no_content),
+            ("GET", _JIRA + r"/api/[^/]+/issue/([^/]+)", "issue", self._issue),
+            ("PUT", _JIRA + r"/api/[^/]+/issue/[^/]+", "issue_update", self._no_content),
+            ("DELETE", _JIRA + r"/api/[^/]+/issue/[^/]+", "issue_delete", self._no_content),
+            ("GET", _GITHUB + r"/repos/[^/]+/[^/]+/issues", "repo_issues", self._github_issues),
+            ("POST", _GITHUB + r"/repos/[^/]+/[^/]+/issues", "repo_issue_create", self._github_issue),
+            ("POST", _GITHUB + r"/repos/[^/]+/[^/]+/issues/\d+/comments", "github_comment", self._github_comment),
+            ("PATCH", _GITHUB + r"/repos/[^/]+/[^/]+/issues/\d+", "github_issue_update", self._github_issue_update),
+            ("GET", _OPSGENIE + r"/schedules/[^/]+/on-calls", "on_calls", self._on_calls),
+        ]
+        self._routes = [
+            (method, re.compile(pattern + "$"), name, handler)
+            for method, pattern, name, handler in self._routes
+        ]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self, host="127.0.0.1", port=0):
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="stub-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def config(self):
+        """
+        Returns a gitssues.yml configuration pointing to the stub.
+        """
+        return {
+            "project_key": PROJECT_KEY,
+            "default_issue_type": ISSUE_TYPE,
+            "labels": ["benchmark"],
+            "JIRA_BASE_URL": self.base_url + _JIRA,
+            "JIRA_SCD_API_VERSION": "1.0",
+            "JIRA_CPD_API_VERSION": 3,
+            "GITHUB_BASE_URL": self.base_url + _GITHUB,
+            "OPSGENIE_BASE_URL": self.base_url + _OPSGENIE,
+        }
+
+    def write_config(self, path):
+        with open(path, "w") as f:
+            yaml.safe_dump(self.config(), f)
+
+    def respond(self, method, path, body):
+        """
+        Returns the status, JSON payload and headers for a request.
+        """
+        url = urlparse(path)
+        query = parse_qs(url.query)
+        for route_method, pattern, name, handler in self._routes:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                break
+        else:
+            return HTTPStatus.NOT_FOUND, {"errorMessages": [f"No stub for {method} {url.path}"]}, {}
+
+        with self._lock:
+            self.requests[name] += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+
+        if failed:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"errorMessages": ["Injected error"]}, {}
+        return handler(match=match, query=query, body=body)
+
+    def _no_content(self, **request):
+        return HTTPStatus.NO_CONTENT, None, {}
+
+    def _board(self, **request):
+        return HTTPStatus.OK, {"values": [{"id": 1, "name": f"{PROJECT_KEY} board"}]}, {}
+
+    def _project(self, **request):
+        project = {"id": "10000", "key": PROJECT_KEY, "name": "Benchmark"}
+        return HTTPStatus.OK, {"values": [project]}, {}
+
+    def _sprint(self, **request):
+        return HTTPStatus.OK, {"values": [{"id": 7, "name": "Sprint 7", "state": "active"}]}, {}
+
+    def _createmeta(self, **request):
+        issue_type = {"id": "10001", "name": ISSUE_TYPE}
+        return HTTPStatus.OK, {"projects": [{"key": PROJECT_KEY, "issuetypes": [issue_type]}]}, {}
+
+    def _issue_create(self, **request):
+        issue_id = next(self._ids)
+        return HTTPStatus.CREATED, {"id": str(issue_id), "key": f"{PROJECT_KEY}-{issue_id}"}, {}
+
+    def _issue(self, match, **request):
+        issue_key = match.group(1)
+        return HTTPStatus.OK, {"id": "1", "key": issue_key, "fields": {"summary": issue_key}}, {}
+
+    def _search(self, query, **request):
+        start_at = int(query.get("startAt", ["0"])[0])
+        return HTTPStatus.OK, {"startAt": start_at, "maxResults": 100, "total": 0, "issues": []}, {}
+
+    def _users(self, **request):
+        return HTTPStatus.OK, USERS, {}
+
+    def _comment(self, **request):
+        return HTTPStatus.CREATED, {"id": str(next(self._ids))}, {}
+
+    def _attachments(self, **request):
+        return HTTPStatus.OK, [{"id": str(next(self._ids))}], {}
+
+    def _transitions(self, **request):
+        return HTTPStatus.OK, {"transitions": [{"id": "31", "name": "Done"}]}, {}
+
+    def _github_issues(self, match, query, **request):
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        first = (page - 1) * per_page + 1
+        last = min(self.github_issues, first + per_page - 1)
+        issues = [github_issue(number) for number in range(first, last + 1)]
+
+        headers = {}
+        if last < self.github_issues:
+            url = f"{self.base_url}{match.group(0)}?per_page={per_page}&page={page + 1}"
+            headers["Link"] = f'<{url}>; rel="next"'
+        return HTTPStatus.OK, issues, headers
+
+    def _github_issue(self, **request):
+        return HTTPStatus.CREATED, github_issue(next(self._ids)), {}
+
+    def _github_issue_update(self, body, **request):
+        return HTTPStatus.OK, dict(github_issue(1), **json.loads(body)), {}
+
+    def _github_comment(self, **request):
+        return HTTPStatus.CREATED, {"id": next(self._ids)}, {}
+
+    def _on_calls(self, **request):
+        return HTTPStatus.OK, {"data": {"onCalls": USERS[:1]}}, {}
+
+
+def github_issue(number, repo="lecovi/gitssues"):
+    """
+    Returns a GitHub issue as found in API responses and webhook payloads.
+    """
+    return {
+        "number": number,
+        "title": f"Issue {number}",
+        "body": f"Something **broke** in `step {number}`",
+        "url": f"https://api.github.com/repos/{repo}/issues/{number}",
+        "html_url": f"https://github.com/{repo}/issues/{number}",
+        "user": {"login": "octocat"},
+        "labels": [{"name": "bug"}],
+        "state": "open",
+    }
@@ -0,0 +1,500 @@
+"""
+This module contains helpers to build Atlassian Document Format documents, and the
+conversion of GitHub Markdown to them.
+
+According to the Jira API documentation, https://developer.atlassian.com/cloud/jira/platform/apis/document/structure/#atlassian-document-format
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Each quote level is converted by a nested iter_blocks, deeper levels are kept as text
+MAX_QUOTE_DEPTH = 16
+
+
+def document(content):
+    """
+    Returns an ADF document with content as its top level nodes.
+    """
+    return {"type": "doc", "version": 1, "content": content}
+
+
+def merge_documents(documents):
+    """
+    Returns a single ADF document with the content of every document, separated by rules.
+    """
+    content = []
+    for i, doc in enumerate(documents):
+        if i:
+            content.append({"type": "rule"})
+        content.extend(doc["content"])
+    return document(content)
+
+
+def _text(text, marks):
+    node = {"type": "text", "text": text}
+    if marks:
+        node["marks"] = list(marks)
+    return node
+
+
+def _link(href):
+    return {"type": "link", "attrs": {"href": href}}
+
+
+def _parse_link(text, i):
+    """
+    Parses a [label](href) link starting at text[i]. Returns label, href and the index after
+    it, or None when there is no link at i.
+    """
+    close = text.find("]", i + 1)
+    if close == -1 or not text.startswith("(", close + 1):
+        return None
+    end = text.find(")", close + 2)
+    if end == -1:
+        return None
+    return text[i + 1 : close], text[close + 2 : end].strip(), end + 1
+
+
+EMPHASIS = {
+    "**": {"type": "strong"},
+    "__": {"type": "strong"},
+    "~~": {"type": "strike"},
+    "*": {"type": "em"},
+    "_": {"type": "em"},
+}
+
+
+def inline_nodes(text, marks=()):
+    """
+    Returns the ADF inline nodes of a Markdown text: code spans, strong, emphasis,
+    strikethrough, links and images.
+
+    Closing delimiters are looked up with str.find, without backtracking. A delimiter with
+    no closer from some position has none from any later position either, so it is never
+    looked up again and parsing stays linear in the length of text.
+    """
+    nodes = []
+    buffer = []
+    unclosed = set()
+    no_link_before = 0
+    i = 0
+    n = len(text)
+
+    def flush():
+        if buffer:
+            nodes.append(_text("".join(buffer), marks))
+            buffer.clear()
+
+    while i < n:
+        c = text[i]
+
+        if c == "\\" and i + 1 < n:
+            buffer.append(text[i + 1])
+            i += 2
+            continue
+
+        if c == "`" and "`" not in unclosed:
+            end = text.find("`", i + 1)
+            if end == -1:
+                unclosed.add("`")
+            elif end > i + 1:
+                flush()
+                # The code mark can only be combined with links
+                code_marks = [mark for mark in marks if mark["type"] == "link"]
+                nodes.append(_text(text[i + 1 : end], code_marks + [{"type": "code"}]))
+                i = end + 1
+                continue
+
+        elif c in "*_~":
+            delimiter = text[i : i + 2] if text.startswith(c * 2, i) else c
+            # Underscores inside words (snake_case) are not emphasis
+            intraword = c == "_" and i > 0 and text[i - 1].isalnum()
+            if delimiter in EMPHASIS and delimiter not in unclosed and not intraword:
+                start = i + len(delimiter)
+                end = text.find(delimiter, start)
+                if end == -1:
+                    unclosed.add(delimiter)
+                elif end > start:
+                    flush()
+                    nodes.extend(inline_nodes(text[start:end], marks + (EMPHASIS[delimiter],)))
+                    i = end + len(delimiter)
+                    continue
+            buffer.append(delimiter)
+            i += len(delimiter)
+            continue
+
+        elif c == "[" or (c == "!" and text.startswith("[", i + 1)):
+            start = i + 1 if c == "!" else i
+            if start >= no_link_before and "]" not in unclosed:
+                close = text.find("]", start + 1)
+                end = -1
+                if close == -1:
+                    unclosed.add("]")
+                elif not text.startswith("(", close + 1):
+                    # Any [ before close would stop at the same ]
+                    no_link_before = close
+                else:
+                    end = text.find(")", close + 2)
+                    if end == -1:
+                        unclosed.add("]")
+
+                if end != -1:
+                    label, href = text[start + 1 : close], text[close + 2 : end].strip()
+                    flush()
+                    if c == "!":
+                        # Inline images are linked, only images on their own line are embedded
+                        nodes.append(_text(label or href, marks + (_link(href),)))
+                    else:
+                        nodes.extend(inline_nodes(label, marks + (_link(href),)))
+                    i = end + 1
+                    continue
+
+        buffer.append(c)
+        i += 1
+
+    flush()
+    return nodes
+
+
+def _inline_lines(lines):
+    """
+    Returns the inline nodes of consecutive lines, separated by hard breaks as GitHub renders them.
+    """
+    content = []
+    for i, line in enumerate(lines):
+        if i:
+            content.append({"type": "hardBreak"})
+        content.extend(inline_nodes(line.strip()))
+    return content
+
+
+def _heading_level(line):
+    level = 0
+    while level < len(line) and line[level] == "#":
+        level += 1
+    if 1 <= level <= 6 and (len(line) == level or line[level] == " "):
+        return level
+    return 0
+
+
+def _is_rule(stripped):
+    chars = stripped.replace(" ", "")
+    return len(chars) >= 3 and chars[0] in "-*_" and chars == chars[0] * len(chars)
+
+
+def _list_item(line):
+    """
+    Returns the list type and text of a list item line, None when it isn't one.
+    """
+    stripped = line.lstrip()
+    if stripped[:2] in ("- ", "* ", "+ "):
+        return "bulletList", None, stripped[2:]
+
+    digits = 0
+    while digits < len(stripped) and stripped[digits].isdigit():
+        digits += 1
+    if 0 < digits < 10 and stripped[digits : digits + 2] in (". ", ") "):
+        return "orderedList", int(stripped[:digits]), stripped[digits + 2 :]
+
+    return None
+
+
+def _table_cells(line):
+    cells = line.strip().strip("|").split("|")
+    return [cell.strip() for cell in cells]
+
+
+def _is_table_separator(line):
+    cells = _table_cells(line)
+    return all(cell and set(cell) <= set("-: ") and "-" in cell for cell in cells)
+
+
+def _table_row(cells, cell_type):
+    return {
+        "type": "tableRow",
+        "content": [
+            {"type": cell_type, "content": [{"type": "paragraph", "content": inline_nodes(cell)}]}
+            for cell in cells
+        ],
+    }
+
+
+def _image(stripped):
+    """
+    Returns an embedded image node when the line is only a Markdown image, None otherwise.
+    """
+    if not (stripped.startswith("![") and stripped.endswith(")")):
+        return None
+    link = _parse_link(stripped, 1)
+    if link is None or link[2] != len(stripped):
+        return None
+    return {
+        "type": "mediaSingle",
+        "content": [{"type": "media", "attrs": {"type": "external", "url": link[1]}}],
+    }
+
+
+def _code_block(lines, language):
+    node = {"type": "codeBlock", "content": []}
+    if lines:
+        node["content"].append(_text("\n".join(lines), ()))
+    if language:
+        node["attrs"] = {"language": language}
+    return node
+
+
+def _inline_content(node):
+    """
+    Returns the inline nodes of the paragraphs in node, joined by hard breaks.
+    """
+    if node["type"] == "paragraph":
+        return list(node.get("content", []))
+    lines = [_inline_content(child) for child in node.get("content", [])]
+    content = []
+    for line in lines:
+        if line and content:
+            content.append({"type": "hardBreak"})
+        content.extend(line)
+    return content
+
+
+def _quote_content(node):
+    """
+    Returns the nodes standing for node in a blockquote, which only holds paragraphs, lists,
+    code blocks and media. Nested quotes are flattened, other blocks become paragraphs.
+    """
+    node_type = node["type"]
+    if node_type in ("paragraph", "bulletList", "orderedList", "codeBlock", "mediaSingle"):
+        return [node]
+    if node_type == "blockquote":
+        # Already converted by the nested iter_blocks
+        return node["content"]
+    if node_type == "heading":
+        return [{"type": "paragraph", "content": node["content"]}]
+    if node_type == "rule":
+        return [{"type": "paragraph", "content": [_text("---", ())]}]
+    if node_type == "table":
+        paragraphs = []
+        for row in node["content"]:
+            content = []
+            for cell in row["content"]:
+                if content:
+                    content.append(_text(" | ", ()))
+                content.extend(_inline_content(cell))
+            paragraphs.append({"type": "paragraph", "content": content})
+        return paragraphs
+    content = _inline_content(node)
+    return [{"type": "paragraph", "content": content}] if content else []
+
+
+def iter_blocks(lines, depth=0):
+    """
+    Yields the ADF block nodes of Markdown lines, in a single pass over them.
+
+    Supports paragraphs, ATX headings, fenced code blocks, bullet and ordered lists,
+    blockquotes, pipe tables, rules and images on their own line. depth is the number of
+    blockquotes the lines are in.
+    """
+    paragraph_lines = []
+    list_node = None
+    list_gap = False
+    quote_lines = []
+    table = None
+    fence = None
+    fence_language = None
+    code_lines = []
+
+    def flush_paragraph():
+        if paragraph_lines:
+            node = {"type": "paragraph", "content": _inline_lines(paragraph_lines)}
+            paragraph_lines.clear()
+            return [node]
+        return []
+
+    def flush_blocks():
+        nonlocal list_node, table
+        blocks = flush_paragraph()
+        if list_node is not None:
+            blocks.append(list_node)
+            list_node = None
+        if quote_lines:
+            content = []
+            for node in iter_blocks(quote_lines, depth + 1):
+                content.extend(_quote_content(node))
+            # An empty blockquote is invalid, e.g. for a quote of blank lines
+            if content:
+                blocks.append({"type": "blockquote", "content": content})
+            quote_lines.clear()
+        if table is not None:
+            blocks.append(table)
+            table = None
+        return blocks
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        stripped = line.strip()
+
+        if fence is not None:
+            if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                yield _code_block(code_lines, fence_language)
+                fence = None
+                code_lines = []
+            else:
+                code_lines.append(line)
+            continue
+
+        if quote_lines and not stripped.startswith(">"):
+            yield from flush_blocks()
+
+        if table is not None:
+            if stripped.startswith("|"):
+                table["content"].append(_table_row(_table_cells(stripped), "tableCell"))
+                continue
+            yield from flush_blocks()
+
+        if not stripped:
+            yield from flush_paragraph()
+            list_gap = list_node is not None
+            continue
+
+        if stripped.startswith("```") or stripped.startswith("~~~"):
+            yield from flush_blocks()
+            marker = stripped[:3]
+            fence = marker[0] * (len(stripped) - len(stripped.lstrip(marker[0])))
+            fence_language = stripped[len(fence):].strip()
+            continue
+
+        if stripped.startswith(">") and depth < MAX_QUOTE_DEPTH:
+            if not quote_lines:
+                yield from flush_blocks()
+            quote_lines.append(stripped[1:])
+            continue
+
+        item = None if _is_rule(stripped) else _list_item(line)
+        if item is not None:
+            list_type, start, text = item
+            if list_node is not None and list_node["type"] != list_type:
+                yield from flush_blocks()
+            yield from flush_paragraph()
+            if list_node is None:
+                list_node = {"type": list_type, "content": []}
+                if start is not None and start != 1:
+                    list_node["attrs"] = {"order": start}
+            list_node["content"].append(
+                {"type": "listItem", "content": [{"type": "paragraph", "content": inline_nodes(text)}]}
+            )
+            list_gap = False
+            continue
+
+        if list_node is not None:
+            if line.startswith("  ") and not list_gap:
+                # Continuation of the last list item
+                item_paragraph = list_node["content"][-1]["content"][0]
+                item_paragraph["content"].append({"type": "hardBreak"})
+                item_paragraph["content"].extend(inline_nodes(stripped))
+                continue
+            yield from flush_blocks()
+
+        level = _heading_level(stripped)
+        if level:
+            yield from flush_blocks()
+            yield {
+                "type": "heading",
+                "attrs": {"level": level},
+                "content": inline_nodes(stripped[level:].strip().rstrip("#").strip()),
+            }
+            continue
+
+        if _is_rule(stripped):
+            yield from flush_blocks()
+            yield {"type": "rule"}
+            continue
+
+        if (
+            stripped.startswith("|")
+            and len(paragraph_lines) == 1
+            and paragraph_lines[0].lstrip().startswith("|")
+            and _is_table_separator(stripped)
+        ):
+            header = _table_cells(paragraph_lines.pop())
+            table = {"type": "table", "content": [_table_row(header, "tableHeader")]}
+            continue
+
+        image = _image(stripped)
+        if image is not None:
+            yield from flush_blocks()
+            yield image
+            continue
+
+        paragraph_lines.append(line)
+
+    if fence is not None:
+        # Unclosed fence, keep the code anyway
+        yield _code_block(code_lines, fence_language)
+
+    yield from flush_blocks()
+
+
+class ConversionCache:
+    """
+    LRU cache of converted documents keyed by a hash of the Markdown text.
+
+    Holds at most max_chars characters of source text, so a few huge bodies can't take
+    all the memory. Cached documents are shared and must not be mutated.
+    """
+
+    def __init__(self, max_chars=4 * 1024 * 1024):
+        self.max_chars = max_chars
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text):
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, size, doc):
+        if size > self.max_chars:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (size, doc)
+            self._chars += size
+            while self._chars > self.max_chars:
+                _, (evicted_size, _) = self._entries.popitem(last=False)
+                self._chars -= evicted_size
+
+
+cache = ConversionCache()
+
+
+def markdown_to_adf(text, use_cache=True):
+    """
+    Returns the ADF document of a GitHub Markdown text.
+
+    Redeliveries and edits of the same text are served from the cache.
+    """
+    if not use_cache:
+        return document(list(iter_blocks((text or "").splitlines())))
+
+    key = cache.key(text or "")
+    doc = cache.get(key)
+    if doc is None:
+        doc = document(list(iter_blocks((text or "").splitlines())))
+        cache.put(key, len(text or ""), doc)
+    return doc
@@ -0,0 +1,225 @@
+"""
+This module contains the backfill pipeline that mirrors existing GitHub issues into Jira.
+
+Three stages are connected by bounded queues: a reader streaming the repo issues,
+a transformer building Jira title and content, and a pool of writers creating the issues.
+"""
+import copy
+import json
+import math
+import queue
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from gitssues.helpers import parse_issue_data
+from gitssues.journal import Journal
+
+
+# get active sprint, post issue, move to sprint, get assignable users, assign
+REQUESTS_PER_ISSUE = 5
+GITHUB_PAGE_SIZE = 100
+
+_DONE = object()
+
+
+class Checkpoint:
+    """
+    Append-only record of the GitHub issues already mirrored into Jira.
+
+    Every line is a JSON object with the GitHub issue number and the Jira issue key,
+    so a crash loses at most the line being written.
+    """
+
+    def __init__(self, path="gitssues.backfill"):
+        self.path = Path(path)
+        self._done = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with self.path.open() as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Truncated last line from an interrupted run
+                    continue
+                self._done[entry["number"]] = entry["key"]
+
+    def __contains__(self, number):
+        return number in self._done
+
+    def __len__(self):
+        return len(self._done)
+
+    def mark(self, number, issue_key):
+        """
+        Records that GitHub issue number was mirrored as issue_key.
+        """
+        with self._lock:
+            self._done[number] = issue_key
+            with self.path.open("a") as f:
+                f.write(json.dumps({"number": number, "key": issue_key}) + "\n")
+
+
+@dataclass
+class BackfillReport:
+    created: int = 0
+    skipped: int = 0
+    failed: list = field(default_factory=list)
+    pending: int = 0
+    projected_requests: int = 0
+    projected_seconds: float = 0.0
+
+
+def _reader(github, repo, checkpoint, raw_queue, report, errors):
+    try:
+        for issue in github.iter_issues_from_repo(repo=repo):
+            if errors:
+                # The transformer failed, the backfill is stopping
+                break
+            if issue["number"] in checkpoint:
+                report.skipped += 1
+                continue
+            raw_queue.put(issue)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        raw_queue.put(_DONE)
+
+
+def _transformer(raw_queue, work_queue, writers, errors):
+    try:
+        while True:
+            issue = raw_queue.get()
+            if issue is _DONE:
+                break
+            title, content = parse_issue_data({"issue": issue})
+            work_queue.put((issue["number"], title, content))
+    except Exception as e:
+        errors.append(e)
+        # Unblocks the reader until it stops
+        while raw_queue.get() is not _DONE:
+            pass
+    finally:
+        for _ in range(writers):
+            work_queue.put(_DONE)
+
+
+def _writer(jira, repo, work_queue, checkpoint, report, lock, on_progress, journal_dir):
+    while True:
+        item = work_queue.get()
+        if item is _DONE:
+            break
+
+        number, title, content = item
+        try:
+            if journal_dir is None:
+                issue_key = jira.new_issue(title=title, content=content)
+            else:
+                # An issue that failed halfway is resumed by the next run, not created again
+                journal = Journal.for_key(f"backfill-{repo}-{number}", directory=journal_dir)
+                issue_key = jira.new_issue(title=title, content=content, journal=journal)
+        except Exception as e:
+            with lock:
+                report.failed.append((number, str(e)))
+            continue
+
+        checkpoint.mark(number, issue_key)
+        with lock:
+            report.created += 1
+        if on_progress is not None:
+            on_progress(number, issue_key)
+
+
+def backfill(
+    github,
+    jira,
+    repo,
+    checkpoint,
+    concurrency=4,
+    queue_size=100,
+    on_progress=None,
+    journal_dir=None,
+):
+    """
+    Mirrors every issue of repo not yet in checkpoint into Jira. Returns a BackfillReport.
+    With journal_dir, the steps of every new issue are journaled there.
+
+    jira must be prepared. Each writer works on its own copy of it, since new_issue keeps
+    the current sprint and issue in the object.
+    """
+    report = BackfillReport()
+    errors = []
+    lock = threading.Lock()
+    raw_queue = queue.Queue(maxsize=queue_size)
+    work_queue = queue.Queue(maxsize=queue_size)
+
+    threads = [
+        threading.Thread(
+            target=_reader,
+            args=(github, repo, checkpoint, raw_queue, report, errors),
+            name="backfill-reader",
+        ),
+        threading.Thread(
+            target=_transformer,
+            args=(raw_queue, work_queue, concurrency, errors),
+            name="backfill-transformer",
+        ),
+    ]
+    for i in range(concurrency):
+        threads.append(
+            threading.Thread(
+                target=_writer,
+                args=(
+                    copy.deepcopy(jira),
+                    repo,
+                    work_queue,
+                    checkpoint,
+                    report,
+                    lock,
+                    on_progress,
+                    journal_dir,
+                ),
+                name=f"backfill-writer-{i}",
+            )
+        )
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return report
+
+
+def plan_backfill(github, repo, checkpoint, concurrency=4, latency=0.5):
+    """
+    Dry-run of backfill: counts pending issues without writing to Jira. Returns a BackfillReport
+    with the projected request count and duration, given the average latency of a Jira request.
+    """
+    report = BackfillReport()
+    total = 0
+    for issue in github.iter_issues_from_repo(repo=repo):
+        total += 1
+        if issue["number"] in checkpoint:
+            report.skipped += 1
+        else:
+            report.pending += 1
+
+    github_requests = max(1, math.ceil(total / GITHUB_PAGE_SIZE))
+    jira_requests = report.pending * REQUESTS_PER_ISSUE
+    report.projected_requests = github_requests + jira_requests
+    # Writers run in parallel, but the requests of a single issue are sequential
+    report.projected_seconds = (
+        github_requests * latency + jira_requests * latency / max(1, concurrency)
+    )
+
+    return report
@@ -1,4 +1,7 @@
+import json
+import os
 import pickle
+import sys
 from pathlib import Path
 
 import typer
@@ -6,8 +9,16 @@ from dotenv import load_dotenv
 
 import gitssues.jira.cli as jira_app
 import gitssues.github.cli as github_app
+from gitssues.backfill import Checkpoint, backfill as run_backfill, plan_backfill
+from gitssues.export import DEFAULT_FIELDS, DEFAULT_PATHS, FORMATS, ExportError, export_issues
+from gitssues.journal import journal_directory, pending_journals
+from gitssues.loadtest import ARRIVALS, replay
+from gitssues.profiling import Profiler
+from gitssues.recording import DEFAULT_PATH as DEFAULT_RECORDING, iter_recording
+from gitssues.state import get_state
 from gitssues.jira import Jira
 from gitssues.github import GitHub
+from gitssues.warm import WarmState, snapshot_directory, snapshot_path
 
 
 load_dotenv()
@@ -16,6 +27,8 @@ app = typer.Typer()
 
 app.add_typer(jira_app.app, name="jira")
 app.add_typer(github_app.app, name="github")
+journal_app = typer.Typer(help="Journals of unfinished new issues")
+app.add_typer(journal_app, name="journal")
 
 
 @app.command()
@@ -28,6 +41,13 @@ def prepare():
         jira = Jira()
         github = GitHub()
         jira.prepare_jira()
+        # Also share the prepared metadata with the server workers
+        state = get_state()
+        WarmState(
+            jira,
+            path=snapshot_path(jira.project_key, directory=snapshot_directory()),
+            state=state if state.shared else None,
+        ).write()
         with p.open("wb") as f:
             gitssues = {
                 "jira": jira,
@@ -47,5 +67,183 @@ def clean():
         typer.echo("Nothing to do!")
 
 
+def load_cache():
+    """
+    Returns the Jira and GitHub objects saved by prepare, exits when there are none.
+    """
+    p = Path("gitssues.cache")
+    if not p.exists():
+        typer.echo("Run prepare before!")
+        exit(1)
+
+    with p.open("rb") as f:
+        return pickle.load(f)
+
+
+@app.command(help="Mirrors every existing issue of a GitHub repo into Jira")
+def backfill(
+    repo: str,
+    concurrency: int = typer.Option(4, help="Number of parallel Jira writers."),
+    checkpoint: str = typer.Option(
+        "gitssues.backfill", help="File where progress is recorded."
+    ),
+    dry_run: bool = typer.Option(
+        False, help="Only report projected requests and duration."
+    ),
+    latency: float = typer.Option(
+        0.5, help="Average request latency in seconds, used by --dry-run."
+    ),
+):
+    gitssues = load_cache()
+    github = gitssues["github"]
+    jira = gitssues["jira"]
+
+    progress = Checkpoint(path=checkpoint)
+
+    if dry_run:
+        report = plan_backfill(
+            github=github,
+            repo=repo,
+            checkpoint=progress,
+            concurrency=concurrency,
+            latency=latency,
+        )
+        typer.echo(
+            f"{report.pending} issues to mirror ({report.skipped} already done): "
+            f"~{report.projected_requests} requests in ~{report.projected_seconds:.0f}s"
+        )
+        return
+
+    report = run_backfill(
+        github=github,
+        jira=jira,
+        repo=repo,
+        checkpoint=progress,
+        concurrency=concurrency,
+        on_progress=lambda number, key: typer.echo(f"#{number} -> {key}"),
+        journal_dir=journal_directory(),
+    )
+    for number, error in report.failed:
+        typer.echo(f"#{number} failed: {error}", err=True)
+    typer.echo(
+        f"{report.created} created, {report.skipped} skipped, {len(report.failed)} failed."
+    )
+
+
+@app.command(help="Replays recorded webhook deliveries against a running server")
+def loadtest(
+    recording: str = typer.Argument(
+        DEFAULT_RECORDING, help="Deliveries recorded with GITSSUES_RECORD_FILE."
+    ),
+    url: str = typer.Option("http://localhost:5000/github", help="Webhook URL of the server."),
+    rate: float = typer.Option(
+        10.0, help="Deliveries per second. With --arrival recorded, 0 keeps the recorded pace."
+    ),
+    count: int = typer.Option(None, help="Deliveries to send, the whole recording by default."),
+    arrival: str = typer.Option("constant", help=f"Arrival curve: {', '.join(ARRIVALS)}."),
+    concurrency: int = typer.Option(32, help="Maximum requests in flight."),
+    output: str = typer.Option(None, help="Also write the report as JSON to this file."),
+):
+    secret = os.getenv("GITHUB_WEBHOOK_SECRET")
+    if not secret:
+        typer.echo("GITHUB_WEBHOOK_SECRET is needed to sign the deliveries!", err=True)
+        exit(1)
+    if not rate and arrival != "recorded":
+        typer.echo("--rate must be positive, except with --arrival recorded.", err=True)
+        exit(1)
+
+    report = replay(
+        iter_recording(recording),
+        url=url,
+        secret=secret,
+        count=count,
+        rate=rate or None,
+        arrival=arrival,
+        concurrency=concurrency,
+    )
+    summary = report.summary()
+    typer.echo(
+        f"{summary['sent']} sent in {summary['duration_seconds']:.1f}s: "
+        f"{summary['throughput_per_second']:.1f}/s, {summary['error_rate']:.1%} errors"
+    )
+    if report.latencies:
+        typer.echo(
+            f"latency p50 {summary['p50_ms']:.0f} ms, p90 {summary['p90_ms']:.0f} ms, "
+            f"p99 {summary['p99_ms']:.0f} ms, max {summary['max_ms']:.0f} ms"
+        )
+    typer.echo(f"statuses: {summary['statuses']}")
+    if output:
+        with open(output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+@app.command(help="Exports the issues of the Jira project to compressed JSONL or Parquet")
+def export(
+    output: str = typer.Argument(
+        None, help="Destination, gitssues.export.jsonl.gz or the gitssues.export directory."
+    ),
+    file_format: str = typer.Option("jsonl", "--format", help=f"One of {', '.join(FORMATS)}."),
+    fields: str = typer.Option(",".join(DEFAULT_FIELDS), help="Comma separated Jira fields."),
+    sprint: str = typer.Option(None, help="Only issues of this sprint id or name, or active."),
+    full: bool = typer.Option(
+        False, help="Export every issue, replacing the output, not only the updated ones."
+    ),
+):
+    if file_format not in FORMATS:
+        typer.echo(f"--format must be one of {', '.join(FORMATS)}.", err=True)
+        exit(1)
+
+    # Only the configuration and credentials are needed, not the prepared metadata
+    jira = Jira()
+    output = output or DEFAULT_PATHS[file_format]
+    try:
+        report = export_issues(
+            jira,
+            output,
+            file_format=file_format,
+            fields=[field.strip() for field in fields.split(",") if field.strip()],
+            sprint=sprint,
+            full=full,
+        )
+    except ImportError:
+        if file_format != "parquet":
+            raise
+        typer.echo("Exporting to Parquet needs the pyarrow package!", err=True)
+        exit(1)
+    except ExportError as e:
+        typer.echo(f"{e}. Use --full to export again, or another output.", err=True)
+        exit(1)
+
+    if report.updated_within is None:
+        typer.echo(f"{report.exported} issues exported to {output}.")
+    else:
+        typer.echo(
+            f"{report.exported} issues updated in the last {report.updated_within} minutes "
+            f"appended to {output}."
+        )
+
+
+@journal_app.command("list", help="Lists the journals of unfinished new issues")
+def list_journals(
+    older_than: int = typer.Option(0, help="Only journals idle for this many seconds."),
+):
+    for journal in pending_journals(directory=journal_directory(), older_than=older_than):
+        typer.echo(f"{journal.path.stem}: {journal.steps}")
+
+
+@journal_app.command(help="Gives up unfinished new issues, deleting the issues already created")
+def abandon(
+    older_than: int = typer.Option(
+        3600, help="Only journals idle for this many seconds."
+    ),
+):
+    jira = load_cache()["jira"]
+
+    for journal in pending_journals(directory=journal_directory(), older_than=older_than):
+        jira.abandon_new_issue(journal=journal)
+        typer.echo(f"{journal.path.stem} abandoned!")
+
+
 if __name__ == "__main__":
-    app()
+    with Profiler.from_env().profile("cli-" + "-".join(sys.argv[1:3])):
+        app()
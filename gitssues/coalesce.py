@@ -0,0 +1,111 @@
+"""
+This module contains the coalescing of bursty webhook events per issue.
+
+Comments and edits of an issue are buffered until the issue has been quiet for a while,
+or the first buffered event is too old, and then sent to Jira in a single batch.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Batch:
+    """
+    Pending events of an issue. comments keeps every comment in order, edit only the latest state.
+    """
+
+    context: object = None
+    comments: list = field(default_factory=list)
+    edit: object = None
+    first_at: float = 0.0
+    last_at: float = 0.0
+
+
+class Coalescer:
+    def __init__(self, flush, quiet=5.0, max_delay=30.0):
+        """
+        flush is called with the key and the Batch of an issue once it is due. A batch is due
+        when no event arrived for quiet seconds, or max_delay seconds after its first event.
+        """
+        self.flush = flush
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _add(self, key, context, update):
+        now = time.monotonic()
+        with self._condition:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = Batch(context=context, first_at=now)
+            batch.last_at = now
+            update(batch)
+            self._condition.notify()
+
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="gitssues-coalescer", daemon=True
+                )
+                self._worker.start()
+
+    def add_comment(self, key, comment, context=None):
+        """
+        Buffers a comment for the issue identified by key.
+        """
+        self._add(key, context, lambda batch: batch.comments.append(comment))
+
+    def set_edit(self, key, edit, context=None):
+        """
+        Buffers the latest edited state of the issue identified by key.
+        """
+
+        def update(batch):
+            batch.edit = edit
+
+        self._add(key, context, update)
+
+    def _deadline(self, batch):
+        return min(batch.last_at + self.quiet, batch.first_at + self.max_delay)
+
+    def _pop_due(self, now):
+        due = [key for key, batch in self._pending.items() if self._deadline(batch) <= now]
+        return [(key, self._pending.pop(key)) for key in due]
+
+    def _flush(self, batches):
+        for key, batch in batches:
+            try:
+                self.flush(key, batch)
+            except Exception:
+                logger.exception(f"Error while flushing events of {key}")
+
+    def _run(self):
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                batches = self._pop_due(now)
+                if not batches:
+                    deadlines = [self._deadline(batch) for batch in self._pending.values()]
+                    timeout = min(deadlines) - now if deadlines else None
+                    self._condition.wait(timeout)
+                    continue
+
+            self._flush(batches)
+
+    def flush_all(self):
+        """
+        Flushes every pending batch right away, e.g. when the process exits.
+        """
+        with self._condition:
+            batches = list(self._pending.items())
+            self._pending.clear()
+        self._flush(batches)
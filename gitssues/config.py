@@ -0,0 +1,180 @@
+"""
+This module contains the process-wide configuration read from gitssues.yml.
+
+The file is parsed and validated once, then shared by every Jira and GitHub object. It is
+reloaded when it changes on disk, checked at most every check_interval seconds, or on
+SIGHUP. A new version replaces the previous one at once, only after it passed validation,
+and the subscribers of the keys that changed are notified, so dependent caches are rebuilt
+without restarting the process.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+
+import yaml
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "gitssues.yml"
+VERSION = (str, int, float)
+
+# Key -> (accepted types, required)
+SCHEMA = {
+    "project_key": (str, True),
+    "default_issue_type": (str, True),
+    "labels": (list, True),
+    "JIRA_BASE_URL": (str, True),
+    "JIRA_SCD_API_VERSION": (VERSION, True),
+    "JIRA_CPD_API_VERSION": (VERSION, True),
+    "GITHUB_BASE_URL": (str, True),
+    "OPSGENIE_BASE_URL": (str, False),
+    "routes": (list, False),
+    "attachments": (dict, False),
+    "scheduler": (dict, False),
+    "assignment": (str, False),
+    "close_transition": (str, False),
+}
+ASSIGNMENTS = ("random", "workload")
+
+
+class ConfigError(Exception):
+    pass
+
+
+def validate(data, schema=SCHEMA):
+    """
+    Raises ConfigError when data doesn't match schema. Unknown keys are allowed.
+    """
+    if not isinstance(data, dict):
+        raise ConfigError("The configuration must be a mapping")
+
+    errors = []
+    for key, (types, required) in schema.items():
+        if data.get(key) is None:
+            if required:
+                errors.append(f"{key} is required")
+        elif not isinstance(data[key], types):
+            errors.append(f"{key} has an invalid value {data[key]!r}")
+
+    if isinstance(data.get("assignment"), str) and data["assignment"] not in ASSIGNMENTS:
+        errors.append(f"assignment must be one of {', '.join(ASSIGNMENTS)}")
+
+    for i, route in enumerate(data.get("routes") or ()):
+        if not isinstance(route, dict) or not isinstance(route.get("project_key"), str):
+            errors.append(f"routes[{i}] needs a project_key")
+
+    if errors:
+        raise ConfigError("; ".join(errors))
+
+
+class Config:
+    def __init__(self, path=DEFAULT_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.mtime = None
+        # An invalid file is reported once, not on every check until it is fixed
+        self._rejected_mtime = None
+        self._data = None
+        self._checked_at = 0.0
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self.reload()
+
+    @property
+    def data(self):
+        """
+        The current configuration. It is shared, never modify it.
+        """
+        self.check()
+        return self._data
+
+    def subscribe(self, keys, callback):
+        """
+        Calls callback(old, new) after every reload changing any of keys.
+        """
+        self._subscribers.append((tuple(keys), callback))
+
+    def check(self):
+        """
+        Reloads the configuration when the file changed, at most every check_interval seconds.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self.mtime and mtime != self._rejected_mtime:
+            self.reload()
+
+    def reload(self):
+        """
+        Reads and validates the file, then replaces the current configuration.
+
+        The first load raises ConfigError on an invalid file. Later ones log the error and
+        keep the current configuration.
+        """
+        with self._lock:
+            mtime = None
+            try:
+                mtime = os.stat(self.path).st_mtime
+                with open(self.path) as f:
+                    data = yaml.full_load(f)
+                validate(data)
+            except (OSError, yaml.YAMLError, ConfigError) as e:
+                if self._data is None:
+                    raise ConfigError(f"Invalid configuration {self.path}: {e}") from e
+                self._rejected_mtime = mtime
+                logger.error(f"Keeping the current configuration, {self.path} is invalid: {e}")
+                return False
+
+            old, self._data, self.mtime = self._data, data, mtime
+
+        if old is not None:
+            self._notify(old, data)
+        return True
+
+    def _notify(self, old, new):
+        for keys, callback in self._subscribers:
+            if any(old.get(key) != new.get(key) for key in keys):
+                try:
+                    callback(old, new)
+                except Exception:
+                    logger.exception(f"Error while applying configuration change of {keys}")
+
+
+_configs = {}
+_configs_lock = threading.Lock()
+
+
+def get_config(path=DEFAULT_PATH):
+    """
+    Returns the shared Config of the file at path, loaded on first use.
+    """
+    key = os.path.abspath(path)
+    config = _configs.get(key)
+    if config is None:
+        with _configs_lock:
+            config = _configs.get(key)
+            if config is None:
+                config = _configs[key] = Config(path=key)
+    return config
+
+
+def install_sighup_handler():
+    """
+    Reloads every loaded configuration on SIGHUP. Must be called from the main thread.
+    """
+
+    def reload_all(signum, frame):
+        for config in list(_configs.values()):
+            # Signal handlers run between bytecodes of the main thread, which may hold the lock
+            threading.Thread(target=config.reload, name="config-reload", daemon=True).start()
+
+    signal.signal(signal.SIGHUP, reload_all)
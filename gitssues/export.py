@@ -0,0 +1,256 @@
+"""
+This module contains the export of the issues of a Jira project, read by `gitssues export`.
+
+Issues are streamed page by page from the Jira search, with only the exported fields, and
+written as they come, so memory doesn't grow with the project:
+
+- jsonl appends a gzip member per export to a single file, gzip readers read them back
+  to back.
+- parquet writes a file per export in a directory, a row group per batch of issues. It
+  needs the pyarrow package.
+
+Every row holds the issue key and id, and each field flattened to a value: objects such
+as statuses and users become their name or account id, lists of them a list of values.
+Parquet columns are strings, lists and objects are JSON encoded.
+
+After the first export, only the issues updated since the previous one are exported and
+appended, with a minute of overlap. An issue can then appear several times, its row with
+the latest updated value is the current one. A full export replaces what was exported
+before.
+
+The JQL and fields of the last export are recorded next to the destination. Appending
+issues of another sprint, or with other fields, would mix rows that don't match, so it
+needs a full export or another destination.
+"""
+import gzip
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+
+FORMATS = ("jsonl", "parquet")
+DEFAULT_FIELDS = (
+    "summary",
+    "status",
+    "issuetype",
+    "priority",
+    "assignee",
+    "reporter",
+    "labels",
+    "created",
+    "updated",
+    "resolutiondate",
+)
+DEFAULT_PATHS = {"jsonl": "gitssues.export.jsonl.gz", "parquet": "gitssues.export"}
+# Issues per Parquet row group
+BATCH_SIZE = 1000
+# Keys naming a Jira object, in order of preference
+_NAME_KEYS = ("accountId", "name", "value", "key", "id")
+
+
+def flatten(value):
+    """
+    Returns a field value with objects replaced by their name, account id or key.
+    """
+    if isinstance(value, list):
+        return [flatten(item) for item in value]
+    if isinstance(value, dict):
+        for key in _NAME_KEYS:
+            if key in value:
+                return value[key]
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+def to_row(issue, fields):
+    row = {"key": issue.key, "id": issue.id}
+    for field in fields:
+        row[field] = flatten(issue.fields.get(field))
+    return row
+
+
+class ExportError(Exception):
+    pass
+
+
+def build_jql(project_key, sprint=None, updated_within=None):
+    """
+    Returns the JQL of the issues to export. sprint is a sprint id or name, or active for
+    the open sprints. updated_within limits the issues to those updated in that many minutes.
+    """
+    clauses = [f"project = {project_key}"]
+    if sprint == "active":
+        clauses.append("sprint in openSprints()")
+    elif sprint is not None:
+        clauses.append(f"sprint = {sprint}" if sprint.isdigit() else f'sprint = "{sprint}"')
+    if updated_within is not None:
+        # Relative dates don't depend on the time zone of the Jira user
+        clauses.append(f'updated >= "-{updated_within}m"')
+    # Issues created while the export runs come last, so paging doesn't skip any
+    return " AND ".join(clauses) + " ORDER BY created ASC"
+
+
+class ExportState:
+    """
+    Records when the last export of a destination started, and its JQL and fields, next to it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.exported_at = None
+        self.jql = None
+        self.fields = None
+        if self.path.exists():
+            with self.path.open() as f:
+                data = json.load(f)
+            self.exported_at = data["exported_at"]
+            self.jql = data.get("jql")
+            self.fields = data.get("fields")
+
+    def check(self, jql, fields):
+        """
+        Raises ExportError when the last export had another JQL or other fields.
+        """
+        if self.exported_at is None:
+            return
+        if self.jql != jql:
+            raise ExportError(f"The last export was of {self.jql}, not {jql}")
+        if self.fields != list(fields):
+            raise ExportError(f"The last export had the fields {self.fields}, not {list(fields)}")
+
+    def updated_within(self, now):
+        """
+        Returns the minutes since the last export, with a minute of overlap. None without one.
+        """
+        if self.exported_at is None:
+            return None
+        return math.ceil((now - self.exported_at) / 60) + 1
+
+    def save(self, exported_at, jql, fields):
+        self.exported_at = exported_at
+        self.jql = jql
+        self.fields = list(fields)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with tmp.open("w") as f:
+            json.dump({"exported_at": exported_at, "jql": jql, "fields": self.fields}, f)
+        os.replace(tmp, self.path)
+
+
+def write_jsonl(rows, path, append=True):
+    """
+    Appends rows to the gzip JSONL file at path, as one gzip member, or replaces the file
+    with them unless append. Returns the row count.
+    """
+    path = Path(path)
+    # The previous file is only replaced once every row was written
+    target = path if append else path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    count = 0
+    with open(target, "ab" if append else "wb") as f, gzip.GzipFile(fileobj=f, mode="wb") as gz:
+        for row in rows:
+            gz.write(json.dumps(row).encode() + b"\n")
+            count += 1
+    if not append:
+        os.replace(target, path)
+    return count
+
+
+def write_parquet(rows, directory, fields, batch_size=BATCH_SIZE, append=True):
+    """
+    Writes rows to a new Parquet file in directory, a row group per batch_size rows. Unless
+    append, the files of the previous exports are deleted once it is written. Returns the
+    row count.
+    """
+    # Only exports to Parquet need the package
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = ["key", "id", *fields]
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"part-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.parquet"
+    # Readers only see the file once complete
+    tmp = path.with_name(f"{path.name}.tmp")
+
+    def encode(value):
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(value)
+
+    count = 0
+    with pq.ParquetWriter(tmp, schema) as writer:
+
+        def write(batch):
+            records = [{column: encode(row[column]) for column in columns} for row in batch]
+            writer.write_table(pa.Table.from_pylist(records, schema=schema))
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                write(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            write(batch)
+            count += len(batch)
+    os.replace(tmp, path)
+
+    if not append:
+        for previous in directory.glob("part-*.parquet"):
+            if previous != path:
+                previous.unlink()
+    return count
+
+
+@dataclass
+class ExportReport:
+    exported: int = 0
+    # Minutes of updates exported, None for a full export
+    updated_within: int = None
+
+
+def export_issues(
+    jira,
+    output,
+    file_format="jsonl",
+    fields=DEFAULT_FIELDS,
+    sprint=None,
+    full=False,
+    page_size=100,
+):
+    """
+    Exports the issues of the project of jira to output. Returns an ExportReport.
+
+    Unless full, only the issues updated since the last export to output are appended, and
+    ExportError is raised when that export had another JQL or other fields. A full export
+    replaces output.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format {file_format}, use one of {FORMATS}")
+
+    fields = list(fields)
+    state = ExportState(f"{output}.state.json")
+    export_jql = build_jql(jira.project_key, sprint=sprint)
+    if not full:
+        state.check(export_jql, fields)
+
+    started = time.time()
+    updated_within = None if full else state.updated_within(started)
+    jql = build_jql(jira.project_key, sprint=sprint, updated_within=updated_within)
+    issues = jira.search_issues(jql=jql, fields=fields, page_size=page_size)
+    rows = (to_row(issue, fields) for issue in issues)
+
+    # Every issue is exported without a previous export, the output is replaced too
+    append = updated_within is not None
+    if file_format == "parquet":
+        exported = write_parquet(rows, output, fields, append=append)
+    else:
+        exported = write_jsonl(rows, output, append=append)
+
+    # Saved last, so an interrupted export is done again from the previous one
+    state.save(started, export_jql, fields)
+    return ExportReport(exported=exported, updated_within=updated_within)
@@ -2,13 +2,64 @@ import os
 from dataclasses import dataclass
 from http import HTTPStatus
 
-import requests
 from requests.auth import HTTPBasicAuth
 
+from gitssues import transport
 from gitssues.helpers import read_config
 from .exc import GitHubException
 
 
+# Issues per page, the maximum of the GraphQL API
+GRAPHQL_PAGE_SIZE = 100
+ISSUES_QUERY = """
+query($owner: String!, $name: String!, $states: [IssueState!], $after: String,
+      $pageSize: Int!, $labels: Int!, $comments: Int!) {
+  rateLimit { cost remaining resetAt }
+  repository(owner: $owner, name: $name) {
+    issues(first: $pageSize, after: $after, states: $states,
+           orderBy: {field: CREATED_AT, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number title body state url createdAt updatedAt closedAt
+        author { login }
+        labels(first: $labels) { nodes { name } }
+        comments(first: $comments) {
+          totalCount
+          nodes { body url createdAt author { login } }
+        }
+      }
+    }
+  }
+}
+"""
+GRAPHQL_STATES = {"open": ["OPEN"], "closed": ["CLOSED"], "all": None}
+
+
+@dataclass
+class QueryCost:
+    """
+    Rate limit points spent by GraphQL queries, and where to resume them.
+    """
+
+    requests: int = 0
+    cost: int = 0
+    remaining: int = None
+    reset_at: str = None
+    # Cursor after the last page read, to resume from it
+    cursor: str = None
+
+    def add(self, rate_limit):
+        self.requests += 1
+        self.cost += rate_limit["cost"]
+        self.remaining = rate_limit["remaining"]
+        self.reset_at = rate_limit["resetAt"]
+
+
+def _login(node):
+    # Deleted users are returned as a null author
+    return {"login": node["author"]["login"] if node.get("author") else "ghost"}
+
+
 @dataclass
 class GitHub:
     repo: str = None
@@ -32,6 +83,11 @@ class GitHub:
         """
         self.config = read_config(path=path)
         self._base_url = self.config["GITHUB_BASE_URL"]
+        # GitHub Enterprise serves REST under /api/v3 and GraphQL under /api/graphql
+        if self._base_url.endswith("/api/v3"):
+            self._graphql_url = self._base_url[: -len("/v3")] + "/graphql"
+        else:
+            self._graphql_url = f"{self._base_url}/graphql"
 
     def get_issues_from_repo(self, repo):
         """
@@ -43,8 +99,11 @@ class GitHub:
 
         URL = f"{self._base_url}/repos/{repo}/issues"
 
-        response = requests.get(
-            url=URL,
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="github",
+            endpoint="repo_issues",
             auth=self.auth,
             headers=self._headers,
             )
@@ -57,6 +116,140 @@ class GitHub:
 
         return response.json()
 
+    def iter_issues_from_repo(self, repo, state="all", per_page=100):
+        """
+        Yields every issue of a repo, one page at a time. repo is owner/repo string.
+        Pull requests are skipped.
+
+        According to the GitHub API documentation, https://docs.github.com/en/rest/reference/issues#list-repository-issues
+        """
+        URL = f"{self._base_url}/repos/{repo}/issues"
+        params = {"state": state, "per_page": per_page, "direction": "asc"}
+
+        while URL is not None:
+            response = transport.request(
+                "GET",
+                URL,
+                upstream="github",
+                endpoint="repo_issues",
+                auth=self.auth,
+                headers=self._headers,
+                params=params,
+            )
+
+            if response.status_code != HTTPStatus.OK:
+                msg = (
+                    f"Error while getting issues from {repo}: {response.status_code} - {response.text}"
+                )
+                raise GitHubException(msg)
+
+            for issue in response.json():
+                if "pull_request" not in issue:
+                    yield issue
+
+            # The next link already carries the query string
+            URL = response.links.get("next", {}).get("url")
+            params = None
+
+    def get_graphql_data(self, query, variables, endpoint="graphql"):
+        """
+        Runs a GraphQL query. Returns the data of the JSON response.
+
+        According to the GitHub API documentation, https://docs.github.com/en/graphql/guides/forming-calls-with-graphql
+        """
+        response = transport.request(
+            "POST",
+            self._graphql_url,
+            upstream="github",
+            endpoint=endpoint,
+            # The GraphQL API only accepts tokens
+            headers={"Authorization": f"bearer {self.auth.password}"},
+            json={"query": query, "variables": variables},
+        )
+
+        if response.status_code != HTTPStatus.OK:
+            msg = f"Error while querying GitHub: {response.status_code} - {response.text}"
+            raise GitHubException(msg)
+
+        # Query errors come with a 200 status
+        data = response.json()
+        if data.get("errors"):
+            messages = "; ".join(error["message"] for error in data["errors"])
+            raise GitHubException(f"Error while querying GitHub: {messages}")
+
+        return data["data"]
+
+    def iter_issues_with_comments(
+        self, repo, state="all", comments=10, labels=20, cost=None, after=None
+    ):
+        """
+        Yields every issue of a repo with its labels, author and first comments, a page of
+        100 issues per request. repo is owner/repo string.
+
+        Issues have the fields of iter_issues_from_repo used by gitssues, plus first_comments
+        with up to comments comments, while the comments field holds their total count.
+
+        Rate limit points are added to cost, a QueryCost, whose cursor resumes the reading
+        when passed as after, e.g. once the rate limit is reset.
+
+        According to the GitHub API documentation, https://docs.github.com/en/graphql/reference/objects#repository
+        """
+        owner, name = repo.split("/")
+        if cost is None:
+            cost = QueryCost()
+        variables = {
+            "owner": owner,
+            "name": name,
+            "states": GRAPHQL_STATES[state],
+            "pageSize": GRAPHQL_PAGE_SIZE,
+            "labels": labels,
+            "comments": comments,
+        }
+
+        has_next_page = True
+        while has_next_page:
+            data = self.get_graphql_data(
+                ISSUES_QUERY, dict(variables, after=after), endpoint="graphql_issues"
+            )
+            cost.add(data["rateLimit"])
+            if data["repository"] is None:
+                raise GitHubException(f"Repository {repo} not found")
+
+            issues = data["repository"]["issues"]
+            for node in issues["nodes"]:
+                yield self._parse_graphql_issue(repo, node)
+
+            after = cost.cursor = issues["pageInfo"]["endCursor"]
+            has_next_page = issues["pageInfo"]["hasNextPage"]
+
+    def _parse_graphql_issue(self, repo, node):
+        """
+        Returns a GraphQL issue node in the shape of the REST API issues.
+        """
+        return {
+            "number": node["number"],
+            "title": node["title"],
+            "body": node["body"],
+            "state": node["state"].lower(),
+            "url": f"{self._base_url}/repos/{repo}/issues/{node['number']}",
+            "html_url": node["url"],
+            "user": _login(node),
+            "labels": [{"name": label["name"]} for label in node["labels"]["nodes"]],
+            "created_at": node["createdAt"],
+            "updated_at": node["updatedAt"],
+            "closed_at": node["closedAt"],
+            "comments": node["comments"]["totalCount"],
+            "first_comments": [
+                {
+                    "user": _login(comment),
+                    "body": comment["body"],
+                    "html_url": comment["url"],
+                    "created_at": comment["createdAt"],
+                }
+                for comment in node["comments"]["nodes"]
+            ],
+        }
+
     def create_issue_for_repo(self, repo, title, body):
         """
         Create a new issue in a repo. repo is owner/repo string.
@@ -70,8 +263,11 @@ class GitHub:
             "title": title,
             "body": body,
         }
-        response = requests.post(
-            url=URL,
+        response = transport.request(
+            "POST",
+            URL,
+            upstream="github",
+            endpoint="repo_issue_create",
             auth=self.auth,
             headers=self._headers,
             json=payload,
@@ -97,8 +293,11 @@ class GitHub:
         payload = {
             "body": body,
         }
-        response = requests.post(
+        response = transport.request(
+            "POST",
             URL,
+            upstream="github",
+            endpoint="issue_comment",
             auth=self.auth,
             headers=self._headers,
             json=payload,
@@ -127,8 +326,11 @@ class GitHub:
         payload = {
             "state": state,
         }
-        response = requests.patch(
-            url=URL,
+        response = transport.request(
+            "PATCH",
+            URL,
+            upstream="github",
+            endpoint="issue_update",
             auth=self.auth,
             headers=self._headers,
             json=payload,
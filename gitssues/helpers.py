@@ -1,20 +1,33 @@
 """
 This module contains helper functions.
 """
-import yaml
+from gitssues.config import get_config
 
 
-def dict_to_dataclass(to_dataclass, from_dict):
+def read_config(path="gitssues.yml"):
     """
-    Converts a dictionary to a dataclass.
+    Returns the configuration of the file at path, parsed once per process and reloaded
+    when it changes. The returned dictionary is shared, never modify it.
     """
-    for key, value in from_dict.items():
-        setattr(to_dataclass, key, value)
+    return get_config(path).data
 
 
-def read_config(path="gitssues.yml"):
+def parse_issue_data(body):
+    """
+    Returns title and content for Jira from a GitHub issue payload.
     """
-    Reads the configuration file.
+    number = body["issue"]["number"]
+    title = body["issue"]["title"]
+    url = body["issue"]["url"]
+    user = body["issue"]["user"]["login"]
+    labels = [label["name"] for label in body["issue"]["labels"]]
+    description = body["issue"]["body"]
+
+    title = f"{labels} #{number} {title} by {user}"
+    content = f"""{description}
+
+----
+URL: {url}
     """
-    with open(path) as f:
-        return yaml.full_load(f)
+
+    return title, content
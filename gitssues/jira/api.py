@@ -1,6 +1,8 @@
 """
 This module contains the main Jira API class.
 """
+from concurrent.futures import ThreadPoolExecutor
+import copy
 from dataclasses import dataclass, field
 from http import HTTPStatus
 import os
@@ -8,9 +10,14 @@ import random
 
 import requests
 
+from gitssues import tracing, transport
+from gitssues.adf import markdown_to_adf
 from gitssues.helpers import read_config
+from gitssues.journal import Journal
+from .attachments import DEFAULT_MAX_SIZE, DEFAULT_MAX_WORKERS, mirror_assets
 from .exc import JiraException, OpsGenieException
 from .jira import Project, Board, Sprint, IssueType, Issue
+from .workload import RANDOM, WORKLOAD, get_index
 
 
 USERNAME = os.getenv("USERNAME")
@@ -18,6 +25,11 @@ JIRA_TOKEN = os.getenv("JIRA_TOKEN")
 OPSGENIE_SCHEDULE_NAME = os.getenv("OPSGENIE_SCHEDULE_NAME")
 OPSGENIE_TOKEN = os.getenv("OPSGENIE_TOKEN")
 
+DEFAULT_OPSGENIE_BASE_URL = "https://api.opsgenie.com/v2"
+
+# Fields requested by default when reading a single issue
+DEFAULT_ISSUE_FIELDS = ("summary", "status", "assignee", "labels")
+
 
 @dataclass
 class Jira:
@@ -27,6 +39,7 @@ class Jira:
     default_issue_type: IssueType = field(default_factory=IssueType)
     sprint: Sprint = field(default_factory=Sprint)
     issue: Issue = field(default_factory=Issue)
+    project_key: str = None
 
     def __post_init__(self, config_file="gitssues.yml"):
         self._load_config(path=config_file)
@@ -48,11 +61,15 @@ class Jira:
         self._base_url = self.config["JIRA_BASE_URL"]
         self._scd_api_version = self.config["JIRA_SCD_API_VERSION"]
         self._cpd_api_version = self.config["JIRA_CPD_API_VERSION"]
+        self._opsgenie_base_url = self.config.get("OPSGENIE_BASE_URL", DEFAULT_OPSGENIE_BASE_URL)
         self.labels = self.config["labels"]
+        self.assignment = self.config.get("assignment", RANDOM)
+        if self.project_key is None:
+            self.project_key = self.config["project_key"]
 
-    def get_board_data(self, project_key, version=None):
+    def get_board_data(self, project_key, max_results=1, version=None):
         """
-        Returns the board data from Jira API using project_key.
+        Returns the board data from Jira API using project_key. Only max_results boards are requested.
 
         According to the JIRA API documentation, https://developer.atlassian.com/cloud/jira/software/rest/api-group-board/#api-agile-1-0-board-boardid-get
         """
@@ -61,10 +78,13 @@ class Jira:
 
         URL = f"{self._base_url}/agile/{version}/board"
 
-        response = requests.get(
-            url=URL,
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="board",
             auth=self.auth,
-            params={"projectKeyOrId": project_key},
+            params={"projectKeyOrId": project_key, "maxResults": max_results},
         )
 
         if response.status_code != HTTPStatus.OK:
@@ -73,9 +93,9 @@ class Jira:
 
         return response.json()
 
-    def get_project_data(self, board_id, project_key, version=None):
+    def get_project_data(self, board_id, project_key, max_results=1, version=None):
         """
-        Returns the project data from Jira API using project_key and BoardId.
+        Returns the project data from Jira API using project_key and BoardId. Only max_results projects are requested.
 
         According to the JIRA API documentation, https://developer.atlassian.com/cloud/jira/software/rest/api-group-board/#api-agile-1-0-board-boardid-project-get
         """
@@ -84,10 +104,13 @@ class Jira:
 
         URL = f"{self._base_url}/agile/{version}/board/{board_id}/project"
 
-        response = requests.get(
-            url=URL,
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="board_project",
             auth=self.auth,
-            params={"projectKeyOrId": project_key},
+            params={"projectKeyOrId": project_key, "maxResults": max_results},
         )
 
         if response.status_code != HTTPStatus.OK:
@@ -98,10 +121,13 @@ class Jira:
 
         return response.json()
 
-    def get_issue_types_data(self, project_key, version=None):
+    def get_issue_types_data(self, project_key, issue_type_names=None, expand=None, version=None):
         """
         Returns the issue type from Jira API using project_key.
 
+        Only the issue types in issue_type_names are requested, all of them when it is None.
+        Issue type fields are not included unless expand asks for them (e.g. "projects.issuetypes.fields").
+
         According to the JIRA API documentation, https://developer.atlassian.com/cloud/jira/platform/rest/v3/api-group-issues/#api-rest-api-3-issue-createmeta-get
         """
         if version is None:
@@ -109,10 +135,19 @@ class Jira:
 
         URL = f"{self._base_url}/api/{version}/issue/createmeta"
 
-        response = requests.get(
-            url=URL,
+        params = {"projectKeys": project_key}
+        if issue_type_names is not None:
+            params["issuetypeNames"] = ",".join(issue_type_names)
+        if expand is not None:
+            params["expand"] = expand
+
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="createmeta",
             auth=self.auth,
-            params={"projectKeys": project_key},
+            params=params,
         )
 
         if response.status_code != HTTPStatus.OK:
@@ -124,29 +159,79 @@ class Jira:
     def prepare_jira(self):
         """
         Prepares the Jira object for further usage.
+
+        The prepared metadata is replaced only once every request succeeded, so a failed
+        refresh keeps the previous state.
         """
         # TODO: add logging
-        board_data = self.get_board_data(project_key=self.config["project_key"])
-        self.board.update_from_dict(board_data["values"][0])
+        board_data = self.get_board_data(project_key=self.project_key)
+        board = Board.from_dict(board_data["values"][0])
 
         project_data = self.get_project_data(
-            board_id=self.board.id, project_key=self.config["project_key"]
+            board_id=board.id, project_key=self.project_key
         )
-        self.project.update_from_dict(project_data["values"][0])
+        project = Project.from_dict(project_data["values"][0])
 
         issue_types_data = self.get_issue_types_data(
-            project_key=self.config["project_key"]
+            project_key=self.project_key,
+            issue_type_names=[self.config["default_issue_type"]],
         )
+        default_issue_type = self.default_issue_type
+        issue_types = []
         for issue_type_data in issue_types_data["projects"][0]["issuetypes"]:
-            issue_type = IssueType()
-            issue_type.update_from_dict(issue_type_data)
+            issue_type = IssueType.from_dict(issue_type_data)
             if issue_type.name == self.config["default_issue_type"]:
-                self.default_issue_type = issue_type
-            self.issue_types.append(issue_type)
+                default_issue_type = issue_type
+            issue_types.append(issue_type)
+
+        self.board = board
+        self.project = project
+        self.issue_types = issue_types
+        self.default_issue_type = default_issue_type
+
+    def fork(self):
+        """
+        Returns a copy to create an issue with, sharing the prepared metadata and configuration.
+
+        new_issue keeps the sprint and issue it works on in the object, so concurrent calls
+        each need their own copy.
+        """
+        forked = copy.copy(self)
+        forked.sprint = Sprint()
+        forked.issue = Issue()
+        return forked
+
+    @property
+    def is_prepared(self):
+        """
+        Whether the project metadata needed to post issues is loaded.
+        """
+        return self.project.id is not None and self.default_issue_type.id is not None
+
+    def to_snapshot(self):
+        """
+        Returns the prepared metadata as a JSON serializable dictionary.
+        """
+        return {
+            "board": self.board.to_dict(),
+            "project": self.project.to_dict(),
+            "default_issue_type": self.default_issue_type.to_dict(),
+            "issue_types": [issue_type.to_dict() for issue_type in self.issue_types],
+        }
 
-    def get_active_sprint_data(self, board_id, version=None):
+    def load_snapshot(self, snapshot):
+        """
+        Loads the prepared metadata from a dictionary returned by to_snapshot.
+        """
+        self.board = Board.from_dict(snapshot["board"])
+        self.project = Project.from_dict(snapshot["project"])
+        self.issue_types = [IssueType.from_dict(data) for data in snapshot["issue_types"]]
+        self.default_issue_type = IssueType.from_dict(snapshot["default_issue_type"])
+
+    def get_active_sprint_data(self, board_id, max_results=1, version=None):
         """
         Returns the active sprint and updates values of Sprint object into the Jira object.
+        Only max_results sprints are requested.
 
         According to the JIRA API documentation, https://developer.atlassian.com/cloud/jira/software/rest/api-group-sprint/#api-agile-1-0-sprint-sprintid-get
         """
@@ -155,10 +240,13 @@ class Jira:
 
         URL = f"{self._base_url}/agile/{version}/board/{board_id}/sprint"
 
-        response = requests.get(
-            url=URL,
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="board_sprint",
             auth=self.auth,
-            params={"state": "active"},
+            params={"state": "active", "maxResults": max_results},
         )
 
         if response.status_code != HTTPStatus.OK:
@@ -190,23 +278,7 @@ class Jira:
                 "issuetype": {
                     "id": self.default_issue_type.id,
                 },
-                "description": {
-                    "type": "doc",
-                    "version": 1,
-                    "content": [
-                        {
-                            "type": "paragraph",
-                            "content": [
-                                {
-                                    #TODO: parse Markdown to Atlassian Document Format
-                                    # https://developer.atlassian.com/cloud/jira/platform/apis/document/structure/#atlassian-document-format
-                                    "text": content,
-                                    "type": "text",
-                                }
-                            ],
-                        }
-                    ],
-                },
+                "description": markdown_to_adf(content),
                 "labels": self.labels,
             },
         }
@@ -216,8 +288,11 @@ class Jira:
 
         URL = f"{self._base_url}/api/{version}/issue"
 
-        response = requests.post(
-            url=URL,
+        response = transport.request(
+            "POST",
+            URL,
+            upstream="jira",
+            endpoint="issue_create",
             auth=self.auth,
             json=payload,
             headers=headers,
@@ -233,12 +308,55 @@ class Jira:
         """
         Parses the issue data and updates values of Issue object into the Jira object.
         """
-        self.issue = Issue()
-        self.issue.update_from_dict(issue_data)
+        self.issue = Issue.from_dict(issue_data)
+
+    def update_issue(self, issue_key, title=None, content=None, version=None):
+        """
+        Updates the summary and/or description of an issue. Returns None.
+
+        According to the JIRA API documentation, https://developer.atlassian.com/cloud/jira/platform/rest/v3/api-group-issues/#api-rest-api-3-issue-issueidorkey-put
+        """
+        if version is None:
+            version = self._cpd_api_version
+
+        URL = f"{self._base_url}/api/{version}/issue/{issue_key}"
+
+        fields = {}
+        if title is not None:
+            fields["summary"] = title
+        if content is not None:
+            fields["description"] = markdown_to_adf(content)
+
+        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+        response = transport.request(
+            "PUT",
+            URL,
+            upstream="jira",
+            endpoint="issue_update",
+            auth=self.auth,
+            json={"fields": fields},
+            headers=headers,
+        )
+
+        if response.status_code != HTTPStatus.NO_CONTENT:
+            msg = f"Error while updating issue: {response.status_code} - {response.text}"
+            raise JiraException(msg)
+
+        return
+
+    def find_issue_key(self, text):
+        """
+        Returns the key of the first issue of the project whose description contains text, None when there is none.
+        """
+        jql = f'project = {self.project_key} AND description ~ "\\"{text}\\""'
+        for issue in self.search_issues(jql=jql, fields=("summary",), page_size=1, prefetch=False):
+            return issue.key
+        return None
 
-    def get_issue_data(self, issue_key, version=None):
+    def get_issue_data(self, issue_key, fields=DEFAULT_ISSUE_FIELDS, expand=None, version=None):
         """
-        Returns the issue data from Jira API using project_key.
+        Returns the issue data from Jira API using issue_key, with only the requested fields.
+        Use fields=("*all",) to get every field.
 
         According to the JIRA API documentation, https://developer.atlassian.com/cloud/jira/platform/rest/v3/api-group-issues/#api-rest-api-3-issue-issueidorkey-get
         """
@@ -247,9 +365,17 @@ class Jira:
 
         URL = f"{self._base_url}/api/{version}/issue/{issue_key}"
 
-        response = requests.get(
-            url=URL,
+        params = {"fields": ",".join(fields)}
+        if expand is not None:
+            params["expand"] = expand
+
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="issue",
             auth=self.auth,
+            params=params,
         )
 
         if response.status_code != HTTPStatus.OK:
@@ -258,6 +384,73 @@ class Jira:
 
         return response.json()
 
+    def get_search_page_data(self, jql, fields, start_at=0, max_results=100, version=None):
+        """
+        Returns one page of issues matching jql, with only the requested fields.
+
+        According to the JIRA API documentation, https://developer.atlassian.com/cloud/jira/platform/rest/v3/api-group-issue-search/#api-rest-api-3-search-get
+        """
+        if version is None:
+            version = self._cpd_api_version
+
+        URL = f"{self._base_url}/api/{version}/search"
+
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="search",
+            auth=self.auth,
+            params={
+                "jql": jql,
+                "fields": ",".join(fields),
+                "startAt": start_at,
+                "maxResults": max_results,
+            },
+        )
+
+        if response.status_code != HTTPStatus.OK:
+            msg = f"Error while searching issues: {response.status_code} - {response.text}"
+            raise JiraException(msg)
+
+        return response.json()
+
+    def search_issues(self, jql, fields=("summary",), page_size=100, prefetch=True):
+        """
+        Yields an Issue for every issue matching jql, holding only the requested fields.
+
+        Pages are requested with startAt/maxResults. When prefetch is set, the next page is
+        requested while the current one is being consumed.
+        """
+        fields = list(fields)
+
+        def fetch(start_at):
+            return self.get_search_page_data(
+                jql=jql, fields=fields, start_at=start_at, max_results=page_size
+            )
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page = fetch(0)
+            while True:
+                issues = page["issues"]
+                next_start = page["startAt"] + len(issues)
+                has_next = issues and next_start < page["total"]
+
+                next_page = None
+                if has_next and prefetch:
+                    next_page = executor.submit(fetch, next_start)
+
+                for issue_data in issues:
+                    yield Issue(
+                        id=issue_data["id"],
+                        key=issue_data["key"],
+                        fields=issue_data.get("fields", {}),
+                    )
+
+                if not has_next:
+                    return
+                page = next_page.result() if next_page is not None else fetch(next_start)
+
     def delete_issue(self, issue_key, version=None):
         """
         Deletes the issue data from Jira API using issue_key.
@@ -269,8 +462,11 @@ class Jira:
 
         URL = f"{self._base_url}/api/{version}/issue/{issue_key}"
 
-        response = requests.delete(
-            url=URL,
+        response = transport.request(
+            "DELETE",
+            URL,
+            upstream="jira",
+            endpoint="issue_delete",
             auth=self.auth,
         )
 
@@ -278,11 +474,14 @@ class Jira:
             msg = f"Error while getting issue: {response.status_code} - {response.text}"
             raise JiraException(msg)
 
+        if self.workload is not None:
+            self.workload.close(issue_key)
+
         return
 
     def add_comment_to_issue(self, issue_key, comment, version=None):
         """
-        Adds a comment to the issue. Returns response object.
+        Adds a comment to the issue. comment is a Markdown text or an ADF document. Returns response object.
 
         According to the JIRA API documentation, https://developer.atlassian.com/cloud/jira/platform/rest/v3/api-group-issue-comments/#api-rest-api-3-issue-issueidorkey-comment-post
         """
@@ -292,20 +491,14 @@ class Jira:
         URL = f"{self._base_url}/api/{version}/issue/{issue_key}/comment"
 
         headers = {"Accept": "application/json", "Content-Type": "application/json"}
-        payload = {
-            "body": {
-                "type": "doc",
-                "version": 1,
-                "content": [
-                    {
-                        "type": "paragraph",
-                        "content": [{"text": comment, "type": "text"}],
-                    }
-                ],
-            }
-        }
-        response = requests.post(
-            url=URL,
+        if isinstance(comment, str):
+            comment = markdown_to_adf(comment)
+        payload = {"body": comment}
+        response = transport.request(
+            "POST",
+            URL,
+            upstream="jira",
+            endpoint="issue_comment",
             auth=self.auth,
             json=payload,
             headers=headers,
@@ -319,6 +512,38 @@ class Jira:
 
         return response.json()
 
+    def add_attachment_to_issue(self, issue_key, body, version=None):
+        """
+        Uploads an attachment to the issue. body is a MultipartFile, streamed to Jira. Returns response object.
+
+        According to the JIRA API documentation, https://developer.atlassian.com/cloud/jira/platform/rest/v3/api-group-issue-attachments/#api-rest-api-3-issue-issueidorkey-attachments-post
+        """
+        if version is None:
+            version = self._cpd_api_version
+
+        URL = f"{self._base_url}/api/{version}/issue/{issue_key}/attachments"
+
+        headers = {
+            "Accept": "application/json",
+            "Content-Type": body.content_type,
+            "X-Atlassian-Token": "no-check",
+        }
+        response = transport.request(
+            "POST",
+            URL,
+            upstream="jira",
+            endpoint="issue_attachments",
+            auth=self.auth,
+            data=body,
+            headers=headers,
+        )
+
+        if response.status_code != HTTPStatus.OK:
+            msg = f"Error while adding attachment: {response.status_code} - {response.text}"
+            raise JiraException(msg)
+
+        return response.json()
+
     def get_issue_transitions(self, issue_key, version=None):
         """
         Get issue possible Transitions. Returns response object.
@@ -330,8 +555,11 @@ class Jira:
 
         URL = f"{self._base_url}/api/{version}/issue/{issue_key}/transitions"
 
-        response = requests.get(
-            url=URL,
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="issue_transitions",
             auth=self.auth,
         )
 
@@ -341,6 +569,15 @@ class Jira:
 
         return response.json()
 
+    @property
+    def workload(self):
+        """
+        The open issue index of the project, None unless assignment is workload.
+        """
+        if self.assignment != WORKLOAD:
+            return None
+        return get_index(self._base_url, self.project_key)
+
     def get_transition(self, transitions_data, transition_name):
         """
         Parses the transitions data and returns values of Transition object.
@@ -364,8 +601,11 @@ class Jira:
 
         headers = {"Accept": "application/json", "Content-Type": "application/json"}
         payload = {"transition": {"id": transition["id"]}}
-        response = requests.post(
-            url=URL,
+        response = transport.request(
+            "POST",
+            URL,
+            upstream="jira",
+            endpoint="issue_transition",
             auth=self.auth,
             json=payload,
             headers=headers,
@@ -375,6 +615,11 @@ class Jira:
             msg = f"Error while setting transition: {response.status_code} - {response.text}"
             raise JiraException(msg)
 
+        # Transitions list their target status, reopening ones are caught by the next refresh
+        done = (transition.get("to") or {}).get("statusCategory", {}).get("key") == "done"
+        if self.workload is not None and done:
+            self.workload.close(issue_key)
+
         return
 
     def move_issue_to_sprint(self, issue_key, sprint_id, version=None):
@@ -394,8 +639,11 @@ class Jira:
                 issue_key,
             ]
         }
-        response = requests.post(
-            url=URL,
+        response = transport.request(
+            "POST",
+            URL,
+            upstream="jira",
+            endpoint="sprint_issue",
             auth=self.auth,
             json=payload,
             headers=headers,
@@ -418,8 +666,11 @@ class Jira:
             "Accept": "application/json",
             "Content-Type": "application/json",
         }
-        response = requests.get(
-            f"https://api.opsgenie.com/v2/schedules/{OPSGENIE_SCHEDULE_NAME}/on-calls",
+        response = transport.request(
+            "GET",
+            f"{self._opsgenie_base_url}/schedules/{OPSGENIE_SCHEDULE_NAME}/on-calls",
+            upstream="opsgenie",
+            endpoint="on_calls",
             headers=headers,
             params={"scheduleIdentifierType": "name"},
         )
@@ -447,8 +698,11 @@ class Jira:
 
         URL = f"{self._base_url}/api/{version}/user/assignable/search"
 
-        response = requests.get(
-            url=URL,
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="user_assignable",
             auth=self.auth,
             params={"issueKey": issue_key},
         )
@@ -459,6 +713,42 @@ class Jira:
 
         return response.json()
 
+    def get_assignable_users_for_project_data(
+        self, project_key, start_at=0, max_results=1000, version=None
+    ):
+        """
+        Returns a page of the users issues of project_key can be assigned to.
+
+        According to the Jira API documentation, https://developer.atlassian.com/cloud/jira/platform/rest/v3/api-group-user-search/#api-rest-api-3-user-assignable-search-get
+        """
+        if version is None:
+            version = self._cpd_api_version
+
+        URL = f"{self._base_url}/api/{version}/user/assignable/search"
+
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="user_assignable",
+            auth=self.auth,
+            params={"project": project_key, "startAt": start_at, "maxResults": max_results},
+        )
+
+        if response.status_code != HTTPStatus.OK:
+            msg = f"Error while getting assignable users: {response.status_code} - {response.text}"
+            raise JiraException(msg)
+
+        return response.json()
+
+    def pick_least_loaded_user(self, issue_key):
+        """
+        Returns the account id of the assignable user with the fewest open issues in the
+        project, recording issue_key as theirs. None when the project has no assignable user.
+        """
+        self.workload.sync(self)
+        return self.workload.assign_least_loaded(issue_key)
+
     def assign_issue_to_user(self, issue_key, user_account_id, version=None):
         """
         Assigns issue to user. Returns None.
@@ -474,8 +764,11 @@ class Jira:
         payload = {
             "accountId": user_account_id,
         }
-        response = requests.put(
-            url=URL,
+        response = transport.request(
+            "PUT",
+            URL,
+            upstream="jira",
+            endpoint="issue_assignee",
             auth=self.auth,
             json=payload,
             headers=headers,
@@ -485,6 +778,9 @@ class Jira:
             msg = f"Error while assigning issue to user: {response.status_code} - {response.text}"
             raise JiraException(msg)
 
+        if self.workload is not None:
+            self.workload.assign(issue_key, user_account_id)
+
         return
 
     def get_user_data(self, email, version=None):
@@ -498,8 +794,11 @@ class Jira:
 
         URL = f"{self._base_url}/api/{version}/user/search"
 
-        response = requests.get(
-            url=URL,
+        response = transport.request(
+            "GET",
+            URL,
+            upstream="jira",
+            endpoint="user_search",
             auth=self.auth,
             params={"query": email},
         )
@@ -510,34 +809,104 @@ class Jira:
 
         return response.json()
 
-    def new_issue(self, title, content, on_call=False):
+    def new_issue(self, title, content, on_call=False, mirror_assets=False, journal=None):
         """
-        Receives a title and content and creates a new issue to active sprint and assign it to a random user. Returns the issue key.
+        Receives a title and content and creates a new issue to active sprint and assign it to a random user,
+        or the least loaded one when the assignment setting is workload. Returns the issue key.
+
+        With mirror_assets, files uploaded to GitHub and linked in content are attached to the issue.
+
+        Every completed step is recorded in journal, when given. Calling new_issue again with the
+        same journal after a failure resumes from the first unfinished step, instead of creating
+        another issue. Use abandon_new_issue to give up and delete the half created issue.
         """
+        if journal is None:
+            journal = Journal()
+
+        with tracing.span("new_issue", project=self.project_key):
+            self._new_issue_steps(title, content, on_call, mirror_assets, journal)
+
+        journal.complete()
+        return self.issue.key
+
+    def _new_issue_steps(self, title, content, on_call, mirror_assets, journal):
         # Get **Active Sprint** from *Board*
-        sprint_data = self.get_active_sprint_data(board_id=self.board.id)
-        self.parse_sprint_data(sprint_data=sprint_data)
+        if "sprint" in journal:
+            self.sprint = Sprint(id=journal.get("sprint"))
+        else:
+            with tracing.span("new_issue.sprint"):
+                sprint_data = self.get_active_sprint_data(board_id=self.board.id)
+                self.parse_sprint_data(sprint_data=sprint_data)
+            journal.record("sprint", self.sprint.id)
 
-        # FIXME: make this transaction atomic (if something went wrong, delete the issue)
         # Post **Issue** to *Project* backlog
-        issue_data = self.post_issue_to_backlog(title=title, content=content)
-        self.parse_issue_data(issue_data=issue_data)
+        if "created" in journal:
+            self.issue = Issue(key=journal.get("created"))
+        else:
+            with tracing.span("new_issue.post"):
+                issue_data = self.post_issue_to_backlog(title=title, content=content)
+                self.parse_issue_data(issue_data=issue_data)
+            journal.record("created", self.issue.key)
 
         # Move **Issue** to *Active Sprint*
-        self.move_issue_to_sprint(issue_key=self.issue.key, sprint_id=self.sprint.id)
+        if "moved" not in journal:
+            with tracing.span("new_issue.move", issue=self.issue.key):
+                self.move_issue_to_sprint(issue_key=self.issue.key, sprint_id=self.sprint.id)
+            journal.record("moved")
 
         # Assign **Issue** to *User*
         # if usermail is not provided, then search in OpsGenie who is on-call
-        if on_call:
-            users_data = self.get_on_call_users_data()
-            users = self.parse_on_call_users_data(on_call_users_data=users_data)
-            self.assign_issue_to_user(
-                issue_key=self.issue.key, user_account_id=users[0]["emailAddress"]
-            )
-        else:
-            users_data = self.get_assignable_users_for_issue_data(issue_key=self.issue.key)
-            user = random.choice(users_data)
-            self.assign_issue_to_user(
-                issue_key=self.issue.key, user_account_id=user["accountId"]
-            )
-        return self.issue.key
\ No newline at end of file
+        if "assigned" not in journal:
+            with tracing.span("new_issue.assign", issue=self.issue.key, on_call=on_call):
+                if on_call:
+                    users_data = self.get_on_call_users_data()
+                    users = self.parse_on_call_users_data(on_call_users_data=users_data)
+                    user_account_id = users[0]["emailAddress"]
+                else:
+                    user_account_id = None
+                    if self.assignment == WORKLOAD:
+                        user_account_id = self.pick_least_loaded_user(issue_key=self.issue.key)
+                    if user_account_id is None:
+                        users_data = self.get_assignable_users_for_issue_data(issue_key=self.issue.key)
+                        user_account_id = random.choice(users_data)["accountId"]
+                try:
+                    self.assign_issue_to_user(
+                        issue_key=self.issue.key, user_account_id=user_account_id
+                    )
+                except Exception:
+                    # The issue was counted for the picked user
+                    if self.workload is not None:
+                        self.workload.close(self.issue.key)
+                    raise
+            journal.record("assigned", user_account_id)
+
+        if mirror_assets and "attached" not in journal:
+            with tracing.span("new_issue.attach", issue=self.issue.key):
+                self.mirror_assets(issue_key=self.issue.key, content=content)
+            journal.record("attached")
+
+    def abandon_new_issue(self, journal):
+        """
+        Gives up on a new_issue journal, deleting the issue if it was already created.
+        """
+
+        def compensate(steps):
+            if "created" in steps:
+                self.delete_issue(issue_key=steps["created"])
+
+        journal.abandon(compensate=compensate)
+
+    def mirror_assets(self, issue_key, content):
+        """
+        Attaches the files uploaded to GitHub and linked in content to the issue. Returns the attachment ids.
+
+        Limits are read from the optional attachments section of the configuration.
+        """
+        settings = self.config.get("attachments") or {}
+        return mirror_assets(
+            jira=self,
+            issue_key=issue_key,
+            content=content,
+            max_size=settings.get("max_size", DEFAULT_MAX_SIZE),
+            max_workers=settings.get("max_workers", DEFAULT_MAX_WORKERS),
+        )
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""
+This module contains the mirroring of assets linked in GitHub issues to Jira attachments.
+
+Assets are downloaded in chunks to a temporary file while being hashed, and uploaded from
+it as a streamed multipart body, so a whole file is never held in memory. An asset is
+uploaded once per issue, whatever the number of links or redeliveries pointing to it.
+"""
+import contextvars
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+from gitssues import transport
+from gitssues.adf import markdown_to_adf
+from gitssues.state import get_state
+
+
+logger = logging.getLogger(__name__)
+
+# Where GitHub serves the files uploaded to issues from
+DEFAULT_PREFIXES = (
+    "https://user-images.githubusercontent.com/",
+    "https://private-user-images.githubusercontent.com/",
+    "https://github.com/user-attachments/",
+    "https://objects.githubusercontent.com/",
+)
+DEFAULT_MAX_SIZE = 500 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 4
+CHUNK_SIZE = 64 * 1024
+# Seconds an uploaded attachment is remembered, longer than GitHub redelivers an event
+ATTACHMENT_TTL = 30 * 24 * 3600
+
+
+class AssetTooLarge(Exception):
+    pass
+
+
+class MultipartFile:
+    """
+    Iterable multipart/form-data body with a single file part, read in chunks.
+
+    It has a length, so requests sends a Content-Length header instead of a chunked body.
+    """
+
+    def __init__(self, fileobj, filename, size, chunk_size=CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+        safe_filename = filename.replace('"', "")
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{safe_filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self._size = size
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self._head) + self._size + len(self._tail)
+
+    def __iter__(self):
+        yield self._head
+        while True:
+            chunk = self.fileobj.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        yield self._tail
+
+
+def is_asset(url, prefixes=DEFAULT_PREFIXES):
+    """
+    Whether url points to a file uploaded to GitHub, either under one of prefixes or
+    attached to a repo (github.com/owner/repo/files/...).
+    """
+    if url.startswith(prefixes):
+        return True
+    parsed = urlparse(url)
+    return parsed.hostname == "github.com" and parsed.path.split("/")[3:4] == ["files"]
+
+
+def iter_asset_urls(content, prefixes=DEFAULT_PREFIXES):
+    """
+    Yields the URLs of the uploaded files linked or embedded in a Markdown content, once each.
+    """
+    seen = set()
+    nodes = list(markdown_to_adf(content)["content"])
+    while nodes:
+        node = nodes.pop()
+        urls = []
+        if node.get("type") == "media":
+            urls.append(node["attrs"]["url"])
+        for mark in node.get("marks", ()):
+            if mark["type"] == "link":
+                urls.append(mark["attrs"]["href"])
+        nodes.extend(node.get("content", ()))
+
+        for url in urls:
+            if url not in seen and is_asset(url, prefixes=prefixes):
+                seen.add(url)
+                yield url
+
+
+def download(url, fileobj, max_size=DEFAULT_MAX_SIZE, chunk_size=CHUNK_SIZE):
+    """
+    Streams url into fileobj. Returns the sha256 hex digest and size of the content.
+    Raises AssetTooLarge as soon as the content exceeds max_size.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with transport.request(
+        "GET", url, upstream="github", endpoint="asset", stream=True, timeout=30
+    ) as response:
+        response.raise_for_status()
+        length = response.headers.get("Content-Length")
+        if length is not None and int(length) > max_size:
+            raise AssetTooLarge(f"{url} is {length} bytes")
+
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            size += len(chunk)
+            if size > max_size:
+                raise AssetTooLarge(f"{url} is over {max_size} bytes")
+            digest.update(chunk)
+            fileobj.write(chunk)
+
+    return digest.hexdigest(), size
+
+
+def mirror_asset(jira, issue_key, url, max_size=DEFAULT_MAX_SIZE, ttl=ATTACHMENT_TTL):
+    """
+    Uploads the asset at url as an attachment of issue_key, unless the same content was
+    already uploaded to it in the last ttl seconds. Returns the attachment id, None when the
+    asset was skipped.
+    """
+    filename = os.path.basename(urlparse(url).path) or "asset"
+    with tempfile.TemporaryFile() as f:
+        try:
+            digest, size = download(url, f, max_size=max_size)
+        except (AssetTooLarge, requests.RequestException) as e:
+            logger.warning(f"Skipping asset {url}: {e}")
+            return None
+
+        # Uploaded attachments are recorded in the shared state, by issue and content hash
+        state_key = f"attachment:{issue_key}:{digest}"
+        attachment_id = get_state().get(state_key)
+        if attachment_id is not None:
+            return attachment_id
+
+        f.seek(0)
+        attachments = jira.add_attachment_to_issue(
+            issue_key=issue_key, body=MultipartFile(f, filename=filename, size=size)
+        )
+
+    attachment_id = attachments[0]["id"]
+    get_state().set(state_key, attachment_id, ttl=ttl)
+    return attachment_id
+
+
+def mirror_assets(
+    jira,
+    issue_key,
+    content,
+    prefixes=DEFAULT_PREFIXES,
+    max_size=DEFAULT_MAX_SIZE,
+    max_workers=DEFAULT_MAX_WORKERS,
+):
+    """
+    Mirrors every asset linked in content to issue_key, max_workers at a time.
+    Returns the attachment ids.
+    """
+    urls = list(iter_asset_urls(content, prefixes=prefixes))
+    if not urls:
+        return []
+
+    def mirror(url, context):
+        return context.run(mirror_asset, jira, issue_key, url, max_size=max_size)
+
+    # Every download runs in a copy of the caller context, so its spans join the current trace
+    contexts = [contextvars.copy_context() for _ in urls]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        ids = executor.map(mirror, urls, contexts)
+        return [attachment_id for attachment_id in ids if attachment_id is not None]
@@ -23,6 +23,9 @@ def new(
     on_call: bool = typer.Option(
         False, help="Get who's on-call from OpsGenie Schedule."
     ),
+    mirror_assets: bool = typer.Option(
+        False, help="Attach the files uploaded to GitHub and linked in content."
+    ),
 ):
     jira = None
 
@@ -37,7 +40,9 @@ def new(
         github = gitssues["github"]
         jira = gitssues["jira"]
 
-    jira.new_issue(title=title, content=content, on_call=on_call)
+    jira.new_issue(
+        title=title, content=content, on_call=on_call, mirror_assets=mirror_assets
+    )
 
     typer.echo(
         f"Issue {jira.issue.key} created and assigned! "
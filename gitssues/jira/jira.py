@@ -1,40 +1,99 @@
 """
 This module contains the Jira abstractions and helper classes.
 """
-from abc import ABC
-from dataclasses import dataclass
-
-from gitssues.helpers import dict_to_dataclass
 
 
 class BaseJira:
+    """
+    Base class for the Jira models.
+
+    Every model declares its fields in __slots__, so instances hold no __dict__ and any
+    other key of an API response is dropped.
+
+    Models compare equal when their fields are. They are mutable, so like the dataclasses
+    they replaced they are not hashable.
+    """
+
+    __slots__ = ()
+    __hash__ = None
+
+    def __init__(self, **kwargs):
+        unknown = kwargs.keys() - set(self.__slots__)
+        if unknown:
+            raise TypeError(f"{type(self).__name__} got unexpected fields {sorted(unknown)}")
+
+        for name in self.__slots__:
+            setattr(self, name, kwargs.get(name))
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates the object from an API response dictionary.
+        """
+        obj = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(obj, name, data.get(name))
+        return obj
+
     def update_from_dict(self, data):
         """
         Updates the object with the data from a dictionary.
         """
-        dict_to_dataclass(self, data)
+        for name in self.__slots__:
+            if name in data:
+                setattr(self, name, data[name])
+
+    def to_dict(self):
+        """
+        Returns the fields of the object as a dictionary.
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.__getstate__() == other.__getstate__()
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
 
 
-@dataclass
 class Project(BaseJira):
-    key: str = None
+    __slots__ = ("id", "key", "name")
+    id: str
+    key: str
+    name: str
 
 
-@dataclass
 class Board(BaseJira):
-    id: str = None
+    __slots__ = ("id", "name")
+    id: int
+    name: str
 
 
-@dataclass
 class Sprint(BaseJira):
-    id: str = None
+    __slots__ = ("id", "name", "state")
+    id: int
+    name: str
+    state: str
 
 
-@dataclass
 class IssueType(BaseJira):
-    name: str = None
+    __slots__ = ("id", "name")
+    id: str
+    name: str
 
 
-@dataclass
 class Issue(BaseJira):
-    key: str = None
+    __slots__ = ("id", "key", "fields")
+    id: str
+    key: str
+    fields: dict
@@ -0,0 +1,215 @@
+"""
+This module contains the open issue index used to assign new issues to the least loaded user.
+
+The index is seeded once from a search of the open issues of the project, then kept up to
+date from the assignments and transitions made by gitssues, and from a search of the
+issues updated since the last sync, at most every refresh interval. Picking a user needs
+no Jira request.
+
+Users are kept in a heap of (open issues, account id). Every change pushes a new entry
+instead of updating the old one, which is skipped when it reaches the top, so picking a
+user and recording an assignment are both O(log n).
+"""
+import math
+import threading
+import time
+from collections import Counter
+from heapq import heapify, heappop, heappush
+
+
+RANDOM = "random"
+WORKLOAD = "workload"
+# Seconds between two searches of the issues updated in Jira by someone else
+REFRESH_INTERVAL = 300
+OPEN_ISSUES_JQL = "project = {project_key} AND statusCategory != Done AND assignee is not EMPTY"
+# Relative dates don't depend on the time zone of the Jira user
+UPDATED_ISSUES_JQL = 'project = {project_key} AND updated >= "-{minutes}m"'
+
+
+def is_done(fields):
+    status = fields.get("status") or {}
+    return (status.get("statusCategory") or {}).get("key") == "done"
+
+
+class WorkloadIndex:
+    def __init__(self, project_key=None, refresh_interval=REFRESH_INTERVAL):
+        self.project_key = project_key
+        self.refresh_interval = refresh_interval
+        self.synced_at = None
+        self._members = set()
+        # Open issue key -> assignee account id
+        self._assignees = {}
+        self._counts = Counter()
+        self._heap = []
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._assignees)
+
+    def load(self, account_id):
+        """
+        Returns the number of open issues assigned to account_id.
+        """
+        return self._counts[account_id]
+
+    def set_members(self, account_ids):
+        """
+        Sets the users issues can be assigned to.
+        """
+        with self._lock:
+            self._members = set(account_ids)
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(self._counts[account_id], account_id) for account_id in self._members]
+        heapify(self._heap)
+
+    def _push(self, account_id):
+        if account_id in self._members:
+            heappush(self._heap, (self._counts[account_id], account_id))
+            # Stale entries are dropped once they outnumber the live ones
+            if len(self._heap) > 4 * len(self._members) + 64:
+                self._rebuild()
+
+    def _assign(self, issue_key, account_id):
+        previous = self._assignees.get(issue_key)
+        if previous == account_id:
+            return
+        if previous is not None:
+            self._counts[previous] -= 1
+            if not self._counts[previous]:
+                del self._counts[previous]
+            self._push(previous)
+        if account_id is None:
+            del self._assignees[issue_key]
+            return
+
+        self._assignees[issue_key] = account_id
+        self._counts[account_id] += 1
+        self._push(account_id)
+
+    def _least_loaded(self):
+        while self._heap:
+            count, account_id = self._heap[0]
+            if account_id in self._members and count == self._counts[account_id]:
+                return account_id
+            heappop(self._heap)
+        return None
+
+    def assign(self, issue_key, account_id):
+        """
+        Records that the open issue_key is assigned to account_id, None when it is unassigned.
+        """
+        with self._lock:
+            self._assign(issue_key, account_id)
+
+    def close(self, issue_key):
+        """
+        Records that issue_key is done or deleted.
+        """
+        self.assign(issue_key, None)
+
+    def least_loaded(self):
+        """
+        Returns the account id of the member with the fewest open issues, None without members.
+        """
+        with self._lock:
+            return self._least_loaded()
+
+    def assign_least_loaded(self, issue_key):
+        """
+        Records issue_key as assigned to the least loaded member, returning its account id.
+        Concurrent calls never pick a user from the same state.
+        """
+        with self._lock:
+            account_id = self._least_loaded()
+            if account_id is not None:
+                self._assign(issue_key, account_id)
+            return account_id
+
+    def sync(self, jira):
+        """
+        Seeds the index from jira on first use, then applies the issues updated in Jira once
+        refresh_interval passed.
+        """
+        with self._sync_lock:
+            if self.synced_at is None:
+                self.seed(jira)
+            elif time.time() - self.synced_at >= self.refresh_interval:
+                self.refresh(jira)
+
+    def seed(self, jira):
+        """
+        Rebuilds the index from the assignable users and the open issues of the project.
+        """
+        started = time.time()
+        members = list(iter_assignable_account_ids(jira, self.project_key))
+        assignees = {}
+        jql = OPEN_ISSUES_JQL.format(project_key=self.project_key)
+        for issue in jira.search_issues(jql=jql, fields=("assignee",)):
+            assignees[issue.key] = issue.fields["assignee"]["accountId"]
+
+        with self._lock:
+            self._members = set(members)
+            self._assignees = assignees
+            self._counts = Counter(assignees.values())
+            self._rebuild()
+        self.synced_at = started
+
+    def refresh(self, jira):
+        """
+        Applies the assignee and status changes made in Jira since the last sync.
+        """
+        started = time.time()
+        # A minute of overlap, updates are idempotent
+        minutes = math.ceil((started - self.synced_at) / 60) + 1
+        members = list(iter_assignable_account_ids(jira, self.project_key))
+        jql = UPDATED_ISSUES_JQL.format(project_key=self.project_key, minutes=minutes)
+        updates = []
+        for issue in jira.search_issues(jql=jql, fields=("assignee", "status")):
+            assignee = issue.fields.get("assignee")
+            if is_done(issue.fields) or not assignee:
+                updates.append((issue.key, None))
+            else:
+                updates.append((issue.key, assignee["accountId"]))
+
+        with self._lock:
+            self._members = set(members)
+            for issue_key, account_id in updates:
+                self._assign(issue_key, account_id)
+            self._rebuild()
+        self.synced_at = started
+
+
+def iter_assignable_account_ids(jira, project_key, page_size=1000):
+    """
+    Yields the account ids of the active users issues of project_key can be assigned to.
+    """
+    start_at = 0
+    while True:
+        users = jira.get_assignable_users_for_project_data(
+            project_key=project_key, start_at=start_at, max_results=page_size
+        )
+        for user in users:
+            if user.get("active", True):
+                yield user["accountId"]
+        if len(users) < page_size:
+            return
+        start_at += len(users)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(base_url, project_key):
+    """
+    Returns the WorkloadIndex of a Jira project, shared by every Jira object of the process.
+    """
+    key = (base_url, project_key)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(key, WorkloadIndex(project_key=project_key))
+    return index
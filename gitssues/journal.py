@@ -0,0 +1,91 @@
+"""
+This module contains the step journal of multi-step operations such as Jira.new_issue.
+
+Every completed step is recorded with its result, so a retry of the operation resumes from
+the first unfinished step instead of repeating writes. A journal that won't be retried can
+be abandoned, running a compensation for the steps already done.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+
+DEFAULT_DIRECTORY = "gitssues.journals"
+
+
+def journal_directory():
+    """
+    Returns the directory of the journals, GITSSUES_JOURNAL_DIR when set.
+    """
+    return os.getenv("GITSSUES_JOURNAL_DIR", DEFAULT_DIRECTORY)
+
+
+class Journal:
+    def __init__(self, path=None):
+        """
+        Loads the journal at path. Without path, the journal only lives in memory.
+        """
+        self.path = Path(path) if path is not None else None
+        self.steps = {}
+        if self.path is not None and self.path.exists():
+            with self.path.open() as f:
+                self.steps = json.load(f)
+
+    @classmethod
+    def for_key(cls, key, directory=DEFAULT_DIRECTORY):
+        """
+        Returns the journal of the operation identified by key, e.g. a webhook delivery id.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        safe_key = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+        return cls(path=directory / f"{safe_key}.json")
+
+    def __contains__(self, step):
+        return step in self.steps
+
+    def get(self, step, default=None):
+        return self.steps.get(step, default)
+
+    def record(self, step, value=True):
+        """
+        Records that step completed with value.
+        """
+        self.steps[step] = value
+        if self.path is None:
+            return
+
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with tmp.open("w") as f:
+            json.dump(self.steps, f)
+        os.replace(tmp, self.path)
+
+    def complete(self):
+        """
+        Marks the operation as done, discarding the journal.
+        """
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
+
+    def abandon(self, compensate=None):
+        """
+        Gives up on the operation. compensate is called with the recorded steps to undo them.
+        """
+        if compensate is not None and self.steps:
+            compensate(self.steps)
+        self.complete()
+
+
+def pending_journals(directory=DEFAULT_DIRECTORY, older_than=0):
+    """
+    Yields the journals in directory not modified for older_than seconds.
+    """
+    directory = Path(directory)
+    if not directory.exists():
+        return
+
+    now = time.time()
+    for path in sorted(directory.glob("*.json")):
+        if now - path.stat().st_mtime >= older_than:
+            yield Journal(path=path)
@@ -0,0 +1,160 @@
+"""
+This module contains the replay of recorded GitHub webhook deliveries against a running server.
+
+Deliveries are sent open-loop: each one leaves at its scheduled arrival time whether the
+previous ones were answered or not, and its latency is measured from that time. A slow
+server shows up as growing latencies instead of a lower sending rate.
+"""
+import itertools
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import requests
+
+from gitssues.recording import sign
+
+
+ARRIVALS = ("constant", "poisson", "recorded")
+
+
+def arrival_offsets(count, rate, arrival="constant", recorded_times=(), seed=None):
+    """
+    Returns the send times of count deliveries, in seconds from the start.
+
+    constant sends every 1/rate seconds and poisson at random with the same average rate.
+    recorded keeps the gaps between recorded_times, scaled to the average rate when given.
+    """
+    if arrival == "constant":
+        return [i / rate for i in range(count)]
+
+    if arrival == "poisson":
+        generator = random.Random(seed)
+        return list(itertools.accumulate(generator.expovariate(rate) for _ in range(count)))
+
+    if arrival == "recorded":
+        times = list(recorded_times)[:count]
+        offsets = [t - times[0] for t in times]
+        if rate is not None and len(offsets) > 1 and offsets[-1] > 0:
+            scale = (len(offsets) - 1) / rate / offsets[-1]
+            offsets = [offset * scale for offset in offsets]
+        return offsets
+
+    raise ValueError(f"Unknown arrival {arrival}, use one of {ARRIVALS}")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+@dataclass
+class LoadReport:
+    sent: int = 0
+    errors: int = 0
+    duration: float = 0.0
+    latencies: list = field(default_factory=list)
+    statuses: dict = field(default_factory=dict)
+
+    @property
+    def throughput(self):
+        return len(self.latencies) / self.duration if self.duration else 0.0
+
+    @property
+    def error_rate(self):
+        return self.errors / self.sent if self.sent else 0.0
+
+    def summary(self):
+        summary = {
+            "sent": self.sent,
+            "errors": self.errors,
+            "error_rate": self.error_rate,
+            "duration_seconds": self.duration,
+            "throughput_per_second": self.throughput,
+            "statuses": self.statuses,
+        }
+        if self.latencies:
+            for p in (50, 90, 99):
+                summary[f"p{p}_ms"] = percentile(self.latencies, p) * 1000
+            summary["max_ms"] = max(self.latencies) * 1000
+        return summary
+
+
+def replay(
+    deliveries,
+    url,
+    secret,
+    count=None,
+    rate=10.0,
+    arrival="constant",
+    concurrency=32,
+    timeout=30,
+    fresh_ids=True,
+    seed=None,
+):
+    """
+    Sends count recorded deliveries to url, signed with secret. Returns a LoadReport.
+
+    Deliveries are reused in order when count is larger than the recording, except with
+    the recorded arrival. With fresh_ids, every delivery gets a new X-GitHub-Delivery so
+    the server doesn't take it for a redelivery.
+    """
+    deliveries = list(deliveries)
+    if not deliveries:
+        raise ValueError("No deliveries to replay")
+    if count is None or arrival == "recorded":
+        count = min(count or len(deliveries), len(deliveries))
+
+    offsets = arrival_offsets(
+        count,
+        rate,
+        arrival=arrival,
+        recorded_times=[delivery["time"] for delivery in deliveries],
+        seed=seed,
+    )
+    report = LoadReport()
+    lock = threading.Lock()
+    sessions = threading.local()
+
+    def send(delivery, scheduled):
+        body = delivery["body"].encode()
+        headers = dict(delivery["headers"])
+        headers["X-Hub-Signature"] = sign(body, secret)
+        if fresh_ids:
+            headers["X-GitHub-Delivery"] = str(uuid.uuid4())
+
+        session = getattr(sessions, "session", None)
+        if session is None:
+            session = sessions.session = requests.Session()
+
+        try:
+            response = session.post(url, data=body, headers=headers, timeout=timeout)
+            status = str(response.status_code)
+            failed = response.status_code >= 400
+        except requests.RequestException as e:
+            status = type(e).__name__
+            failed = True
+
+        latency = time.perf_counter() - scheduled
+        with lock:
+            report.latencies.append(latency)
+            report.statuses[status] = report.statuses.get(status, 0) + 1
+            if failed:
+                report.errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for delivery, offset in zip(itertools.cycle(deliveries), offsets):
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, delivery, scheduled)
+            report.sent += 1
+
+    report.duration = time.perf_counter() - start
+    return report
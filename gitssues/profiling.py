@@ -0,0 +1,162 @@
+"""
+This module contains an opt-in sampling profiler for webhook deliveries and CLI commands.
+
+While enabled, a single background thread samples the stacks of the threads inside
+profile() every interval. Samples of fast requests are dropped, so a normal request only
+pays for registering its thread. Requests slower than the threshold, and a random share of
+the others, are written as folded stacks, one "frame;frame;frame count" line per stack,
+readable by flamegraph.pl and speedscope. The oldest profiles are deleted beyond max_bytes.
+
+Enabled with environment variables:
+
+    GITSSUES_PROFILE=1
+    GITSSUES_PROFILE_DIR=gitssues.profiles
+    GITSSUES_PROFILE_THRESHOLD_MS=1000
+    GITSSUES_PROFILE_SAMPLE_RATE=0
+    GITSSUES_PROFILE_INTERVAL_MS=10
+    GITSSUES_PROFILE_MAX_BYTES=52428800
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+
+DEFAULT_DIRECTORY = "gitssues.profiles"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+SUFFIX = ".folded"
+
+_unsafe = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class Profiler:
+    def __init__(
+        self,
+        directory=DEFAULT_DIRECTORY,
+        threshold=1.0,
+        sample_rate=0.0,
+        interval=0.01,
+        max_bytes=DEFAULT_MAX_BYTES,
+        enabled=True,
+    ):
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        # Thread id -> stack samples of the threads being profiled
+        self._active = {}
+        self._labels = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            directory=os.getenv("GITSSUES_PROFILE_DIR", DEFAULT_DIRECTORY),
+            threshold=float(os.getenv("GITSSUES_PROFILE_THRESHOLD_MS", "1000")) / 1000,
+            sample_rate=float(os.getenv("GITSSUES_PROFILE_SAMPLE_RATE", "0")),
+            interval=float(os.getenv("GITSSUES_PROFILE_INTERVAL_MS", "10")) / 1000,
+            max_bytes=int(os.getenv("GITSSUES_PROFILE_MAX_BYTES", str(DEFAULT_MAX_BYTES))),
+            enabled=os.getenv("GITSSUES_PROFILE", "0") == "1",
+        )
+
+    def _ensure_sampler(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._sample_loop, name="profiler", daemon=True
+                    )
+                    self._thread.start()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _fold(self, frame):
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return ";".join(labels)
+
+    def _sample_loop(self):
+        while True:
+            if not self._active:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[self._fold(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+    @contextmanager
+    def profile(self, name):
+        """
+        Profiles the block, writing it to a file named after name (e.g. the delivery id)
+        when it is slower than the threshold or sampled.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        self._ensure_sampler()
+        sampled = random.random() < self.sample_rate
+        thread_id = threading.get_ident()
+        samples = Counter()
+        with self._lock:
+            self._active[thread_id] = samples
+        self._wakeup.set()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                del self._active[thread_id]
+            if samples and (sampled or elapsed >= self.threshold):
+                self._write(name, elapsed, samples)
+
+    def _write(self, name, elapsed, samples):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        filename = f"{int(time.time())}-{_unsafe.sub('_', str(name))}-{int(elapsed * 1000)}ms{SUFFIX}"
+        lines = [f"{stack} {count}\n" for stack, count in samples.most_common()]
+        with (self.directory / filename).open("w") as f:
+            f.writelines(lines)
+        self._enforce_max_bytes()
+
+    def _enforce_max_bytes(self):
+        profiles = []
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Deleted by another worker
+                continue
+            profiles.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in profiles)
+        for _, size, path in sorted(profiles):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,96 @@
+"""
+This module contains the recording of GitHub webhook deliveries, replayed by `gitssues loadtest`.
+
+Deliveries are appended to a gzip file, one gzip member per delivery holding a JSON line
+with its arrival time, headers and body. Gzip readers read the members back to back, and
+each member is written at once, so several workers can append to the same file.
+
+Signatures and credentials are not recorded: only the headers in RECORDED_HEADERS are kept,
+body values with a sensitive key are redacted, and replays sign the bodies again.
+"""
+import gzip
+import hmac
+import json
+import os
+import re
+import threading
+import time
+
+
+DEFAULT_PATH = "gitssues.deliveries.jsonl.gz"
+RECORDED_HEADERS = (
+    "X-GitHub-Event",
+    "X-GitHub-Delivery",
+    "X-GitHub-Hook-ID",
+    "Content-Type",
+    "User-Agent",
+)
+REDACTED = "[redacted]"
+
+_sensitive = re.compile(r"token|secret|password|private_key|authorization", re.IGNORECASE)
+
+
+def redact(value):
+    """
+    Returns a copy of a JSON value with the values of sensitive keys redacted.
+    """
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if _sensitive.search(key) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def sign(body, secret, digestmod="sha1"):
+    """
+    Returns the X-Hub-Signature header of body, as GitHub computes it.
+    """
+    mac = hmac.new(secret.encode(), msg=body, digestmod=digestmod)
+    return f"{digestmod}={mac.hexdigest()}"
+
+
+class Recorder:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, headers, body):
+        """
+        Appends a delivery, given its request headers and raw JSON body.
+        """
+        try:
+            body = json.dumps(redact(json.loads(body)))
+        except ValueError:
+            # Not JSON, nothing we can redact, so it isn't kept
+            body = None
+
+        delivery = {
+            "time": time.time(),
+            "headers": {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+            "body": body,
+        }
+        member = gzip.compress((json.dumps(delivery) + "\n").encode())
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, member)
+            finally:
+                os.close(fd)
+
+
+def iter_recording(path=DEFAULT_PATH):
+    """
+    Yields the recorded deliveries, oldest first, as dictionaries with time, headers and body.
+    """
+    with gzip.open(path, "rt") as f:
+        try:
+            for line in f:
+                delivery = json.loads(line)
+                if delivery["body"] is not None:
+                    yield delivery
+        except EOFError:
+            # Last delivery cut short by a crash
+            return
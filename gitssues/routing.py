@@ -0,0 +1,160 @@
+"""
+This module contains the routing of GitHub repos to Jira projects.
+
+Routes are declared in the `routes` section of gitssues.yml:
+
+    routes:
+        - repo: owner/repo
+          labels:
+              - bug
+          project_key: TGS
+
+A route without repo matches any repo, one without labels matches any label. Issues that
+match no route go to the top level project_key.
+"""
+import threading
+from collections import OrderedDict
+
+from gitssues.warm import WarmState, snapshot_path
+
+
+ANY_REPO = "*"
+
+
+class Router:
+    """
+    Resolves the Jira project key of a GitHub issue from a precomputed index.
+
+    Lookups try, in order: repo and label, repo alone, any repo with the label, any repo
+    and any label, and the default project key.
+    """
+
+    def __init__(self, routes=(), default_project_key=None):
+        self.default_project_key = default_project_key
+        self._index = {}
+        for route in routes:
+            repo = route.get("repo", ANY_REPO)
+            for label in route.get("labels") or [None]:
+                # First declared route wins
+                self._index.setdefault((repo, label), route["project_key"])
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            routes=config.get("routes") or (),
+            default_project_key=config.get("project_key"),
+        )
+
+    def project_keys(self):
+        """
+        Returns the project keys issues can be routed to.
+        """
+        project_keys = set(self._index.values())
+        if self.default_project_key is not None:
+            project_keys.add(self.default_project_key)
+        return project_keys
+
+    def resolve(self, repo, labels=()):
+        """
+        Returns the Jira project key for an issue of repo with labels, None when there is none.
+        """
+        index = self._index
+        for label in labels:
+            project_key = index.get((repo, label))
+            if project_key is not None:
+                return project_key
+
+        project_key = index.get((repo, None))
+        if project_key is not None:
+            return project_key
+
+        for label in labels:
+            project_key = index.get((ANY_REPO, label))
+            if project_key is not None:
+                return project_key
+
+        project_key = index.get((ANY_REPO, None))
+        if project_key is not None:
+            return project_key
+
+        return self.default_project_key
+
+
+class JiraContexts:
+    """
+    Keeps one Jira object per project, prepared on first use.
+
+    At most max_size projects are kept, the least recently used one is evicted first.
+    Snapshots are kept in snapshot_dir, or in state when given.
+    """
+
+    def __init__(
+        self, factory, max_size=32, snapshot_dir=".", refresh_interval=3600, state=None
+    ):
+        self.factory = factory
+        self.max_size = max_size
+        self.snapshot_dir = snapshot_dir
+        self.refresh_interval = refresh_interval
+        self.state = state
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+        self.not_before = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._contexts)
+
+    def _get_warm_state(self, project_key):
+        with self._lock:
+            warm_state = self._contexts.get(project_key)
+            if warm_state is not None:
+                self.hits += 1
+                self._contexts.move_to_end(project_key)
+                return warm_state
+
+            self.misses += 1
+            warm_state = WarmState(
+                self.factory(project_key),
+                path=snapshot_path(project_key, directory=self.snapshot_dir),
+                refresh_interval=self.refresh_interval,
+                not_before=self.not_before,
+                state=self.state,
+            )
+            self._contexts[project_key] = warm_state
+            # Refreshed from the start, not only once the context served a request
+            warm_state.start_refresher()
+            while len(self._contexts) > self.max_size:
+                _, evicted = self._contexts.popitem(last=False)
+                evicted.stop()
+
+            return warm_state
+
+    def clear(self, not_before=None):
+        """
+        Drops every context, so the next requests build them from the current configuration.
+        With not_before, snapshots written before that timestamp are prepared again.
+        """
+        with self._lock:
+            if not_before is not None:
+                self.not_before = not_before
+            contexts = list(self._contexts.values())
+            self._contexts.clear()
+
+        for warm_state in contexts:
+            warm_state.stop()
+
+    def warm(self, project_keys):
+        """
+        Creates the contexts of project_keys, loading their snapshots, e.g. when a worker boots.
+        """
+        for project_key in project_keys:
+            self._get_warm_state(project_key).load()
+
+    def get(self, project_key):
+        """
+        Returns the prepared Jira object of project_key.
+        """
+        warm_state = self._get_warm_state(project_key)
+        warm_state.ensure_ready()
+        return warm_state.jira
@@ -0,0 +1,253 @@
+"""
+This module contains the scheduling of webhook work into priority lanes.
+
+Work is classified into lanes, from the highest priority: issue creation, close and
+transitions, then comments and edits. Every lane has its own workers. Workers of a lane
+also serve the lanes above it when they are idle, so a flood of comments never holds back
+a new issue, while new issues can use every worker.
+
+Within a lane, the repos share the workers by weighted fair queuing: each task gets a
+virtual finish time of 1 / weight after the previous task of its repo, and tasks run in
+that order. A noisy repo only delays its own backlog.
+
+A task waiting longer than the deadline of its lane runs next, ahead of the fair order
+and of the higher lanes, so lower lanes are late but never starved.
+
+Lanes and weights are set in the optional `scheduler` section of gitssues.yml:
+
+    scheduler:
+        lanes:
+            create: {concurrency: 4, deadline: 10}
+            transition: {concurrency: 2, deadline: 60}
+            comment: {concurrency: 2, deadline: 300}
+        weights:
+            owner/repo: 2
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from heapq import heappop, heappush
+
+
+logger = logging.getLogger(__name__)
+
+CREATE = "create"
+TRANSITION = "transition"
+COMMENT = "comment"
+# Highest priority first
+LANES = (CREATE, TRANSITION, COMMENT)
+DEFAULT_LANES = {
+    CREATE: {"concurrency": 4, "deadline": 10},
+    TRANSITION: {"concurrency": 2, "deadline": 60},
+    COMMENT: {"concurrency": 2, "deadline": 300},
+}
+
+
+@dataclass
+class Task:
+    lane: str
+    repo: str
+    function: object
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    enqueued_at: float = 0.0
+    start: float = 0.0
+    finish: float = 0.0
+    taken: bool = False
+    late: bool = False
+    future: Future = field(default_factory=Future)
+
+
+class _Lane:
+    def __init__(self, deadline=None):
+        self.deadline = deadline
+        # (virtual finish, sequence, task), in fair order
+        self.heap = []
+        # Tasks in arrival order, to find the overdue ones
+        self.arrivals = deque()
+        self.virtual_time = 0.0
+        self.finish_by_repo = {}
+        self.pending_by_repo = Counter()
+        self.size = 0
+
+
+class FairQueue:
+    """
+    Priority lanes of per-repo weighted fair queues. Not thread safe, see Scheduler.
+
+    Tasks taken from one order stay in the other and are skipped when they come up.
+    """
+
+    def __init__(self, deadlines=None, weights=None):
+        deadlines = deadlines or {}
+        self.weights = dict(weights or {})
+        self._lanes = {name: _Lane(deadline=deadlines.get(name)) for name in LANES}
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return sum(lane.size for lane in self._lanes.values())
+
+    def depth(self, lane):
+        return self._lanes[lane].size
+
+    def set_deadline(self, lane, deadline):
+        self._lanes[lane].deadline = deadline
+
+    def push(self, task):
+        lane = self._lanes[task.lane]
+        task.start = max(lane.virtual_time, lane.finish_by_repo.get(task.repo, 0.0))
+        task.finish = task.start + 1.0 / self.weights.get(task.repo, 1.0)
+        lane.finish_by_repo[task.repo] = task.finish
+        lane.pending_by_repo[task.repo] += 1
+        lane.size += 1
+        heappush(lane.heap, (task.finish, next(self._sequence), task))
+        lane.arrivals.append(task)
+
+    def pop(self, lanes=LANES, now=None):
+        """
+        Returns the next task of lanes, None when they are empty. lanes is in priority order.
+        """
+        now = time.monotonic() if now is None else now
+        for name in lanes:
+            lane = self._lanes[name]
+            while lane.arrivals and lane.arrivals[0].taken:
+                lane.arrivals.popleft()
+            if (
+                lane.deadline is not None
+                and lane.arrivals
+                and now - lane.arrivals[0].enqueued_at >= lane.deadline
+            ):
+                task = lane.arrivals.popleft()
+                task.late = True
+                return self._take(lane, task)
+
+        for name in lanes:
+            lane = self._lanes[name]
+            while lane.heap:
+                _, _, task = heappop(lane.heap)
+                if not task.taken:
+                    lane.virtual_time = max(lane.virtual_time, task.start)
+                    return self._take(lane, task)
+
+        return None
+
+    def _take(self, lane, task):
+        task.taken = True
+        lane.size -= 1
+        lane.pending_by_repo[task.repo] -= 1
+        if lane.pending_by_repo[task.repo] == 0:
+            del lane.pending_by_repo[task.repo]
+            # An idle repo keeps its finish time until the lane caught up with it
+            if lane.finish_by_repo[task.repo] <= lane.virtual_time:
+                del lane.finish_by_repo[task.repo]
+        return task
+
+
+class Scheduler:
+    def __init__(self, lanes=None, weights=None, on_start=None):
+        """
+        lanes maps lane names to their concurrency and deadline in seconds, see DEFAULT_LANES.
+        weights maps repos to their share of the workers, 1 by default.
+        on_start is called with every task and the seconds it waited, before it runs.
+        """
+        self.lanes = {name: dict(DEFAULT_LANES[name], **(lanes or {}).get(name, {})) for name in LANES}
+        self.on_start = on_start
+        self.late = Counter()
+        self.failed = Counter()
+        self._queue = FairQueue(
+            deadlines={name: lane["deadline"] for name, lane in self.lanes.items()},
+            weights=weights,
+        )
+        self._running = Counter()
+        self._condition = threading.Condition()
+        self._workers = []
+
+    @classmethod
+    def from_config(cls, config, on_start=None):
+        settings = config.get("scheduler") or {}
+        return cls(
+            lanes=settings.get("lanes"), weights=settings.get("weights"), on_start=on_start
+        )
+
+    def configure(self, config):
+        """
+        Applies the weights and deadlines of a new configuration. Concurrency needs a restart.
+        """
+        settings = config.get("scheduler") or {}
+        with self._condition:
+            self._queue.weights = dict(settings.get("weights") or {})
+            for name in LANES:
+                lane = dict(DEFAULT_LANES[name], **(settings.get("lanes") or {}).get(name, {}))
+                self.lanes[name]["deadline"] = lane["deadline"]
+                self._queue.set_deadline(name, lane["deadline"])
+
+    def depth(self, lane):
+        return self._queue.depth(lane)
+
+    def running(self, lane):
+        return self._running[lane]
+
+    def _start_workers(self):
+        # Started on first use, threads don't survive the fork of gunicorn workers
+        for i, name in enumerate(LANES):
+            served = LANES[: i + 1]
+            for n in range(self.lanes[name]["concurrency"]):
+                worker = threading.Thread(
+                    target=self._work, args=(served,), name=f"gitssues-{name}-{n}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, lane, repo, function, *args, **kwargs):
+        """
+        Queues function(*args, **kwargs) in lane, on behalf of repo. Returns a Future of
+        its result.
+        """
+        task = Task(lane, repo, function, args, kwargs, enqueued_at=time.monotonic())
+        with self._condition:
+            if not self._workers:
+                self._start_workers()
+            self._queue.push(task)
+            self._condition.notify_all()
+        return task.future
+
+    def _work(self, lanes):
+        while True:
+            with self._condition:
+                task = self._queue.pop(lanes)
+                while task is None:
+                    self._condition.wait()
+                    task = self._queue.pop(lanes)
+                self._running[task.lane] += 1
+                if task.late:
+                    self.late[task.lane] += 1
+
+            try:
+                if self.on_start is not None:
+                    self.on_start(task, time.monotonic() - task.enqueued_at)
+                task.future.set_result(task.function(*task.args, **task.kwargs))
+            except Exception as e:
+                self.failed[task.lane] += 1
+                logger.exception(f"Error while running {task.lane} task of {task.repo}")
+                task.future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._running[task.lane] -= 1
+                    self._condition.notify_all()
+
+    def drain(self, timeout=None):
+        """
+        Waits until every queued task ran, e.g. when the process exits. Returns whether it did.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while len(self._queue) or sum(self._running.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
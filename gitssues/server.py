@@ -1,18 +1,81 @@
+import atexit
+import contextvars
 import hmac
 import json
 import os
+import threading
+import time
 
-from flask import Flask, abort, current_app, jsonify, request
+from flask import Flask, Response, abort, current_app, jsonify, request
 
+from gitssues import adf, tracing
+from gitssues.adf import markdown_to_adf, merge_documents
+from gitssues.coalesce import Coalescer
+from gitssues.config import get_config
+from gitssues.helpers import parse_issue_data
 from gitssues.jira import Jira
+from gitssues.journal import Journal, journal_directory
+from gitssues.metrics import CONTENT_TYPE, registry
+from gitssues.profiling import Profiler
+from gitssues.recording import Recorder
+from gitssues.routing import JiraContexts, Router
+from gitssues.scheduler import COMMENT, CREATE, LANES, TRANSITION, Scheduler
+from gitssues.state import get_state
+from gitssues.warm import snapshot_directory
+from gitssues.webhooks import EventRouter
 
 
 GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+SNAPSHOT_DIR = snapshot_directory()
+REFRESH_INTERVAL = int(os.getenv("GITSSUES_REFRESH_INTERVAL", "3600"))
+MAX_PROJECTS = int(os.getenv("GITSSUES_MAX_PROJECTS", "32"))
+# GitHub caps deliveries at 25 MB, issue events are far smaller
+MAX_PAYLOAD_SIZE = int(os.getenv("GITSSUES_MAX_PAYLOAD_SIZE", str(1024 * 1024)))
+COALESCE_QUIET = float(os.getenv("GITSSUES_COALESCE_QUIET", "5"))
+COALESCE_MAX_DELAY = float(os.getenv("GITSSUES_COALESCE_MAX_DELAY", "30"))
+MIRROR_ASSETS = os.getenv("GITSSUES_MIRROR_ASSETS", "0") == "1"
+JOURNAL_DIR = journal_directory()
+SHUTDOWN_TIMEOUT = float(os.getenv("GITSSUES_SHUTDOWN_TIMEOUT", "25"))
+# Seconds that work on an issue waits for its creation, running for another delivery
+CREATION_TIMEOUT = 60
+TRACE_FILE = os.getenv("GITSSUES_TRACE_FILE")
+TRACE_COLLECTOR_URL = os.getenv("GITSSUES_TRACE_COLLECTOR_URL")
+RECORD_FILE = os.getenv("GITSSUES_RECORD_FILE")
+# GitHub lets deliveries of the last 3 days be redelivered
+DELIVERY_TTL = int(os.getenv("GITSSUES_DELIVERY_TTL", str(3 * 24 * 3600)))
+# Seconds after which a delivery still running is taken for lost, e.g. its worker died
+CLAIM_TIMEOUT = int(os.getenv("GITSSUES_CLAIM_TIMEOUT", "900"))
+# Mappings expire so the state doesn't grow forever, they are found again in Jira
+ISSUE_KEY_TTL = 30 * 24 * 3600
 
 
 app = Flask(__name__)
-jira = Jira()
-jira.prepare_jira()
+app.config["MAX_CONTENT_LENGTH"] = MAX_PAYLOAD_SIZE
+events = EventRouter()
+config = get_config()
+state = get_state()
+router = Router.from_config(config.data)
+# Jira metadata comes from the shared snapshots, workers never call Jira at import
+contexts = JiraContexts(
+    factory=lambda project_key: Jira(project_key=project_key),
+    max_size=MAX_PROJECTS,
+    snapshot_dir=SNAPSHOT_DIR,
+    refresh_interval=REFRESH_INTERVAL,
+    # A process local state would hide the snapshots of the other workers
+    state=state if state.shared else None,
+)
+# GitHub issue URL -> set once its creation is done, later work on it waits for it
+creations = {}
+# Tracing is off unless a destination is configured
+if TRACE_COLLECTOR_URL:
+    trace_exporter = tracing.CollectorExporter(TRACE_COLLECTOR_URL)
+elif TRACE_FILE:
+    trace_exporter = tracing.FileExporter(TRACE_FILE)
+else:
+    trace_exporter = None
+profiler = Profiler.from_env()
+# Deliveries are recorded for `gitssues loadtest` only when asked to
+recorder = Recorder(RECORD_FILE) if RECORD_FILE else None
 
 
 def abort_if_signature_is_invalid(signature, secret, digestmod="sha1"):
@@ -32,33 +95,335 @@ def abort_if_signature_is_invalid(signature, secret, digestmod="sha1"):
     return True
 
 
-def parse_issue_data(body):
-    """Returns title and content for Jira"""
-    number = body["issue"]["number"]
-    title = body["issue"]["title"]
-    url = body["issue"]["url"]
-    user = body["issue"]["user"]["login"]
+def register_webhook_ping(body):
+    hook_id = body.get("hook_id")
+    zen = body.get("zen")
+
+    if not zen and not hook_id:
+        return
+
+    current_app.logger.info(f"New webhook #{hook_id} detected: '{zen}'")
+
+
+def get_project_key(body):
+    """
+    Returns the key of the Jira project the issue is routed to, None when there is none.
+    """
+    repo = body["repository"]["full_name"]
     labels = [label["name"] for label in body["issue"]["labels"]]
-    description = body["issue"]["body"]
+    return router.resolve(repo, labels)
+
+
+def issue_key_state_key(url):
+    # Mappings of another Jira site are never looked up
+    return f"issue_key:{config.data['JIRA_BASE_URL']}:{url}"
 
-    title = f"{labels} #{number} {title} by {user}"
-    content = f"""{description}
 
-----
-URL: {url}
+def get_issue_key(jira, url):
     """
+    Returns the Jira issue key mirroring the GitHub issue at url, None when there is none.
+    """
+    creation = creations.get(url)
+    if creation is not None:
+        creation.wait(timeout=CREATION_TIMEOUT)
 
-    return title, content
+    issue_key = state.get(issue_key_state_key(url))
+    if issue_key is None:
+        # The GitHub URL is written in the description of every mirrored issue
+        issue_key = jira.find_issue_key(text=url)
+        if issue_key is not None:
+            state.set(issue_key_state_key(url), issue_key, ttl=ISSUE_KEY_TTL)
+    return issue_key
 
 
-def register_webhook_ping(body):
-    hook_id = body.get("hook_id")
-    zen = body.get("zen")
+def claim_delivery(delivery_id):
+    """
+    Returns whether this worker handles the delivery, False when another one did or does.
 
-    if not zen and not hook_id:
+    A failed delivery can be claimed again, so GitHub redeliveries resume it, as can one
+    still running after CLAIM_TIMEOUT.
+    """
+    key = f"delivery:{delivery_id}"
+    claim = {"status": "running", "at": time.time()}
+    current = state.get(key)
+    if current is not None and current["status"] != "failed":
+        if current["status"] != "running" or claim["at"] - current["at"] < CLAIM_TIMEOUT:
+            return False
+    return state.compare_and_set(key, current, claim, ttl=DELIVERY_TTL)
+
+
+def finish_delivery(delivery_id, failed=False):
+    status = "failed" if failed else "done"
+    state.set(f"delivery:{delivery_id}", {"status": status, "at": time.time()}, ttl=DELIVERY_TTL)
+
+
+def run_traced(name, function, *args):
+    with profiler.profile(name), tracing.trace(name, exporter=trace_exporter):
+        function(*args)
+
+
+def run_profiled(name, function, *args):
+    with profiler.profile(name):
+        return function(*args)
+
+
+def schedule(lane, repo, delivery_id, function, *args):
+    """
+    Runs function(*args) in a lane of the scheduler.
+
+    The work of a delivery is waited for, so the delivery is answered once it is done, and
+    a failure answers an error GitHub lets redeliver. It is profiled on the scheduler
+    worker running it, under the delivery id. Other work, e.g. coalesced comments, is only
+    queued and traced under its own name.
+    """
+    if delivery_id is None:
+        scheduler.submit(lane, repo, run_traced, f"{lane} {function.__name__}", function, *args)
+        return None
+
+    # Runs in a copy of the request context, so its spans join the trace of the delivery
+    context = contextvars.copy_context()
+    return scheduler.submit(
+        lane, repo, context.run, run_profiled, delivery_id, function, *args
+    ).result()
+
+
+def create_issue(project_key, url, title, content, delivery_id):
+    try:
+        # GitHub redeliveries keep the delivery id, so a failed delivery resumes where it stopped
+        journal = Journal.for_key(delivery_id, directory=JOURNAL_DIR) if delivery_id else None
+        # new_issue keeps the sprint and issue in the object, which the other workers share
+        jira = contexts.get(project_key).fork()
+        issue_key = jira.new_issue(
+            title=title, content=content, mirror_assets=MIRROR_ASSETS, journal=journal
+        )
+        state.set(issue_key_state_key(url), issue_key, ttl=ISSUE_KEY_TTL)
+        return issue_key
+    finally:
+        creation = creations.pop(url, None)
+        if creation is not None:
+            creation.set()
+
+
+def close_issue(project_key, url, user, transition_name):
+    """
+    Comments who closed the GitHub issue on its Jira issue, and applies transition_name.
+    """
+    jira = contexts.get(project_key)
+    issue_key = get_issue_key(jira, url)
+    if issue_key is None:
+        app.logger.info(f"No Jira issue for {url}, not closing it")
         return
 
-    current_app.logger.info(f"New webhook #{hook_id} detected: '{zen}'")
+    jira.add_comment_to_issue(issue_key=issue_key, comment=f"Closed by {user} on GitHub.")
+    transitions_data = jira.get_issue_transitions(issue_key=issue_key)
+    transition = jira.get_transition(
+        transitions_data=transitions_data, transition_name=transition_name
+    )
+    if transition is None:
+        app.logger.info(f"No {transition_name} transition for {issue_key}, left open")
+        return
+    jira.set_issue_transition(issue_key=issue_key, transition=transition)
+
+
+def send_issue_events(project_key, url, batch):
+    """
+    Sends the buffered comments and edit of a GitHub issue to Jira, in one request each.
+    """
+    jira = contexts.get(project_key)
+    issue_key = get_issue_key(jira, url)
+    if issue_key is None:
+        app.logger.info(f"No Jira issue for {url}, dropping {len(batch.comments)} comments")
+        return
+
+    if batch.edit is not None:
+        title, content = batch.edit
+        jira.update_issue(issue_key=issue_key, title=title, content=content)
+
+    if batch.comments:
+        comment = merge_documents([markdown_to_adf(text) for text in batch.comments])
+        jira.add_comment_to_issue(issue_key=issue_key, comment=comment)
+
+
+def flush_issue_events(url, batch):
+    repo, project_key = batch.context
+    schedule(COMMENT, repo, None, send_issue_events, project_key, url, batch)
+
+
+def on_routes_changed(old, new):
+    global router
+    router = Router.from_config(new)
+
+
+def on_jira_settings_changed(old, new):
+    # Prepared metadata still applies, new contexts load it from the snapshots
+    contexts.clear()
+
+
+def on_jira_site_changed(old, new):
+    # Snapshots come from the previous Jira site or issue type
+    contexts.clear(not_before=config.mtime)
+
+
+config.subscribe(("routes", "project_key"), on_routes_changed)
+config.subscribe(
+    (
+        "labels",
+        "JIRA_SCD_API_VERSION",
+        "JIRA_CPD_API_VERSION",
+        "OPSGENIE_BASE_URL",
+        "attachments",
+        "assignment",
+    ),
+    on_jira_settings_changed,
+)
+config.subscribe(("JIRA_BASE_URL", "default_issue_type"), on_jira_site_changed)
+
+
+WORK_WAIT = registry.histogram(
+    "gitssues_scheduler_wait_seconds",
+    "Time webhook work waited in its scheduler lane.",
+    labelnames=("lane",),
+)
+scheduler = Scheduler.from_config(
+    config.data, on_start=lambda task, waited: WORK_WAIT.labels(task.lane).observe(waited)
+)
+config.subscribe(("scheduler",), lambda old, new: scheduler.configure(new))
+coalescer = Coalescer(
+    flush=flush_issue_events, quiet=COALESCE_QUIET, max_delay=COALESCE_MAX_DELAY
+)
+# Run in reverse order: buffered events are queued first, then the queues drained
+atexit.register(scheduler.drain, timeout=SHUTDOWN_TIMEOUT)
+atexit.register(coalescer.flush_all)
+
+
+WEBHOOK_DURATION = registry.histogram(
+    "gitssues_webhook_duration_seconds",
+    "Duration of the handling of GitHub webhook deliveries.",
+    labelnames=("event", "action"),
+)
+registry.gauge(
+    "gitssues_coalescer_pending_issues",
+    "Issues with comments or edits waiting to be sent to Jira.",
+).set_function(lambda: len(coalescer))
+registry.gauge(
+    "gitssues_jira_contexts",
+    "Jira projects with a prepared context in this process.",
+).set_function(lambda: len(contexts))
+CACHE_HITS = registry.counter(
+    "gitssues_cache_hits_total", "Cache lookups that found an entry.", labelnames=("cache",)
+)
+CACHE_MISSES = registry.counter(
+    "gitssues_cache_misses_total", "Cache lookups that missed.", labelnames=("cache",)
+)
+DUPLICATE_DELIVERIES = registry.counter(
+    "gitssues_duplicate_deliveries_total",
+    "Webhook deliveries not handled again, since another worker handled them.",
+)
+CACHE_HITS.labels("adf").set_function(lambda: adf.cache.hits)
+CACHE_MISSES.labels("adf").set_function(lambda: adf.cache.misses)
+CACHE_HITS.labels("jira_contexts").set_function(lambda: contexts.hits)
+CACHE_MISSES.labels("jira_contexts").set_function(lambda: contexts.misses)
+LANE_DEPTH = registry.gauge(
+    "gitssues_scheduler_queued", "Webhook work waiting in each lane.", labelnames=("lane",)
+)
+LANE_RUNNING = registry.gauge(
+    "gitssues_scheduler_running", "Webhook work running in each lane.", labelnames=("lane",)
+)
+LANE_LATE = registry.counter(
+    "gitssues_scheduler_late_total",
+    "Webhook work that waited past the deadline of its lane.",
+    labelnames=("lane",),
+)
+LANE_FAILED = registry.counter(
+    "gitssues_scheduler_failed_total", "Webhook work that raised.", labelnames=("lane",)
+)
+for lane in LANES:
+    LANE_DEPTH.labels(lane).set_function(lambda lane=lane: scheduler.depth(lane))
+    LANE_RUNNING.labels(lane).set_function(lambda lane=lane: scheduler.running(lane))
+    LANE_LATE.labels(lane).set_function(lambda lane=lane: scheduler.late[lane])
+    LANE_FAILED.labels(lane).set_function(lambda lane=lane: scheduler.failed[lane])
+
+
+@events.register("ping")
+def on_ping(body):
+    register_webhook_ping(body)
+    return jsonify({"Status": "Webhook not about an Issue"})
+
+
+@events.register("issues", "opened")
+def on_issue_opened(body):
+    # We get title and content for Jira
+    title, content = parse_issue_data(body)
+    response = {"title": title, "content": content}
+    current_app.logger.debug(json.dumps(response, indent=2))
+
+    project_key = get_project_key(body)
+    if project_key is None:
+        return jsonify({"Status": "No Jira project for this issue"})
+
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    creations.setdefault(body["issue"]["url"], threading.Event())
+    issue_key = schedule(
+        CREATE,
+        body["repository"]["full_name"],
+        delivery_id,
+        create_issue,
+        project_key,
+        body["issue"]["url"],
+        title,
+        content,
+        delivery_id,
+    )
+    return jsonify({"Status": "New Issue Created", "issue_key": issue_key})
+
+
+@events.register("issues", "edited")
+def on_issue_edited(body):
+    project_key = get_project_key(body)
+    if project_key is None:
+        return jsonify({"Status": "No Jira project for this issue"})
+
+    # Only the latest state of a burst of edits is sent
+    context = (body["repository"]["full_name"], project_key)
+    coalescer.set_edit(body["issue"]["url"], parse_issue_data(body), context=context)
+    return jsonify({"Status": "Edit on issue"})
+
+
+@events.register("issue_comment", "created")
+def on_issue_comment_created(body):
+    project_key = get_project_key(body)
+    if project_key is None:
+        return jsonify({"Status": "No Jira project for this issue"})
+
+    comment = body["comment"]
+    text = f"{comment['user']['login']} commented on GitHub:\n\n{comment['body']}\n\n{comment['html_url']}"
+    context = (body["repository"]["full_name"], project_key)
+    coalescer.add_comment(body["issue"]["url"], text, context=context)
+    return jsonify({"Status": "Comment on issue"})
+
+
+@events.register("issues", "closed")
+def on_issue_closed(body):
+    # Closing Jira issues is opt-in
+    transition_name = config.data.get("close_transition")
+    if transition_name is None:
+        return jsonify({"Status": "Closed issues are not mirrored"})
+
+    project_key = get_project_key(body)
+    if project_key is None:
+        return jsonify({"Status": "No Jira project for this issue"})
+
+    schedule(
+        TRANSITION,
+        body["repository"]["full_name"],
+        request.headers.get("X-GitHub-Delivery"),
+        close_issue,
+        project_key,
+        body["issue"]["url"],
+        body["sender"]["login"],
+        transition_name,
+    )
+    return jsonify({"Status": "Closed issue"})
 
 
 @app.route("/")
@@ -66,43 +431,60 @@ def index():
     return jsonify({"Status": "It works!"})
 
 
+@app.route("/metrics")
+def metrics():
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
 @app.route("/github", methods=("POST", "GET"))
 def github():
+    start = time.perf_counter()
+    config.check()
+    # Events we don't handle are rejected before reading the payload
+    event = request.headers.get("X-GitHub-Event")
+    if not events.accepts(event):
+        WEBHOOK_DURATION.labels("ignored", "").observe(time.perf_counter() - start)
+        return jsonify({"Status": "Event ignored"})
+
+    if request.content_length is not None and request.content_length > MAX_PAYLOAD_SIZE:
+        abort(413)
+
     header_signature = request.headers.get("X-Hub-Signature")
     abort_if_signature_is_invalid(
         signature=header_signature, secret=GITHUB_WEBHOOK_SECRET)
+    if recorder is not None:
+        recorder.record(request.headers, request.data)
 
     body = request.get_json()
-    register_webhook_ping(body)
     action = body.get("action")
-
-    # When action is not present, hook is not about an Issue
-    if action is None:
-        current_app.logger.debug(json.dumps(body, indent=2))
-        return jsonify({"Status": "Webhook not about an Issue"})
-
-    # When action is "opened" it means a New Issue
-    if action == "opened":
-        # We get title and content for Jira
-        title, content = parse_issue_data(body)
-        response = {"title": title, "content": content}
-        current_app.logger.debug(json.dumps(response, indent=2))
-
-        jira.new_issue(title=title, content=content)
-        return jsonify({"Status": "New Issue Created"})
-
-    # When action is "created" it means a New Comment on the Issue
-    # When action is "closed" it means the Issue is Closed
-    if action == "created":
-        response = {"message": "Comment on issue"}
-        #TODO: We add a comment to the Issue at JIRA
-        return jsonify({"Status": "Comment on issue"})
-
-    if action == "closed":
-        #TODO: We add a comment to the Issue at JIRA with 'closed by user on GH'
-        #TODO: We close the Issue at JIRA (set it to DONE)
-        response = {"message": "Closed issue"}
-
-        return jsonify({"Status": "Closed issue"})
-
-    return jsonify({"Status": "Unknown action"})
+    handler = events.get_handler(event, action)
+    if handler is None:
+        WEBHOOK_DURATION.labels(event, "unknown").observe(time.perf_counter() - start)
+        return jsonify({"Status": "Unknown action"})
+
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    # Redeliveries, e.g. from the webhook settings of the repository, are handled once
+    if delivery_id is not None and not claim_delivery(delivery_id):
+        DUPLICATE_DELIVERIES.inc()
+        WEBHOOK_DURATION.labels(event, action or "").observe(time.perf_counter() - start)
+        return jsonify({"Status": "Delivery already handled"})
+
+    try:
+        with tracing.trace(
+            f"webhook {event}.{action}",
+            exporter=trace_exporter,
+            delivery=delivery_id,
+            event=event,
+            action=action,
+        ):
+            response = handler(body)
+    except Exception:
+        if delivery_id is not None:
+            finish_delivery(delivery_id, failed=True)
+        raise
+    finally:
+        WEBHOOK_DURATION.labels(event, action or "").observe(time.perf_counter() - start)
+
+    if delivery_id is not None:
+        finish_delivery(delivery_id)
+    return response
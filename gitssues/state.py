@@ -0,0 +1,261 @@
+"""
+This module contains the state shared by the workers of a deployment.
+
+Delivery claims, GitHub to Jira issue mappings, mirrored attachments and the warm Jira
+metadata are kept in a key-value backend instead of in each process:
+
+- memory:// keeps them in the process, like before. This is the default.
+- sqlite:///path/to/gitssues.state.db shares them between the processes of a host.
+- redis://host:6379/0 shares them between hosts. It needs the redis package, installed with the redis extra.
+
+The backend is chosen with GITSSUES_STATE_URL. Values are JSON serializable, entries can
+expire after a ttl in seconds, and compare_and_set lets concurrent workers agree on who
+handles what without a lock.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+
+DEFAULT_URL = "memory://"
+# Expired entries are deleted every PURGE_EVERY writes, reads ignore them in between
+PURGE_EVERY = 1000
+
+
+def _encode(value):
+    # Stable encoding, so equal values have equal encodings for compare_and_set
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _decode(encoded):
+    return json.loads(encoded) if encoded is not None else None
+
+
+class State:
+    """
+    Key-value backend. None is not a value: getting a missing key returns None, and setting
+    a key to None deletes it.
+    """
+
+    # Whether other processes see the entries
+    shared = True
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """
+        Sets key to value, expiring after ttl seconds when given.
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        self.set(key, None)
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        """
+        Atomically sets key to value if its current value is expected. Returns whether it did.
+
+        expected None means the key must be missing, value None deletes the key.
+        """
+        raise NotImplementedError
+
+
+class MemoryState(State):
+    shared = False
+
+    def __init__(self):
+        # key -> (encoded value, expiry timestamp or None)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _get(self, key, now):
+        encoded, expires_at = self._entries.get(key, (None, None))
+        if expires_at is not None and expires_at <= now:
+            return None
+        return encoded
+
+    def _set(self, key, value, ttl, now):
+        if value is None:
+            self._entries.pop(key, None)
+        else:
+            self._entries[key] = (_encode(value), now + ttl if ttl is not None else None)
+
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            for key, (_, expires_at) in list(self._entries.items()):
+                if expires_at is not None and expires_at <= now:
+                    del self._entries[key]
+
+    def get(self, key):
+        with self._lock:
+            return _decode(self._get(key, time.time()))
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._set(key, value, ttl, time.time())
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        expected = _encode(expected) if expected is not None else None
+        with self._lock:
+            now = time.time()
+            if self._get(key, now) != expected:
+                return False
+            self._set(key, value, ttl, now)
+            return True
+
+
+class SQLiteState(State):
+    """
+    Entries in a SQLite database, one connection per thread.
+    """
+
+    def __init__(self, path="gitssues.state.db", timeout=30):
+        self.path = str(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS state "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _connection(self):
+        connection, pid = getattr(self._local, "connection", (None, None))
+        # Connections must not cross a fork, e.g. of the gunicorn workers
+        if connection is None or pid != os.getpid():
+            # Autocommit, transactions are opened explicitly with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._local.connection = (connection, os.getpid())
+        return connection
+
+    def _get(self, connection, key, now):
+        row = connection.execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, now),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _set(self, connection, key, value, ttl, now):
+        if value is None:
+            connection.execute("DELETE FROM state WHERE key = ?", (key,))
+        else:
+            connection.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, _encode(value), now + ttl if ttl is not None else None),
+            )
+
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            connection.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+
+    def get(self, key):
+        return _decode(self._get(self._connection(), key, time.time()))
+
+    def set(self, key, value, ttl=None):
+        self._set(self._connection(), key, value, ttl, time.time())
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        expected = _encode(expected) if expected is not None else None
+        connection = self._connection()
+        # Takes the write lock before reading, so no other process writes in between
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            if self._get(connection, key, now) != expected:
+                connection.execute("ROLLBACK")
+                return False
+            self._set(connection, key, value, ttl, now)
+            connection.execute("COMMIT")
+            return True
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+
+class RedisState(State):
+    """
+    Entries in Redis, under prefix. client is a redis.Redis, created from url by default.
+    """
+
+    def __init__(self, url=None, client=None, prefix="gitssues:"):
+        if client is None:
+            # Only deployments using Redis need the package
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _set(self, client, key, value, ttl):
+        if value is None:
+            client.delete(key)
+        elif ttl is not None:
+            client.set(key, _encode(value), px=max(1, int(ttl * 1000)))
+        else:
+            client.set(key, _encode(value))
+
+    @staticmethod
+    def _text(encoded):
+        # Clients return bytes unless created with decode_responses
+        return encoded.decode() if isinstance(encoded, bytes) else encoded
+
+    def get(self, key):
+        return _decode(self._text(self.client.get(self.prefix + key)))
+
+    def set(self, key, value, ttl=None):
+        self._set(self.client, self.prefix + key, value, ttl)
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        from redis import WatchError
+
+        key = self.prefix + key
+        expected = _encode(expected) if expected is not None else None
+        with self.client.pipeline() as pipe:
+            try:
+                # The transaction is discarded if the key changes after WATCH
+                pipe.watch(key)
+                if self._text(pipe.get(key)) != expected:
+                    return False
+                pipe.multi()
+                self._set(pipe, key, value, ttl)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+
+def from_url(url):
+    """
+    Returns the State backend of url, see the module documentation.
+    """
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return MemoryState()
+    if scheme == "sqlite":
+        return SQLiteState(path=url[len("sqlite://"):])
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisState(url=url)
+    raise ValueError(f"Unknown state backend {url}, use memory://, sqlite:// or redis://")
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_state():
+    """
+    Returns the State of the process, from GITSSUES_STATE_URL, created on first use.
+    """
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = from_url(os.getenv("GITSSUES_STATE_URL", DEFAULT_URL))
+    return _state
@@ -0,0 +1,191 @@
+"""
+This module contains a small tracer: a trace per webhook delivery, made of nested spans.
+
+The current span is kept in a context variable, so spans opened anywhere below a trace
+(e.g. by the transport hooks) become its children. Outside of a trace, spans cost a lookup.
+
+Finished traces are exported as lists of spans in the Zipkin v2 JSON format, according to
+https://zipkin.io/zipkin-api/#/default/post_spans
+"""
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+SERVICE_NAME = "gitssues"
+
+_current = contextvars.ContextVar("gitssues_span", default=None)
+
+
+class Trace:
+    def __init__(self, exporter):
+        self.id = os.urandom(16).hex()
+        self.exporter = exporter
+        self.spans = []
+
+
+class Span:
+    __slots__ = ("name", "trace", "id", "parent_id", "tags", "timestamp", "duration", "_start", "_token")
+
+    def __init__(self, name, trace, parent_id=None, tags=None):
+        self.name = name
+        self.trace = trace
+        self.id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.tags = tags or {}
+        self.timestamp = time.time()
+        self.duration = None
+        self._start = time.perf_counter()
+        self._token = None
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+    def to_dict(self):
+        span = {
+            "traceId": self.trace.id,
+            "id": self.id,
+            "name": self.name,
+            "timestamp": int(self.timestamp * 1_000_000),
+            "duration": int((self.duration or 0) * 1_000_000),
+            "localEndpoint": {"serviceName": SERVICE_NAME},
+            # Zipkin only takes string tags
+            "tags": {key: str(value) for key, value in self.tags.items() if value is not None},
+        }
+        if self.parent_id is not None:
+            span["parentId"] = self.parent_id
+        return span
+
+
+def current_span():
+    return _current.get()
+
+
+def start_trace(name, exporter, **tags):
+    """
+    Starts a new trace with its root span, which becomes the current span. Returns the span.
+    The trace is sent to exporter when its root span is finished.
+    """
+    span = Span(name, Trace(exporter), tags=tags)
+    span._token = _current.set(span)
+    return span
+
+
+def start_span(name, **tags):
+    """
+    Starts a child of the current span, which becomes the current span. Returns the span,
+    None when there is no trace going on.
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+
+    span = Span(name, parent.trace, parent_id=parent.id, tags=tags)
+    span._token = _current.set(span)
+    return span
+
+
+def finish_span(span, **tags):
+    """
+    Finishes span, restoring its parent as the current span. span may be None.
+    """
+    if span is None:
+        return
+
+    span.duration = time.perf_counter() - span._start
+    span.tags.update(tags)
+    _current.reset(span._token)
+
+    trace = span.trace
+    trace.spans.append(span)
+    if span.parent_id is None and trace.exporter is not None:
+        trace.exporter.export([s.to_dict() for s in trace.spans])
+
+
+@contextmanager
+def _finishing(span):
+    try:
+        yield span
+    except BaseException as e:
+        if span is not None:
+            span.tag(error=repr(e))
+        raise
+    finally:
+        finish_span(span)
+
+
+def trace(name, exporter, **tags):
+    """
+    Context manager running its block in a new trace. Without exporter it does nothing.
+    """
+    if exporter is None:
+        return _finishing(None)
+    return _finishing(start_trace(name, exporter, **tags))
+
+
+def span(name, **tags):
+    """
+    Context manager running its block in a child of the current span, if any.
+    """
+    return _finishing(start_span(name, **tags))
+
+
+class FileExporter:
+    """
+    Appends every trace to path, as one JSON list of spans per line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        line = json.dumps(spans) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+class CollectorExporter:
+    """
+    Posts every trace to a Zipkin compatible collector, e.g. http://localhost:9411/api/v2/spans.
+
+    Traces are posted by a background thread so that webhooks never wait for the collector.
+    When the collector falls behind, traces beyond max_pending are dropped.
+    """
+
+    def __init__(self, url, max_pending=1000, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="trace-exporter", daemon=True
+                    )
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        # Sent without the transport module, so that the exporter isn't traced itself
+        import requests
+
+        while True:
+            spans = self._queue.get()
+            try:
+                requests.post(self.url, json=spans, timeout=self.timeout)
+            except requests.RequestException:
+                self.dropped += 1
@@ -0,0 +1,138 @@
+"""
+This module contains the single entry point for outbound HTTP calls to Jira, GitHub and OpsGenie.
+
+Hooks registered with add_hook are called around every call: before it is sent, after its
+response, or on error. Metrics and tracing are hooks themselves.
+"""
+import time
+from dataclasses import dataclass, field
+
+import requests
+
+from gitssues import tracing
+from gitssues.metrics import registry
+
+
+UPSTREAM_DURATION = registry.histogram(
+    "gitssues_upstream_request_duration_seconds",
+    "Duration of the requests to upstream APIs.",
+    labelnames=("upstream", "endpoint", "status_class"),
+)
+
+# Avoids formatting the status class on every call
+STATUS_CLASSES = {i: f"{i}xx" for i in range(1, 6)}
+
+
+@dataclass
+class OutboundRequest:
+    """
+    A call about to be sent. Hooks may change kwargs in before_send, and keep their own
+    state for the call in context.
+    """
+
+    method: str
+    url: str
+    upstream: str
+    endpoint: str
+    kwargs: dict
+    context: dict = field(default_factory=dict)
+
+
+class RequestHook:
+    """
+    Base class of the hooks called around outbound calls. Subclasses override what they need.
+    """
+
+    def before_send(self, request):
+        pass
+
+    def after_response(self, request, response, elapsed):
+        pass
+
+    def on_error(self, request, error, elapsed):
+        pass
+
+
+class MetricsHook(RequestHook):
+    """
+    Times every call into UPSTREAM_DURATION.
+    """
+
+    def after_response(self, request, response, elapsed):
+        status_class = STATUS_CLASSES.get(response.status_code // 100, "other")
+        UPSTREAM_DURATION.labels(request.upstream, request.endpoint, status_class).observe(elapsed)
+
+    def on_error(self, request, error, elapsed):
+        UPSTREAM_DURATION.labels(request.upstream, request.endpoint, "error").observe(elapsed)
+
+
+class TracingHook(RequestHook):
+    """
+    Records every call as a span of the current trace, if any.
+    """
+
+    def before_send(self, request):
+        request.context["span"] = tracing.start_span(
+            f"{request.method} {request.upstream}.{request.endpoint}",
+            upstream=request.upstream,
+            endpoint=request.endpoint,
+        )
+
+    def after_response(self, request, response, elapsed):
+        tracing.finish_span(request.context.pop("span", None), status=response.status_code)
+
+    def on_error(self, request, error, elapsed):
+        # The span is missing when the error came from a hook before this one
+        tracing.finish_span(request.context.pop("span", None), error=repr(error))
+
+
+_hooks = [MetricsHook(), TracingHook()]
+
+
+def add_hook(hook):
+    """
+    Registers hook, a RequestHook, for every outbound call of the process.
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+def _notify(method, *args):
+    """
+    Calls method on every hook, even when one of them raises. Raises the first error after.
+    """
+    error = None
+    for hook in _hooks:
+        try:
+            getattr(hook, method)(*args)
+        except Exception as e:
+            if error is None:
+                error = e
+    if error is not None:
+        raise error
+
+
+def request(method, url, upstream, endpoint, **kwargs):
+    """
+    Sends a request with requests.request, calling the registered hooks around it.
+    endpoint is a short name of the API endpoint, without ids, so that metrics stay bounded.
+
+    on_error is called for any exception raised by a before_send hook or by the call, so
+    hooks always get to finish what they started in before_send.
+    """
+    outbound = OutboundRequest(method, url, upstream, endpoint, kwargs)
+    start = time.perf_counter()
+    try:
+        for hook in _hooks:
+            hook.before_send(outbound)
+        start = time.perf_counter()
+        response = requests.request(outbound.method, outbound.url, **outbound.kwargs)
+    except BaseException as e:
+        _notify("on_error", outbound, e, time.perf_counter() - start)
+        raise
+
+    _notify("after_response", outbound, response, time.perf_counter() - start)
+    return response
@@ -0,0 +1,216 @@
+"""
+This module contains the warm state shared by the server workers.
+
+Prepared Jira metadata is kept in a JSON snapshot on disk. Every worker loads it at boot
+and reloads it when the file changes, while a single worker at a time refreshes it from
+Jira in the background. Serving traffic never waits for Jira when a snapshot exists.
+
+With a shared State, the snapshot is kept there instead, so the workers of every host
+share it, and the refresh lock is an entry of the State.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds after which the refresh lock of a State is released, if its worker died
+LOCK_TTL = 300
+
+
+def snapshot_directory():
+    """
+    Returns the directory of the snapshots, GITSSUES_SNAPSHOT_DIR when set.
+    """
+    return os.getenv("GITSSUES_SNAPSHOT_DIR", ".")
+
+
+def snapshot_path(project_key, directory="."):
+    """
+    Returns the path of the snapshot of a Jira project.
+    """
+    return Path(directory) / f"gitssues.{project_key}.snapshot.json"
+
+
+class WarmState:
+    def __init__(
+        self,
+        jira,
+        path="gitssues.snapshot.json",
+        refresh_interval=3600,
+        check_interval=30,
+        not_before=0.0,
+        state=None,
+    ):
+        """
+        Snapshots written before the not_before timestamp are ignored, e.g. when they were
+        prepared from another Jira configuration. With state, the snapshot is kept in it
+        under the name of path.
+        """
+        self.jira = jira
+        self.path = Path(path)
+        self.refresh_interval = refresh_interval
+        self.check_interval = check_interval
+        self.not_before = not_before
+        self.state = state
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stopped = threading.Event()
+
+    @property
+    def _lock_path(self):
+        return self.path.with_name(self.path.name + ".lock")
+
+    @property
+    def _state_key(self):
+        return f"snapshot:{self.path.name}"
+
+    def _mtime_of_snapshot(self):
+        if self.state is not None:
+            entry = self.state.get(self._state_key)
+            mtime = entry["written_at"] if entry is not None else None
+        else:
+            try:
+                mtime = self.path.stat().st_mtime
+            except FileNotFoundError:
+                mtime = None
+        return mtime if mtime is not None and mtime >= self.not_before else None
+
+    def _read(self):
+        if self.state is not None:
+            entry = self.state.get(self._state_key)
+            return entry["snapshot"] if entry is not None else None
+        with self.path.open() as f:
+            return json.load(f)
+
+    def _age(self):
+        mtime = self._mtime_of_snapshot()
+        return time.time() - mtime if mtime is not None else None
+
+    def load(self):
+        """
+        Loads the snapshot into jira when it changed since the last load.
+        Returns whether jira is prepared.
+        """
+        mtime = self._mtime_of_snapshot()
+        if mtime is None:
+            return self.jira.is_prepared
+
+        with self._lock:
+            snapshot = self._read() if mtime != self._mtime else None
+            if snapshot is not None:
+                self.jira.load_snapshot(snapshot)
+                self._mtime = mtime
+
+        return self.jira.is_prepared
+
+    def write(self):
+        """
+        Writes the prepared metadata of jira to the snapshot, atomically.
+        """
+        if self.state is not None:
+            written_at = time.time()
+            # Never expires, an old snapshot is still better than waiting for Jira. Its age
+            # is told by written_at
+            self.state.set(
+                self._state_key, {"written_at": written_at, "snapshot": self.jira.to_snapshot()}
+            )
+            self._mtime = written_at
+            return
+
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with tmp.open("w") as f:
+            json.dump(self.jira.to_snapshot(), f)
+        os.replace(tmp, self.path)
+        self._mtime = self.path.stat().st_mtime
+
+    def refresh(self, blocking=False):
+        """
+        Prepares jira from the Jira API and writes the snapshot. Returns whether it refreshed.
+
+        A lock file makes sure a single process refreshes at a time. The others skip the
+        refresh, or wait for it when blocking, and pick up the new snapshot with load.
+        """
+        if self.state is not None:
+            return self._refresh_with_state_lock(blocking)
+
+        with self._lock_path.open("w") as lock:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock, flags)
+            except BlockingIOError:
+                return False
+
+            try:
+                return self._refresh_if_old()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refresh_with_state_lock(self, blocking, poll_interval=0.5):
+        key = f"lock:{self.path.name}"
+        token = uuid.uuid4().hex
+        while not self.state.compare_and_set(key, None, token, ttl=LOCK_TTL):
+            if not blocking:
+                return False
+            time.sleep(poll_interval)
+
+        try:
+            return self._refresh_if_old()
+        finally:
+            self.state.compare_and_set(key, token, None)
+
+    def _refresh_if_old(self):
+        # Another process may have refreshed while we waited for the lock
+        age = self._age()
+        if age is not None and age < self.refresh_interval and self.load():
+            return False
+
+        self.jira.prepare_jira()
+        self.write()
+        return True
+
+    def ensure_ready(self):
+        """
+        Makes sure jira is prepared, and starts the background refresh of this process.
+
+        Only the very first request of a deployment, without any snapshot, waits for Jira.
+        """
+        if not self.load():
+            self.refresh(blocking=True)
+            self.load()
+
+        if self._refresher is None:
+            self.start_refresher()
+
+    def start_refresher(self):
+        """
+        Starts a daemon thread that reloads the snapshot and refreshes it when it gets old.
+        """
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="gitssues-warm-state", daemon=True
+        )
+        self._refresher.start()
+
+    def stop(self):
+        """
+        Stops the background refresh.
+        """
+        self._stopped.set()
+
+    def _refresh_loop(self):
+        while not self._stopped.wait(self.check_interval):
+            try:
+                age = self._age()
+                if age is None or age >= self.refresh_interval:
+                    self.refresh()
+                self.load()
+            except Exception:
+                # Keep serving with the previous state, next check will retry
+                logger.exception("Error while refreshing Jira warm state")
@@ -0,0 +1,41 @@
+"""
+This module contains the routing of GitHub webhook deliveries to handler functions.
+
+Handlers are registered for an event, as sent in the X-GitHub-Event header, and optionally
+an action. Events without handlers can be rejected from the header alone, before the
+payload is read.
+"""
+
+
+class EventRouter:
+    def __init__(self):
+        self._handlers = {}
+        self._events = set()
+
+    def register(self, event, action=None):
+        """
+        Decorator registering a handler for event and action. Without action, the handler
+        receives every action of the event that has no handler of its own.
+        """
+
+        def decorator(handler):
+            self._handlers[(event, action)] = handler
+            self._events.add(event)
+            return handler
+
+        return decorator
+
+    def accepts(self, event):
+        """
+        Whether any handler is registered for event.
+        """
+        return event in self._events
+
+    def get_handler(self, event, action=None):
+        """
+        Returns the handler for event and action, None when there is none.
+        """
+        handler = self._handlers.get((event, action))
+        if handler is None:
+            handler = self._handlers.get((event, None))
+        return handler
@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration.
+
+The app is preloaded in the master process, so the Jira metadata snapshot of the default
+project is refreshed once before workers are forked instead of once per worker.
+
+Each worker loads the snapshots of every routed project when it boots, and keeps them
+refreshed in the background from then on.
+
+Deliveries are answered once their work is done, so workers serve GITSSUES_THREADS requests
+at once, which wait together in the lanes of the scheduler and are reordered there. GitHub
+stops waiting for an answer after 10 seconds and doesn't send the delivery again: the work
+goes on and is recorded as done or failed, a failed delivery is resumed when redelivered
+from the webhook settings.
+
+Workers reload gitssues.yml when it changes, or right away on SIGHUP. Send it to the
+worker processes: a SIGHUP to the master restarts the workers instead.
+"""
+import logging
+import os
+
+
+preload_app = True
+worker_class = "gthread"
+threads = int(os.getenv("GITSSUES_THREADS", "8"))
+
+
+def on_starting(server):
+    from gitssues.server import REFRESH_INTERVAL, SNAPSHOT_DIR, Jira, router, state
+    from gitssues.warm import WarmState, snapshot_path
+
+    if router.default_project_key is None:
+        return
+
+    warm_state = WarmState(
+        Jira(project_key=router.default_project_key),
+        path=snapshot_path(router.default_project_key, directory=SNAPSHOT_DIR),
+        refresh_interval=REFRESH_INTERVAL,
+        # Written where the workers look for it, see JiraContexts in gitssues/server.py
+        state=state if state.shared else None,
+    )
+    try:
+        if not warm_state.load():
+            warm_state.refresh(blocking=True)
+    except Exception:
+        # Workers start anyway and prepare on first use
+        logging.getLogger("gunicorn.error").exception("Could not warm Jira metadata")
+
+
+def post_worker_init(worker):
+    from gitssues.config import install_sighup_handler
+    from gitssues.server import contexts, router
+
+    install_sighup_handler()
+    # Threads don't survive the fork, each worker starts its own refreshers
+    try:
+        contexts.warm(router.project_keys())
+    except Exception:
+        # Contexts are created on first use anyway
+        worker.log.exception("Could not warm Jira contexts")
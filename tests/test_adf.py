@@ -0,0 +1,77 @@
+from gitssues.adf import MAX_QUOTE_DEPTH, cache, inline_nodes, markdown_to_adf, merge_documents
+
+
+def test_inline_marks():
+    nodes = inline_nodes("a **b** `c` [d](http://e) snake_case *open")
+
+    assert nodes == [
+        {"type": "text", "text": "a "},
+        {"type": "text", "text": "b", "marks": [{"type": "strong"}]},
+        {"type": "text", "text": " "},
+        {"type": "text", "text": "c", "marks": [{"type": "code"}]},
+        {"type": "text", "text": " "},
+        {"type": "text", "text": "d", "marks": [{"type": "link", "attrs": {"href": "http://e"}}]},
+        {"type": "text", "text": " snake_case *open"},
+    ]
+
+
+def test_blocks():
+    doc = markdown_to_adf(
+        "# Title\n\n- one\n- two\n\n```python\nprint(1)\n```\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n> quote\n",
+        use_cache=False,
+    )
+
+    assert [node["type"] for node in doc["content"]] == [
+        "heading",
+        "bulletList",
+        "codeBlock",
+        "table",
+        "blockquote",
+    ]
+    assert doc["content"][2]["attrs"] == {"language": "python"}
+    assert doc["content"][2]["content"][0]["text"] == "print(1)"
+    assert len(doc["content"][3]["content"]) == 2
+
+
+def test_empty_body():
+    assert markdown_to_adf(None, use_cache=False) == {"type": "doc", "version": 1, "content": []}
+
+
+def test_conversions_are_cached():
+    hits = cache.hits
+    first = markdown_to_adf("cached *body*")
+    second = markdown_to_adf("cached *body*")
+
+    assert first is second
+    assert cache.hits == hits + 1
+
+
+def test_merge_documents():
+    merged = merge_documents([markdown_to_adf("a"), markdown_to_adf("b")])
+
+    assert [node["type"] for node in merged["content"]] == ["paragraph", "rule", "paragraph"]
+
+
+def quote_texts(doc):
+    (quote,) = doc["content"]
+    assert quote["type"] == "blockquote"
+    return ["".join(node["text"] for node in block["content"]) for block in quote["content"]]
+
+
+def test_quotes_keep_nested_quotes_and_tables_as_text():
+    doc = markdown_to_adf("> a\n> > nested\n> | a | b |", use_cache=False)
+    assert quote_texts(doc) == ["a", "nested", "| a | b |"]
+
+    doc = markdown_to_adf("> | a | b |\n> |---|---|\n> | c | d |", use_cache=False)
+    assert quote_texts(doc) == ["a | b", "c | d"]
+
+
+def test_deeply_nested_quotes_are_kept_as_text():
+    doc = markdown_to_adf(">" * 600 + " deep", use_cache=False)
+
+    assert quote_texts(doc) == [">" * (600 - MAX_QUOTE_DEPTH) + " deep"]
+
+
+def test_quotes_are_never_empty():
+    assert quote_texts(markdown_to_adf("> ---", use_cache=False)) == ["---"]
+    assert markdown_to_adf(">\n>", use_cache=False)["content"] == []
@@ -0,0 +1,124 @@
+import io
+
+import pytest
+
+from gitssues import transport
+from gitssues.jira import attachments
+from gitssues.jira.attachments import (
+    AssetTooLarge,
+    MultipartFile,
+    download,
+    iter_asset_urls,
+    mirror_assets,
+)
+from gitssues.state import MemoryState
+
+
+ASSET = "https://user-images.githubusercontent.com/1/shot.png"
+FILE = "https://github.com/o/r/files/2/log.txt"
+
+
+class FakeAssetResponse:
+    def __init__(self, content, headers=None):
+        self.content = content
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+
+class FakeJira:
+    def __init__(self):
+        self.uploads = []
+
+    def add_attachment_to_issue(self, issue_key, body):
+        self.uploads.append((issue_key, body.content_type, b"".join(body)))
+        return [{"id": str(len(self.uploads))}]
+
+
+@pytest.fixture
+def assets(monkeypatch):
+    """
+    Serves the content of the asset URLs set in the returned dictionary.
+    """
+    contents = {}
+    monkeypatch.setattr(
+        transport, "request", lambda method, url, **kwargs: FakeAssetResponse(contents[url])
+    )
+    state = MemoryState()
+    monkeypatch.setattr(attachments, "get_state", lambda: state)
+    return contents
+
+
+def test_multipart_file_streams_a_single_part():
+    body = MultipartFile(io.BytesIO(b"0123456789"), filename='a"b.txt', size=10, chunk_size=4)
+
+    chunks = list(body)
+    data = b"".join(chunks)
+
+    assert len(body) == len(data)
+    assert chunks[1:4] == [b"0123", b"4567", b"89"]
+    assert body.content_type == f"multipart/form-data; boundary={body.boundary}"
+    assert data.startswith(f"--{body.boundary}\r\n".encode())
+    assert b'filename="ab.txt"' in data
+    assert data.endswith(f"\r\n--{body.boundary}--\r\n".encode())
+
+
+def test_asset_urls_are_found_once():
+    content = (
+        f"![shot]({ASSET})\n\nSee [the log]({FILE}) and [again]({FILE}).\n\n"
+        "> [docs](https://example.com/docs)\n"
+    )
+
+    assert sorted(iter_asset_urls(content)) == [FILE, ASSET]
+
+
+def test_large_assets_are_refused(monkeypatch):
+    responses = {
+        "declared": FakeAssetResponse(b"", headers={"Content-Length": "11"}),
+        "streamed": FakeAssetResponse(b"x" * 11),
+    }
+    monkeypatch.setattr(transport, "request", lambda method, url, **kwargs: responses[url])
+
+    for url in responses:
+        with pytest.raises(AssetTooLarge):
+            download(url, io.BytesIO(), max_size=10)
+
+
+def test_assets_are_uploaded_once_per_issue(assets):
+    assets[ASSET] = b"content"
+    assets[FILE] = b"content"
+    jira = FakeJira()
+
+    first = mirror_assets(jira, "TGS-1", f"![shot]({ASSET})", max_workers=1)
+    # Same content from another link, e.g. on a redelivery
+    second = mirror_assets(jira, "TGS-1", f"[log]({FILE})", max_workers=1)
+    other = mirror_assets(jira, "TGS-2", f"![shot]({ASSET})", max_workers=1)
+
+    assert first == second == ["1"]
+    assert other == ["2"]
+    assert [(issue_key, data.count(b"content")) for issue_key, _, data in jira.uploads] == [
+        ("TGS-1", 1),
+        ("TGS-2", 1),
+    ]
+    # Uploads are not remembered forever
+    entries = attachments.get_state()._entries.values()
+    assert all(expires_at is not None for _, expires_at in entries)
+
+
+def test_too_large_assets_are_skipped(assets):
+    assets[ASSET] = b"x" * 11
+    jira = FakeJira()
+
+    assert mirror_assets(jira, "TGS-1", f"![shot]({ASSET})", max_size=10) == []
+    assert jira.uploads == []
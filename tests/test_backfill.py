@@ -0,0 +1,68 @@
+import pytest
+
+from gitssues.backfill import Checkpoint, backfill, plan_backfill
+
+
+class FakeGitHub:
+    def __init__(self, count):
+        self.count = count
+
+    def iter_issues_from_repo(self, repo):
+        for number in range(1, self.count + 1):
+            yield {
+                "number": number,
+                "title": f"Issue {number}",
+                "url": f"https://api.github.com/repos/{repo}/issues/{number}",
+                "user": {"login": "octocat"},
+                "labels": [{"name": "bug"}],
+                "body": "body",
+            }
+
+
+class FakeJira:
+    def new_issue(self, title, content):
+        number = title.split("#")[1].split()[0]
+        if number == "3":
+            raise Exception("boom")
+        return f"TGS-{number}"
+
+
+def test_backfill_resumes_from_checkpoint(tmp_path):
+    path = tmp_path / "progress"
+    checkpoint = Checkpoint(path=path)
+    checkpoint.mark(1, "TGS-1")
+
+    report = backfill(FakeGitHub(5), FakeJira(), "o/r", checkpoint, concurrency=2)
+
+    assert report.skipped == 1
+    assert report.created == 3
+    assert [number for number, _ in report.failed] == [3]
+
+    reloaded = Checkpoint(path=path)
+    assert len(reloaded) == 4
+    assert 3 not in reloaded
+
+
+class MalformedGitHub(FakeGitHub):
+    def iter_issues_from_repo(self, repo):
+        yield {"number": 1}
+        yield from super().iter_issues_from_repo(repo)
+
+
+def test_backfill_stops_when_the_transformer_fails(tmp_path):
+    checkpoint = Checkpoint(path=tmp_path / "progress")
+
+    # More issues than the queues hold, the reader must not wait for the transformer forever
+    with pytest.raises(KeyError):
+        backfill(MalformedGitHub(50), FakeJira(), "o/r", checkpoint, concurrency=2, queue_size=2)
+
+
+def test_plan_backfill_projects_requests(tmp_path):
+    checkpoint = Checkpoint(path=tmp_path / "progress")
+    checkpoint.mark(2, "TGS-2")
+
+    report = plan_backfill(FakeGitHub(4), "o/r", checkpoint, concurrency=1, latency=1)
+
+    assert report.pending == 3
+    assert report.projected_requests == 1 + 3 * 5
+    assert report.projected_seconds == 16
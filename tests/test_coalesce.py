@@ -0,0 +1,33 @@
+import threading
+
+from gitssues.coalesce import Coalescer
+
+
+def test_burst_is_flushed_once():
+    flushed = []
+    done = threading.Event()
+
+    def flush(key, batch):
+        flushed.append((key, batch.comments, batch.edit))
+        done.set()
+
+    coalescer = Coalescer(flush=flush, quiet=0.05, max_delay=5)
+    for i in range(10):
+        coalescer.add_comment("issue-1", f"comment {i}")
+    coalescer.set_edit("issue-1", "first")
+    coalescer.set_edit("issue-1", "latest")
+
+    assert done.wait(2)
+    assert flushed == [("issue-1", [f"comment {i}" for i in range(10)], "latest")]
+    assert len(coalescer) == 0
+
+
+def test_flush_all():
+    flushed = []
+    coalescer = Coalescer(flush=lambda key, batch: flushed.append(key), quiet=60)
+    coalescer.add_comment("a", "x")
+    coalescer.add_comment("b", "y")
+
+    coalescer.flush_all()
+
+    assert sorted(flushed) == ["a", "b"]
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+import yaml
+
+from gitssues.config import Config, ConfigError, get_config
+
+
+CONFIG = {
+    "project_key": "TGS",
+    "default_issue_type": "Bug",
+    "labels": ["python-ecosystem"],
+    "JIRA_BASE_URL": "https://example.atlassian.net/rest",
+    "JIRA_SCD_API_VERSION": "latest",
+    "JIRA_CPD_API_VERSION": 3,
+    "GITHUB_BASE_URL": "https://api.github.com",
+}
+
+
+def write(path, data, mtime):
+    path.write_text(yaml.safe_dump(data))
+    os.utime(path, (mtime, mtime))
+
+
+def test_reload_notifies_only_the_changed_keys(tmp_path):
+    path = tmp_path / "gitssues.yml"
+    write(path, CONFIG, mtime=1000)
+    config = Config(path, check_interval=0)
+    changes = []
+    config.subscribe(("routes", "project_key"), lambda old, new: changes.append("router"))
+    config.subscribe(("labels",), lambda old, new: changes.append(new["labels"]))
+
+    first = config.data
+    write(path, dict(CONFIG, labels=["toolkits"]), mtime=2000)
+
+    assert config.data["labels"] == ["toolkits"]
+    assert first["labels"] == ["python-ecosystem"]
+    assert changes == [["toolkits"]]
+
+
+def test_invalid_changes_keep_the_current_configuration(tmp_path):
+    path = tmp_path / "gitssues.yml"
+    write(path, dict(CONFIG, project_key=None), mtime=1000)
+    with pytest.raises(ConfigError, match="project_key is required"):
+        Config(path)
+
+    write(path, CONFIG, mtime=2000)
+    config = Config(path, check_interval=0)
+    write(path, dict(CONFIG, routes=[{"repo": "owner/repo"}]), mtime=3000)
+
+    assert config.data == CONFIG
+
+
+def test_invalid_files_are_reported_once(tmp_path, caplog):
+    path = tmp_path / "gitssues.yml"
+    write(path, CONFIG, mtime=1000)
+    config = Config(path, check_interval=0)
+    write(path, dict(CONFIG, project_key=None), mtime=2000)
+
+    for _ in range(3):
+        assert config.data == CONFIG
+    assert len(caplog.records) == 1
+
+    write(path, dict(CONFIG, labels=["toolkits"]), mtime=3000)
+    assert config.data["labels"] == ["toolkits"]
+
+
+def test_config_is_shared_by_path(tmp_path):
+    path = tmp_path / "gitssues.yml"
+    write(path, CONFIG, mtime=1000)
+
+    assert get_config(path) is get_config(str(path))
@@ -0,0 +1,117 @@
+import gzip
+import json
+import time
+
+import pytest
+
+from gitssues.export import ExportError, ExportState, build_jql, export_issues
+from gitssues.jira.jira import Issue
+
+
+class FakeJira:
+    project_key = "TGS"
+
+    def __init__(self, count):
+        self.count = count
+        self.searches = []
+
+    def search_issues(self, jql, fields, page_size):
+        self.searches.append((jql, fields))
+        for n in range(1, self.count + 1):
+            yield Issue(
+                id=str(n),
+                key=f"TGS-{n}",
+                fields={
+                    "summary": f"Issue {n}",
+                    "status": {"name": "Done", "statusCategory": {"key": "done"}},
+                    "assignee": {"accountId": "ada", "displayName": "Ada"},
+                    "labels": ["bug"],
+                    "updated": "2021-01-02T00:00:00.000+0000",
+                },
+            )
+
+
+def read_jsonl(path):
+    with gzip.open(path, "rt") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_exports_append_the_updated_issues(tmp_path):
+    output = tmp_path / "export.jsonl.gz"
+    fields = ("summary", "status", "assignee", "labels")
+
+    report = export_issues(FakeJira(3), output, fields=fields)
+    assert (report.exported, report.updated_within) == (3, None)
+    assert read_jsonl(output)[0] == {
+        "key": "TGS-1",
+        "id": "1",
+        "summary": "Issue 1",
+        "status": "Done",
+        "assignee": "ada",
+        "labels": ["bug"],
+    }
+
+    jira = FakeJira(1)
+    report = export_issues(jira, output, fields=fields)
+    assert (report.exported, report.updated_within) == (1, 2)
+    assert jira.searches == [
+        ('project = TGS AND updated >= "-2m" ORDER BY created ASC', list(fields))
+    ]
+    assert [row["key"] for row in read_jsonl(output)] == ["TGS-1", "TGS-2", "TGS-3", "TGS-1"]
+
+
+def test_full_exports_replace_the_output(tmp_path):
+    output = tmp_path / "export.jsonl.gz"
+    export_issues(FakeJira(3), output, fields=("summary",))
+    export_issues(FakeJira(1), output, fields=("summary",))
+
+    report = export_issues(FakeJira(2), output, fields=("summary",), full=True)
+
+    assert (report.exported, report.updated_within) == (2, None)
+    assert [row["key"] for row in read_jsonl(output)] == ["TGS-1", "TGS-2"]
+
+
+def test_other_sprints_or_fields_need_a_full_export(tmp_path):
+    output = tmp_path / "export.jsonl.gz"
+    export_issues(FakeJira(3), output, fields=("summary",), sprint="active")
+
+    with pytest.raises(ExportError, match="sprint = 12"):
+        export_issues(FakeJira(1), output, fields=("summary",), sprint="12")
+    with pytest.raises(ExportError, match="labels"):
+        export_issues(FakeJira(1), output, fields=("summary", "labels"), sprint="active")
+    assert len(read_jsonl(output)) == 3
+
+    export_issues(FakeJira(1), output, fields=("summary", "labels"), sprint="12", full=True)
+    state = ExportState(f"{output}.state.json")
+    assert state.jql == "project = TGS AND sprint = 12 ORDER BY created ASC"
+    assert state.fields == ["summary", "labels"]
+
+
+def test_sprint_filters():
+    assert build_jql("TGS", sprint="active") == (
+        "project = TGS AND sprint in openSprints() ORDER BY created ASC"
+    )
+    assert build_jql("TGS", sprint="12") == "project = TGS AND sprint = 12 ORDER BY created ASC"
+    assert build_jql("TGS", sprint="Sprint 7") == (
+        'project = TGS AND sprint = "Sprint 7" ORDER BY created ASC'
+    )
+
+
+def test_updated_within_has_a_minute_of_overlap(tmp_path):
+    state = ExportState(tmp_path / "state.json")
+    assert state.updated_within(time.time()) is None
+
+    state.save(1000, "project = TGS ORDER BY created ASC", ["summary"])
+    assert ExportState(tmp_path / "state.json").updated_within(1000 + 3600) == 61
+
+
+def test_parquet_export(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    output = tmp_path / "export"
+    export_issues(FakeJira(3), output, file_format="parquet", fields=("summary", "labels"))
+
+    (path,) = output.glob("*.parquet")
+    table = pq.read_table(path)
+    assert table.column("key").to_pylist() == ["TGS-1", "TGS-2", "TGS-3"]
+    assert table.column("labels").to_pylist() == ['["bug"]'] * 3
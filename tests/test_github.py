@@ -0,0 +1,101 @@
+import json
+
+import pytest
+import yaml
+
+from gitssues import transport
+from gitssues.github import api
+from gitssues.github.api import GitHub, GitHubException, QueryCost
+
+from .test_config import CONFIG
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self.data
+
+
+def page(numbers, cursor, has_next_page, remaining):
+    nodes = [
+        {
+            "number": number,
+            "title": f"Issue {number}",
+            "body": "body",
+            "state": "OPEN",
+            "url": f"https://github.com/o/r/issues/{number}",
+            "createdAt": "2021-01-01T00:00:00Z",
+            "updatedAt": "2021-01-02T00:00:00Z",
+            "closedAt": None,
+            "author": {"login": "octocat"},
+            "labels": {"nodes": [{"name": "bug"}]},
+            "comments": {
+                "totalCount": 3,
+                "nodes": [
+                    {
+                        "body": "hi",
+                        "url": f"https://github.com/o/r/issues/{number}#c1",
+                        "createdAt": "2021-01-01T01:00:00Z",
+                        "author": None,
+                    }
+                ],
+            },
+        }
+        for number in numbers
+    ]
+    return {
+        "data": {
+            "rateLimit": {"cost": 1, "remaining": remaining, "resetAt": "2021-01-01T01:00:00Z"},
+            "repository": {
+                "issues": {
+                    "pageInfo": {"hasNextPage": has_next_page, "endCursor": cursor},
+                    "nodes": nodes,
+                }
+            },
+        }
+    }
+
+
+@pytest.fixture
+def github(tmp_path, monkeypatch):
+    (tmp_path / "gitssues.yml").write_text(yaml.safe_dump(CONFIG))
+    monkeypatch.chdir(tmp_path)
+    return GitHub()
+
+
+def test_issues_are_read_by_pages_of_100(github, monkeypatch):
+    pages = [page([1, 2], "c1", True, 4999), page([3], "c2", False, 4998)]
+    requests = []
+
+    def request(method, url, upstream, endpoint, **kwargs):
+        requests.append((url, kwargs["json"]["variables"]))
+        return FakeResponse(pages[len(requests) - 1])
+
+    monkeypatch.setattr(transport, "request", request)
+    cost = QueryCost()
+    issues = list(github.iter_issues_with_comments("o/r", comments=5, cost=cost))
+
+    assert [issue["number"] for issue in issues] == [1, 2, 3]
+    assert issues[0]["url"] == "https://api.github.com/repos/o/r/issues/1"
+    assert issues[0]["labels"] == [{"name": "bug"}]
+    assert issues[0]["comments"] == 3
+    assert issues[0]["first_comments"][0]["user"] == {"login": "ghost"}
+
+    assert [url for url, _ in requests] == ["https://api.github.com/graphql"] * 2
+    assert [variables["after"] for _, variables in requests] == [None, "c1"]
+    assert requests[0][1]["pageSize"] == api.GRAPHQL_PAGE_SIZE
+    assert requests[0][1]["comments"] == 5
+    assert (cost.requests, cost.cost, cost.remaining, cost.cursor) == (2, 2, 4998, "c2")
+
+
+def test_query_errors_raise(github, monkeypatch):
+    response = FakeResponse({"data": None, "errors": [{"message": "Something went wrong"}]})
+    monkeypatch.setattr(transport, "request", lambda *args, **kwargs: response)
+
+    with pytest.raises(GitHubException, match="Something went wrong"):
+        list(github.iter_issues_with_comments("o/r"))
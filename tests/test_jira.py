@@ -0,0 +1,232 @@
+import pickle
+import time
+
+import pytest
+import yaml
+
+from gitssues import transport
+from gitssues.jira.api import DEFAULT_ISSUE_FIELDS, Jira
+from gitssues.jira.exc import JiraException
+from gitssues.jira.jira import Board, Issue, IssueType, Project, Sprint
+from gitssues.journal import Journal
+
+from .test_config import CONFIG
+from .test_github import FakeResponse
+
+
+@pytest.fixture
+def jira(tmp_path, monkeypatch):
+    (tmp_path / "gitssues.yml").write_text(yaml.safe_dump(CONFIG))
+    monkeypatch.chdir(tmp_path)
+    return Jira()
+
+
+def search_pages(jira, monkeypatch, total, page_sizes):
+    """
+    Stubs the search of jira with pages of page_sizes issues, returns the requested startAt.
+    """
+    requested = []
+
+    def get_search_page_data(jql, fields, start_at=0, max_results=100, version=None):
+        requested.append(start_at)
+        size = page_sizes[len(requested) - 1]
+        issues = [
+            {"id": str(n), "key": f"TGS-{n}", "fields": {"summary": f"Issue {n}"}}
+            for n in range(start_at, start_at + size)
+        ]
+        return {"startAt": start_at, "maxResults": max_results, "total": total, "issues": issues}
+
+    monkeypatch.setattr(jira, "get_search_page_data", get_search_page_data)
+    return requested
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_search_reads_every_page(jira, monkeypatch, prefetch):
+    requested = search_pages(jira, monkeypatch, total=5, page_sizes=[2, 2, 1])
+
+    issues = list(jira.search_issues(jql="project = TGS", page_size=2, prefetch=prefetch))
+
+    assert [issue.key for issue in issues] == [f"TGS-{n}" for n in range(5)]
+    assert issues[4].fields == {"summary": "Issue 4"}
+    assert requested == [0, 2, 4]
+
+
+def test_search_stops_on_an_empty_page(jira, monkeypatch):
+    # The total is an estimate, issues can be deleted while paging
+    requested = search_pages(jira, monkeypatch, total=10, page_sizes=[2, 0])
+
+    issues = list(jira.search_issues(jql="project = TGS", page_size=2))
+
+    assert [issue.key for issue in issues] == ["TGS-0", "TGS-1"]
+    assert requested == [0, 2]
+
+
+def test_search_prefetches_the_next_page(jira, monkeypatch):
+    requested = search_pages(jira, monkeypatch, total=4, page_sizes=[2, 2])
+
+    issues = jira.search_issues(jql="project = TGS", page_size=2)
+    next(issues)
+    # The second page is requested in the background while the first is consumed
+    for _ in range(100):
+        if len(requested) == 2:
+            break
+        time.sleep(0.01)
+    assert requested == [0, 2]
+    assert [issue.key for issue in issues] == ["TGS-1", "TGS-2", "TGS-3"]
+
+
+def test_search_without_prefetch_reads_pages_on_demand(jira, monkeypatch):
+    requested = search_pages(jira, monkeypatch, total=4, page_sizes=[2, 2])
+
+    issues = jira.search_issues(jql="project = TGS", page_size=2, prefetch=False)
+    assert [next(issues).key, next(issues).key] == ["TGS-0", "TGS-1"]
+    assert requested == [0]
+    assert [issue.key for issue in issues] == ["TGS-2", "TGS-3"]
+    assert requested == [0, 2]
+
+
+def test_project_key_defaults_to_the_configured_project(jira):
+    assert jira.project_key == "TGS"
+    assert Jira(project_key="API").project_key == "API"
+
+
+class FakeTransport:
+    """
+    Stands for transport.request, answering each endpoint with the next of its responses.
+    """
+
+    def __init__(self, responses):
+        self.responses = {endpoint: list(values) for endpoint, values in responses.items()}
+        self.requests = []
+
+    def __call__(self, method, url, upstream, endpoint, **kwargs):
+        self.requests.append((method, endpoint, kwargs))
+        response = self.responses[endpoint].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def params(self, endpoint):
+        return [kwargs.get("params") for _, name, kwargs in self.requests if name == endpoint]
+
+
+def stub_transport(monkeypatch, responses):
+    fake = FakeTransport(responses)
+    monkeypatch.setattr(transport, "request", fake)
+    return fake
+
+
+def test_issue_reads_request_the_default_fields(jira, monkeypatch):
+    fake = stub_transport(monkeypatch, {"issue": [FakeResponse({"key": "TGS-1"})] * 2})
+
+    jira.get_issue_data("TGS-1")
+    jira.get_issue_data("TGS-1", fields=("*all",), expand="renderedFields")
+
+    assert DEFAULT_ISSUE_FIELDS == ("summary", "status", "assignee", "labels")
+    assert fake.params("issue") == [
+        {"fields": "summary,status,assignee,labels"},
+        {"fields": "*all", "expand": "renderedFields"},
+    ]
+
+
+def test_prepare_requests_a_single_board_project_and_issue_type(jira, monkeypatch):
+    fake = stub_transport(
+        monkeypatch,
+        {
+            "board": [FakeResponse({"values": [{"id": 1, "name": "Board", "type": "scrum"}]})],
+            "board_project": [FakeResponse({"values": [{"id": "10", "key": "TGS", "name": "T"}]})],
+            "createmeta": [
+                FakeResponse(
+                    {"projects": [{"issuetypes": [{"id": "3", "name": "Bug", "fields": {}}]}]}
+                )
+            ],
+        },
+    )
+
+    jira.prepare_jira()
+
+    assert fake.params("board") == [{"projectKeyOrId": "TGS", "maxResults": 1}]
+    assert fake.params("board_project") == [{"projectKeyOrId": "TGS", "maxResults": 1}]
+    assert fake.params("createmeta") == [{"projectKeys": "TGS", "issuetypeNames": "Bug"}]
+    # Only the fields the models declare are kept
+    assert jira.board.to_dict() == {"id": 1, "name": "Board"}
+    assert jira.default_issue_type.to_dict() == {"id": "3", "name": "Bug"}
+
+
+def test_models_round_trip_their_state():
+    issue = Issue.from_dict({"id": "1", "key": "TGS-1", "fields": {"summary": "s"}, "self": "url"})
+
+    assert issue.__getstate__() == ("1", "TGS-1", {"summary": "s"})
+    copy = Issue.__new__(Issue)
+    copy.__setstate__(issue.__getstate__())
+    assert copy == issue
+    assert pickle.loads(pickle.dumps(issue)) == issue
+    assert pickle.loads(pickle.dumps([Sprint(id=7, name="S", state="active")])) == [
+        Sprint(id=7, name="S", state="active")
+    ]
+
+
+def test_models_compare_by_type_and_fields():
+    assert Board(id=1, name="B") == Board.from_dict({"id": 1, "name": "B", "type": "scrum"})
+    assert Board(id=1, name="B") != Board(id=2, name="B")
+    # Same fields, different model
+    assert Board(id=1, name="B") != IssueType(id=1, name="B")
+    with pytest.raises(TypeError):
+        hash(Board(id=1, name="B"))
+
+
+def respond(data=None, status_code=200):
+    response = FakeResponse(data)
+    response.status_code = status_code
+    return response
+
+
+def new_issue_responses(moves):
+    return {
+        "board_sprint": [respond({"values": [{"id": 7, "name": "Sprint 7", "state": "active"}]})],
+        "issue_create": [respond({"id": "100", "key": "TGS-100"}, status_code=201)],
+        "sprint_issue": moves,
+        "user_assignable": [respond([{"accountId": "ada"}])],
+        "issue_assignee": [respond(status_code=204)],
+    }
+
+
+def test_new_issue_resumes_from_its_journal(jira, monkeypatch, tmp_path):
+    fake = stub_transport(
+        monkeypatch,
+        new_issue_responses(moves=[respond(status_code=503), respond(status_code=204)]),
+    )
+    journal = Journal.for_key("delivery-1", directory=tmp_path / "journals")
+
+    with pytest.raises(JiraException):
+        jira.new_issue(title="Bug", content="It broke", journal=journal)
+    assert journal.steps == {"sprint": 7, "created": "TGS-100"}
+
+    resumed = Journal.for_key("delivery-1", directory=tmp_path / "journals")
+    assert jira.new_issue(title="Bug", content="It broke", journal=resumed) == "TGS-100"
+
+    endpoints = [endpoint for _, endpoint, _ in fake.requests]
+    assert endpoints == [
+        "board_sprint",
+        "issue_create",
+        "sprint_issue",
+        # Resumed: the sprint and the issue are not requested again
+        "sprint_issue",
+        "user_assignable",
+        "issue_assignee",
+    ]
+    assert fake.requests[3][2]["json"] == {"issues": ["TGS-100"]}
+    assert not resumed.path.exists()
+
+
+def test_forks_share_the_metadata_but_not_the_issue(jira):
+    jira.project = Project(id="10", key="TGS", name="T")
+    jira.issue = Issue(key="TGS-1")
+
+    forked = jira.fork()
+    forked.issue.key = "TGS-2"
+
+    assert forked.project is jira.project
+    assert forked.config is jira.config
+    assert jira.issue.key == "TGS-1"
+    assert forked.sprint is not jira.sprint
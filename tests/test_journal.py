@@ -0,0 +1,35 @@
+from gitssues.journal import DEFAULT_DIRECTORY, Journal, journal_directory, pending_journals
+
+
+def test_journal_survives_reload(tmp_path):
+    journal = Journal.for_key("delivery/1", directory=tmp_path)
+    journal.record("sprint", 7)
+    journal.record("created", "TGS-1")
+
+    reloaded = Journal.for_key("delivery/1", directory=tmp_path)
+    assert "created" in reloaded
+    assert "moved" not in reloaded
+    assert reloaded.get("sprint") == 7
+    assert [j.path.stem for j in pending_journals(directory=tmp_path)] == ["delivery_1"]
+
+    reloaded.complete()
+    assert list(pending_journals(directory=tmp_path)) == []
+
+
+def test_abandon_compensates(tmp_path):
+    deleted = []
+    journal = Journal.for_key("delivery-2", directory=tmp_path)
+    journal.record("created", "TGS-2")
+
+    journal.abandon(compensate=lambda steps: deleted.append(steps["created"]))
+
+    assert deleted == ["TGS-2"]
+    assert not journal.path.exists()
+
+
+def test_journal_directory_is_configurable(monkeypatch):
+    monkeypatch.delenv("GITSSUES_JOURNAL_DIR", raising=False)
+    assert journal_directory() == DEFAULT_DIRECTORY
+
+    monkeypatch.setenv("GITSSUES_JOURNAL_DIR", "/var/lib/gitssues/journals")
+    assert journal_directory() == "/var/lib/gitssues/journals"
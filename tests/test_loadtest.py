@@ -0,0 +1,54 @@
+import gzip
+import hmac
+
+import pytest
+
+from gitssues.loadtest import arrival_offsets
+from gitssues.recording import REDACTED, Recorder, iter_recording, sign
+
+
+def test_recording_round_trip_is_redacted(tmp_path):
+    path = tmp_path / "deliveries.jsonl.gz"
+    recorder = Recorder(path)
+    headers = {
+        "X-GitHub-Event": "issues",
+        "X-GitHub-Delivery": "abc-123",
+        "X-Hub-Signature": "sha1=deadbeef",
+        "Authorization": "token ghp_secret",
+    }
+    recorder.record(headers, b'{"action": "opened", "installation": {"access_token": "ghs_1"}}')
+    recorder.record(headers, b"not json")
+    recorder.record(headers, b'{"action": "closed"}')
+    # A crash in the middle of the last delivery
+    member = gzip.compress(b'{"time": 1, "headers": {}, "body": "{}"}\n')
+    with open(path, "ab") as f:
+        f.write(member[: len(member) // 2])
+
+    deliveries = list(iter_recording(path))
+
+    assert [d["headers"] for d in deliveries] == [
+        {"X-GitHub-Event": "issues", "X-GitHub-Delivery": "abc-123"}
+    ] * 2
+    assert deliveries[0]["body"] == (
+        f'{{"action": "opened", "installation": {{"access_token": "{REDACTED}"}}}}'
+    )
+
+
+def test_sign_matches_the_server_check():
+    signature = sign(b'{"action": "opened"}', "secret")
+
+    mac = hmac.new(b"secret", msg=b'{"action": "opened"}', digestmod="sha1")
+    assert signature == f"sha1={mac.hexdigest()}"
+
+
+def test_arrival_offsets():
+    assert arrival_offsets(3, rate=2) == [0, 0.5, 1.0]
+    assert arrival_offsets(3, rate=None, arrival="recorded", recorded_times=[10, 11, 15]) == [0, 1, 5]
+    assert arrival_offsets(3, rate=1, arrival="recorded", recorded_times=[10, 11, 14]) == [0, 0.5, 2]
+
+    poisson = arrival_offsets(1000, rate=100, arrival="poisson", seed=1)
+    assert poisson == sorted(poisson)
+    assert 8 < poisson[-1] < 12
+
+    with pytest.raises(ValueError):
+        arrival_offsets(1, rate=1, arrival="burst")
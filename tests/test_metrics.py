@@ -0,0 +1,34 @@
+from gitssues.metrics import Registry
+
+
+def test_histogram_render():
+    registry = Registry()
+    histogram = registry.histogram(
+        "test_duration_seconds", "Test durations.", labelnames=("endpoint",), buckets=(0.1, 1)
+    )
+    child = histogram.labels("issue")
+    child.observe(0.05)
+    child.observe(0.1)
+    child.observe(5)
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE test_duration_seconds histogram" in lines
+    assert 'test_duration_seconds_bucket{endpoint="issue",le="0.1"} 2' in lines
+    assert 'test_duration_seconds_bucket{endpoint="issue",le="1"} 2' in lines
+    assert 'test_duration_seconds_bucket{endpoint="issue",le="+Inf"} 3' in lines
+    assert 'test_duration_seconds_count{endpoint="issue"} 3' in lines
+    assert histogram.labels("issue") is child
+
+
+def test_counter_and_gauge():
+    registry = Registry()
+    counter = registry.counter("test_total", "Test counter.", labelnames=("cache",))
+    counter.labels("adf").inc()
+    counter.labels("adf").inc(2)
+    registry.gauge("test_pending", "Test gauge.").set_function(lambda: 7)
+
+    output = registry.render()
+
+    assert 'test_total{cache="adf"} 3' in output
+    assert "test_pending 7" in output
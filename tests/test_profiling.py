@@ -0,0 +1,43 @@
+import time
+
+from gitssues.profiling import Profiler
+
+
+def slow_handler():
+    time.sleep(0.1)
+
+
+def test_only_slow_requests_are_written(tmp_path):
+    profiler = Profiler(directory=tmp_path, threshold=0.05, interval=0.005)
+
+    with profiler.profile("fast-delivery"):
+        pass
+    with profiler.profile("slow/delivery"):
+        slow_handler()
+
+    [path] = tmp_path.iterdir()
+    assert path.name.endswith(".folded")
+    assert "slow_delivery" in path.name
+    stacks = path.read_text().splitlines()
+    assert any("slow_handler" in stack for stack in stacks)
+    assert all(stack.rsplit(" ", 1)[1].isdigit() for stack in stacks)
+
+
+def test_oldest_profiles_are_deleted_beyond_max_bytes(tmp_path):
+    for i in range(3):
+        (tmp_path / f"{i}.folded").write_text("x" * 100)
+        time.sleep(0.01)
+    profiler = Profiler(directory=tmp_path, max_bytes=250)
+
+    profiler._enforce_max_bytes()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["1.folded", "2.folded"]
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    profiler = Profiler(directory=tmp_path, threshold=0, enabled=False)
+
+    with profiler.profile("delivery"):
+        slow_handler()
+
+    assert not tmp_path.exists() or not any(tmp_path.iterdir())
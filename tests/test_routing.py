@@ -0,0 +1,65 @@
+from gitssues.routing import JiraContexts, Router
+
+
+def test_router_precedence():
+    router = Router(
+        routes=[
+            {"repo": "o/api", "labels": ["bug"], "project_key": "API"},
+            {"repo": "o/api", "project_key": "APIX"},
+            {"labels": ["security"], "project_key": "SEC"},
+        ],
+        default_project_key="TGS",
+    )
+
+    assert router.resolve("o/api", ["bug"]) == "API"
+    assert router.resolve("o/api", ["docs"]) == "APIX"
+    assert router.resolve("o/api", ["security"]) == "APIX"
+    assert router.resolve("o/web", ["security"]) == "SEC"
+    assert router.resolve("o/web", []) == "TGS"
+
+
+def test_catch_all_route_comes_before_the_default():
+    router = Router(
+        routes=[
+            {"labels": ["security"], "project_key": "SEC"},
+            {"project_key": "ALL"},
+        ],
+        default_project_key="TGS",
+    )
+
+    assert router.resolve("o/web", ["security"]) == "SEC"
+    assert router.resolve("o/web", ["docs"]) == "ALL"
+    assert router.resolve("o/web", []) == "ALL"
+
+
+class FakeJira:
+    def __init__(self, project_key):
+        self.project_key = project_key
+        self.is_prepared = True
+
+
+def test_contexts_evict_least_recently_used(tmp_path):
+    contexts = JiraContexts(factory=FakeJira, max_size=2, snapshot_dir=tmp_path)
+
+    a = contexts._get_warm_state("A")
+    b = contexts._get_warm_state("B")
+    assert contexts._get_warm_state("A") is a
+    contexts._get_warm_state("C")
+
+    assert len(contexts) == 2
+    assert list(contexts._contexts) == ["A", "C"]
+    assert b._stopped.is_set()
+    contexts.clear()
+
+
+def test_contexts_are_refreshed_from_creation(tmp_path):
+    router = Router(routes=[{"repo": "o/api", "project_key": "API"}], default_project_key="TGS")
+    contexts = JiraContexts(factory=FakeJira, snapshot_dir=tmp_path)
+
+    contexts.warm(router.project_keys())
+
+    assert sorted(contexts._contexts) == ["API", "TGS"]
+    warm_states = list(contexts._contexts.values())
+    assert all(warm_state._refresher.is_alive() for warm_state in warm_states)
+    contexts.clear()
+    assert all(warm_state._stopped.is_set() for warm_state in warm_states)
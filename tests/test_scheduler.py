@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from gitssues.scheduler import COMMENT, CREATE, TRANSITION, FairQueue, Scheduler, Task
+
+
+def task(lane, repo, name, enqueued_at=0.0):
+    return Task(lane, repo, function=name, enqueued_at=enqueued_at)
+
+
+def drain(queue, lanes=(CREATE, TRANSITION, COMMENT), now=0.0):
+    names = []
+    while (next_task := queue.pop(lanes, now=now)) is not None:
+        names.append(next_task.function)
+    return names
+
+
+def test_higher_lanes_go_first():
+    queue = FairQueue()
+    queue.push(task(COMMENT, "noisy/repo", "comment"))
+    queue.push(task(TRANSITION, "noisy/repo", "close"))
+    queue.push(task(CREATE, "quiet/repo", "create"))
+
+    assert drain(queue, lanes=(TRANSITION, COMMENT)) == ["close", "comment"]
+    assert drain(queue) == ["create"]
+
+
+def test_repos_share_a_lane_by_weight():
+    queue = FairQueue(weights={"heavy/repo": 2})
+    for i in range(4):
+        queue.push(task(COMMENT, "noisy/repo", f"noisy-{i}"))
+    for i in range(4):
+        queue.push(task(COMMENT, "heavy/repo", f"heavy-{i}"))
+    queue.push(task(COMMENT, "quiet/repo", "quiet-0"))
+
+    assert drain(queue) == [
+        "heavy-0", "noisy-0", "heavy-1", "quiet-0", "heavy-2", "noisy-1", "heavy-3", "noisy-2", "noisy-3"
+    ]
+    assert len(queue) == 0
+
+
+def test_overdue_work_runs_ahead_of_higher_lanes():
+    queue = FairQueue(deadlines={COMMENT: 60})
+    queue.push(task(COMMENT, "noisy/repo", "old comment", enqueued_at=0))
+    queue.push(task(CREATE, "quiet/repo", "create", enqueued_at=50))
+
+    overdue = queue.pop(now=61)
+    assert (overdue.function, overdue.late) == ("old comment", True)
+    assert drain(queue, now=61) == ["create"]
+
+
+def test_scheduler_runs_and_drains():
+    done = []
+    lock = threading.Lock()
+    scheduler = Scheduler(lanes={CREATE: {"concurrency": 2}})
+
+    def work(name):
+        with lock:
+            done.append(name)
+
+    for i in range(10):
+        scheduler.submit(COMMENT, "owner/repo", work, f"comment-{i}")
+    scheduler.submit(CREATE, "owner/repo", work, "create")
+    scheduler.submit(CREATE, "owner/repo", lambda: 1 / 0)
+
+    assert scheduler.drain(timeout=5)
+    assert sorted(done) == sorted(["create"] + [f"comment-{i}" for i in range(10)])
+    assert scheduler.failed[CREATE] == 1
+
+
+def test_submit_returns_the_result():
+    scheduler = Scheduler()
+
+    assert scheduler.submit(CREATE, "owner/repo", lambda a, b: a + b, 1, 2).result(timeout=5) == 3
+    with pytest.raises(ZeroDivisionError):
+        scheduler.submit(CREATE, "owner/repo", lambda: 1 / 0).result(timeout=5)
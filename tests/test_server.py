@@ -0,0 +1,193 @@
+import json
+import time
+
+import pytest
+
+from gitssues import server
+from gitssues.jira.exc import JiraException
+from gitssues.profiling import Profiler
+from gitssues.recording import sign
+from gitssues.state import MemoryState
+
+
+SECRET = "secret"
+ISSUE_URL = "https://api.github.com/repos/o/r/issues/1"
+
+
+class FakeJira:
+    """
+    Stands for the prepared Jira context of a project, failing the first creations asked to.
+    """
+
+    def __init__(self, failures=0, delay=0):
+        self.failures = failures
+        self.delay = delay
+        self.journals = []
+        self.calls = []
+
+    def fork(self):
+        return self
+
+    def new_issue(self, title, content, mirror_assets, journal):
+        self.journals.append(journal)
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise JiraException("Error while moving issue to sprint: 503")
+        return "TGS-1"
+
+    def find_issue_key(self, text):
+        return "TGS-1"
+
+    def add_comment_to_issue(self, issue_key, comment):
+        self.calls.append(("comment", issue_key, comment))
+
+    def get_issue_transitions(self, issue_key):
+        return {"transitions": [{"id": "31", "name": "Done"}]}
+
+    def get_transition(self, transitions_data, transition_name):
+        for transition in transitions_data["transitions"]:
+            if transition["name"] == transition_name:
+                return transition
+        return None
+
+    def set_issue_transition(self, issue_key, transition):
+        self.calls.append(("transition", issue_key, transition["id"]))
+
+
+class FakeContexts:
+    def __init__(self, jira):
+        self.jira = jira
+
+    def get(self, project_key):
+        return self.jira
+
+
+def issue_payload(action="opened"):
+    return {
+        "action": action,
+        "repository": {"full_name": "o/r"},
+        "sender": {"login": "octocat"},
+        "issue": {
+            "number": 1,
+            "title": "It broke",
+            "url": ISSUE_URL,
+            "user": {"login": "octocat"},
+            "labels": [],
+            "body": "Steps",
+        },
+    }
+
+
+@pytest.fixture
+def jira(monkeypatch, tmp_path):
+    jira = FakeJira()
+    monkeypatch.setattr(server, "GITHUB_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(server, "JOURNAL_DIR", tmp_path / "journals")
+    monkeypatch.setattr(server, "state", MemoryState())
+    monkeypatch.setattr(server, "contexts", FakeContexts(jira))
+    return jira
+
+
+def post(payload, delivery_id, event="issues"):
+    data = json.dumps(payload).encode()
+    headers = {
+        "X-GitHub-Event": event,
+        "X-GitHub-Delivery": delivery_id,
+        "X-Hub-Signature": sign(data, SECRET),
+        "Content-Type": "application/json",
+    }
+    return server.app.test_client().post("/github", data=data, headers=headers)
+
+
+def test_deliveries_are_answered_once_the_issue_is_created(jira):
+    response = post(issue_payload(), "delivery-1")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"Status": "New Issue Created", "issue_key": "TGS-1"}
+    assert server.state.get(server.issue_key_state_key(ISSUE_URL)) == "TGS-1"
+    assert server.state.get("delivery:delivery-1")["status"] == "done"
+
+
+def test_deliveries_are_profiled_where_their_work_runs(jira, monkeypatch, tmp_path):
+    jira.delay = 0.05
+    profiler = Profiler(directory=tmp_path, threshold=0, interval=0.001)
+    monkeypatch.setattr(server, "profiler", profiler)
+
+    assert post(issue_payload(), "delivery-8").status_code == 200
+
+    [path] = tmp_path.glob("*.folded")
+    assert "delivery-8" in path.name
+    # Sampled on the scheduler worker, not on the request waiting for it
+    assert any("new_issue" in stack for stack in path.read_text().splitlines())
+
+
+def test_failed_deliveries_are_resumed_when_redelivered(jira):
+    jira.failures = 1
+
+    assert post(issue_payload(), "delivery-2").status_code == 500
+    assert server.state.get("delivery:delivery-2")["status"] == "failed"
+
+    # GitHub redeliveries keep the delivery id, and so the journal of the creation
+    assert post(issue_payload(), "delivery-2").status_code == 200
+    assert server.state.get("delivery:delivery-2")["status"] == "done"
+    assert [journal.path.name for journal in jira.journals] == ["delivery-2.json"] * 2
+
+
+def test_closed_issues_are_left_alone_by_default(jira, monkeypatch):
+    monkeypatch.delitem(server.config.data, "close_transition", raising=False)
+
+    response = post(issue_payload("closed"), "delivery-3")
+
+    assert response.get_json() == {"Status": "Closed issues are not mirrored"}
+    assert jira.calls == []
+
+
+@pytest.mark.parametrize("transition_name, transitioned", [("Done", True), ("Shipped", False)])
+def test_closed_issues_are_commented_and_transitioned(jira, monkeypatch, transition_name, transitioned):
+    monkeypatch.setitem(server.config.data, "close_transition", transition_name)
+
+    response = post(issue_payload("closed"), "delivery-4")
+
+    assert response.get_json() == {"Status": "Closed issue"}
+    expected = [("comment", "TGS-1", "Closed by octocat on GitHub.")]
+    if transitioned:
+        expected.append(("transition", "TGS-1", "31"))
+    assert jira.calls == expected
+
+
+def test_handled_deliveries_are_not_handled_again(jira):
+    assert post(issue_payload(), "delivery-5").status_code == 200
+
+    response = post(issue_payload(), "delivery-5")
+
+    assert response.get_json() == {"Status": "Delivery already handled"}
+    assert len(jira.journals) == 1
+
+
+def test_running_deliveries_are_claimed_again_once_lost(jira, monkeypatch):
+    started = time.time()
+    server.state.set("delivery:delivery-6", {"status": "running", "at": started})
+
+    # Another worker is on it
+    response = post(issue_payload(), "delivery-6")
+    assert response.get_json() == {"Status": "Delivery already handled"}
+    assert jira.journals == []
+
+    # Its worker died
+    monkeypatch.setattr(time, "time", lambda: started + server.CLAIM_TIMEOUT)
+    assert post(issue_payload(), "delivery-6").status_code == 200
+    assert len(jira.journals) == 1
+
+
+def test_claims(jira):
+    assert server.claim_delivery("delivery-7")
+    assert not server.claim_delivery("delivery-7")
+
+    server.finish_delivery("delivery-7", failed=True)
+    assert server.state.get("delivery:delivery-7")["status"] == "failed"
+    assert server.claim_delivery("delivery-7")
+
+    server.finish_delivery("delivery-7")
+    assert server.state.get("delivery:delivery-7")["status"] == "done"
+    assert not server.claim_delivery("delivery-7")
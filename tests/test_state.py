@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from gitssues.state import MemoryState, RedisState, SQLiteState, from_url
+from gitssues.warm import WarmState
+
+from .test_warm import FakeJira
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def state(request, tmp_path):
+    if request.param == "memory":
+        return MemoryState()
+    if request.param == "sqlite":
+        return SQLiteState(path=tmp_path / "state.db")
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisState(client=fakeredis.FakeRedis())
+
+
+def test_get_set_and_delete(state):
+    assert state.get("key") is None
+
+    state.set("key", {"issue": "TGS-1", "labels": ["bug"]})
+    assert state.get("key") == {"issue": "TGS-1", "labels": ["bug"]}
+
+    state.delete("key")
+    assert state.get("key") is None
+
+
+def test_entries_expire(state):
+    state.set("key", "value", ttl=0.05)
+    assert state.get("key") == "value"
+
+    time.sleep(0.1)
+    assert state.get("key") is None
+    assert state.compare_and_set("key", None, "other")
+
+
+def test_compare_and_set(state):
+    assert state.compare_and_set("key", None, {"status": "running", "at": 1.5})
+    assert not state.compare_and_set("key", None, {"status": "running", "at": 2.5})
+
+    assert not state.compare_and_set("key", {"status": "failed", "at": 1.5}, "done")
+    assert state.compare_and_set("key", {"at": 1.5, "status": "running"}, "done")
+    assert state.get("key") == "done"
+
+    assert state.compare_and_set("key", "done", None)
+    assert state.get("key") is None
+
+
+def test_compare_and_set_is_atomic(state):
+    state.set("counter", 0)
+
+    def increment():
+        for _ in range(50):
+            while True:
+                current = state.get("counter")
+                if state.compare_and_set("counter", current, current + 1):
+                    break
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state.get("counter") == 200
+
+
+def test_sqlite_is_shared_by_connections(tmp_path):
+    first = from_url(f"sqlite://{tmp_path / 'state.db'}")
+    second = from_url(f"sqlite://{tmp_path / 'state.db'}")
+
+    assert first.compare_and_set("delivery:1", None, "running")
+    assert not second.compare_and_set("delivery:1", None, "running")
+    assert second.get("delivery:1") == "running"
+
+
+def test_workers_share_the_snapshot_through_the_state(tmp_path):
+    state = SQLiteState(path=tmp_path / "state.db")
+    first, second = FakeJira(), FakeJira()
+
+    # Each host has its own disk, the snapshot is only in the state
+    first_state = WarmState(first, path=tmp_path / "first" / "snapshot.json", state=state)
+    first_state.ensure_ready()
+    first_state.stop()
+    assert not (tmp_path / "first").exists()
+
+    warm_state = WarmState(second, path=tmp_path / "second" / "snapshot.json", state=state)
+    assert warm_state.load()
+    assert second.snapshot == {"project": {"id": "1"}}
+    assert not warm_state.refresh()
+    assert (first.prepares, second.prepares) == (1, 0)
+
+
+def test_old_snapshots_are_kept_until_refreshed(monkeypatch):
+    state = MemoryState()
+    warm_state = WarmState(FakeJira(), path="snapshot.json", refresh_interval=60, state=state)
+    assert warm_state.refresh()
+
+    # Long past the refresh interval, e.g. while Jira was down
+    now = time.time() + 3600
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    jira = FakeJira()
+    assert WarmState(jira, path="snapshot.json", state=state).load()
+    assert jira.snapshot == {"project": {"id": "1"}}
+    assert warm_state.refresh()
+    assert state.get("snapshot:snapshot.json")["written_at"] == now
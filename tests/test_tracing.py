@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from gitssues import tracing
+
+
+def test_spans_nest_under_the_trace(tmp_path):
+    exporter = tracing.FileExporter(tmp_path / "traces.jsonl")
+
+    with tracing.trace("webhook issues.opened", exporter=exporter, delivery="abc-123"):
+        with tracing.span("new_issue"):
+            span = tracing.start_span("POST jira.issue_create")
+            tracing.finish_span(span, status=201)
+        with pytest.raises(ValueError):
+            with tracing.span("new_issue.assign"):
+                raise ValueError("no users")
+
+    assert tracing.current_span() is None
+    [line] = (tmp_path / "traces.jsonl").read_text().splitlines()
+    spans = {span["name"]: span for span in json.loads(line)}
+
+    root = spans["webhook issues.opened"]
+    assert "parentId" not in root
+    assert root["tags"] == {"delivery": "abc-123"}
+    assert spans["new_issue"]["parentId"] == root["id"]
+    assert spans["POST jira.issue_create"]["parentId"] == spans["new_issue"]["id"]
+    assert spans["POST jira.issue_create"]["tags"]["status"] == "201"
+    assert spans["new_issue.assign"]["tags"]["error"] == "ValueError('no users')"
+    assert len({span["traceId"] for span in spans.values()}) == 1
+
+
+def test_spans_outside_of_a_trace_are_no_ops():
+    with tracing.trace("webhook", exporter=None):
+        with tracing.span("new_issue") as span:
+            assert span is None
+    assert tracing.start_span("GET jira.board") is None
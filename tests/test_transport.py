@@ -0,0 +1,49 @@
+import json
+
+import pytest
+import requests
+
+from gitssues import tracing, transport
+
+
+class FailingHook(transport.RequestHook):
+    def before_send(self, request):
+        raise RuntimeError("no token")
+
+
+def traced_spans(tmp_path, call):
+    exporter = tracing.FileExporter(tmp_path / "traces.jsonl")
+    with tracing.trace("webhook", exporter=exporter) as root:
+        with pytest.raises(Exception) as error:
+            call()
+        # The span of the call was finished, its parent is current again
+        assert tracing.current_span() is root
+    [line] = (tmp_path / "traces.jsonl").read_text().splitlines()
+    return error.value, {span["name"]: span for span in json.loads(line)}
+
+
+def test_spans_are_finished_when_a_hook_fails(tmp_path):
+    hook = FailingHook()
+    transport.add_hook(hook)
+    try:
+        error, spans = traced_spans(
+            tmp_path, lambda: transport.request("GET", "https://jira", "jira", "board")
+        )
+    finally:
+        transport.remove_hook(hook)
+
+    assert isinstance(error, RuntimeError)
+    assert spans["GET jira.board"]["tags"]["error"] == "RuntimeError('no token')"
+
+
+def test_spans_are_finished_on_any_error(tmp_path, monkeypatch):
+    def request(method, url, **kwargs):
+        raise ValueError("Invalid URL")
+
+    monkeypatch.setattr(requests, "request", request)
+    error, spans = traced_spans(
+        tmp_path, lambda: transport.request("GET", "https://jira", "jira", "board")
+    )
+
+    assert isinstance(error, ValueError)
+    assert spans["GET jira.board"]["tags"]["error"] == "ValueError('Invalid URL')"
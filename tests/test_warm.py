@@ -0,0 +1,66 @@
+from gitssues.warm import WarmState, snapshot_directory
+
+
+class FakeJira:
+    def __init__(self):
+        self.snapshot = None
+        self.prepares = 0
+
+    @property
+    def is_prepared(self):
+        return self.snapshot is not None
+
+    def prepare_jira(self):
+        self.prepares += 1
+        self.snapshot = {"project": {"id": "1"}}
+
+    def to_snapshot(self):
+        return self.snapshot
+
+    def load_snapshot(self, snapshot):
+        self.snapshot = snapshot
+
+
+def test_workers_share_the_snapshot(tmp_path):
+    path = tmp_path / "snapshot.json"
+    first, second = FakeJira(), FakeJira()
+
+    assert not WarmState(second, path=path).load()
+
+    WarmState(first, path=path).ensure_ready()
+    assert first.prepares == 1
+
+    assert WarmState(second, path=path).load()
+    assert second.snapshot == {"project": {"id": "1"}}
+    assert second.prepares == 0
+
+
+def test_fresh_snapshot_is_not_refreshed(tmp_path):
+    path = tmp_path / "snapshot.json"
+    jira = FakeJira()
+    state = WarmState(jira, path=path)
+
+    assert state.refresh()
+    assert not state.refresh()
+    assert jira.prepares == 1
+
+
+def test_snapshots_older_than_not_before_are_prepared_again(tmp_path):
+    path = tmp_path / "snapshot.json"
+    WarmState(FakeJira(), path=path).ensure_ready()
+
+    jira = FakeJira()
+    warm_state = WarmState(jira, path=path, not_before=path.stat().st_mtime + 1)
+    assert not warm_state.load()
+
+    warm_state.ensure_ready()
+    warm_state.stop()
+    assert jira.prepares == 1
+
+
+def test_snapshot_directory_is_configurable(monkeypatch):
+    monkeypatch.delenv("GITSSUES_SNAPSHOT_DIR", raising=False)
+    assert snapshot_directory() == "."
+
+    monkeypatch.setenv("GITSSUES_SNAPSHOT_DIR", "/var/lib/gitssues")
+    assert snapshot_directory() == "/var/lib/gitssues"
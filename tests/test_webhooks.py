@@ -0,0 +1,21 @@
+from gitssues.webhooks import EventRouter
+
+
+def test_event_router_dispatch():
+    events = EventRouter()
+
+    @events.register("issues", "opened")
+    def opened(body):
+        return "opened"
+
+    @events.register("ping")
+    def ping(body):
+        return "ping"
+
+    assert events.accepts("issues")
+    assert not events.accepts("push")
+    assert not events.accepts(None)
+    assert events.get_handler("issues", "opened") is opened
+    assert events.get_handler("issues", "labeled") is None
+    assert events.get_handler("ping") is ping
+    assert events.get_handler("ping", "anything") is ping
@@ -0,0 +1,157 @@
+import time
+
+import pytest
+import requests
+import yaml
+
+from gitssues.jira import workload
+from gitssues.jira.api import Jira
+from gitssues.jira.exc import JiraException
+from gitssues.jira.jira import Issue
+from gitssues.jira.workload import WorkloadIndex
+
+from .test_config import CONFIG
+from .test_jira import new_issue_responses, respond, stub_transport
+
+
+class FakeJira:
+    project_key = "TGS"
+
+    def __init__(self, users, issues):
+        self.users = users
+        self.issues = issues
+        self.searches = []
+
+    def get_assignable_users_for_project_data(self, project_key, start_at, max_results):
+        return [{"accountId": user} for user in self.users[start_at : start_at + max_results]]
+
+    def search_issues(self, jql, fields):
+        self.searches.append(jql)
+        for key, (assignee, status) in self.issues.items():
+            yield Issue(
+                key=key,
+                fields={
+                    "assignee": {"accountId": assignee} if assignee else None,
+                    "status": {"statusCategory": {"key": status}},
+                },
+            )
+
+
+def test_new_issues_go_to_the_least_loaded_user():
+    index = WorkloadIndex(project_key="TGS")
+    jira = FakeJira(
+        users=["ada", "bob", "eve"],
+        issues={"TGS-1": ("ada", "new"), "TGS-2": ("ada", "new"), "TGS-3": ("bob", "new")},
+    )
+    index.sync(jira)
+
+    picked = [index.assign_least_loaded(f"TGS-{n}") for n in range(4, 9)]
+
+    assert picked == ["eve", "bob", "eve", "ada", "bob"]
+    assert [index.load(user) for user in ("ada", "bob", "eve")] == [3, 3, 2]
+    assert len(jira.searches) == 1
+
+
+def test_closed_and_reassigned_issues_are_applied():
+    index = WorkloadIndex(project_key="TGS")
+    index.sync(FakeJira(users=["ada", "bob"], issues={"TGS-1": ("ada", "new")}))
+
+    index.close("TGS-1")
+    index.assign("TGS-2", "ada")
+    index.assign("TGS-2", "bob")
+    assert (index.load("ada"), index.load("bob")) == (0, 1)
+    assert index.least_loaded() == "ada"
+
+
+def test_refresh_applies_the_changes_made_in_jira():
+    index = WorkloadIndex(project_key="TGS", refresh_interval=0)
+    index.sync(FakeJira(users=["ada", "bob"], issues={"TGS-1": ("ada", "new")}))
+    index.synced_at = time.time() - 590
+
+    jira = FakeJira(
+        users=["ada", "bob", "eve"],
+        issues={"TGS-1": ("ada", "done"), "TGS-2": ("bob", "indeterminate")},
+    )
+    index.sync(jira)
+
+    assert [index.load(user) for user in ("ada", "bob", "eve")] == [0, 1, 0]
+    assert jira.searches == ['project = TGS AND updated >= "-11m"']
+    assert index.least_loaded() in ("ada", "eve")
+
+
+@pytest.fixture
+def jira(tmp_path, monkeypatch):
+    (tmp_path / "gitssues.yml").write_text(yaml.safe_dump(dict(CONFIG, assignment="workload")))
+    monkeypatch.chdir(tmp_path)
+    # Indexes are shared by the whole process
+    monkeypatch.setattr(workload, "_indexes", {})
+    return Jira()
+
+
+def search_page(issues):
+    return respond(
+        {
+            "startAt": 0,
+            "total": len(issues),
+            "issues": [
+                {"id": key, "key": key, "fields": {"assignee": {"accountId": assignee}}}
+                for key, assignee in issues.items()
+            ],
+        }
+    )
+
+
+def workload_responses(assigned):
+    responses = new_issue_responses(moves=[respond(status_code=204)])
+    responses["user_assignable"] = [respond([{"accountId": "ada"}, {"accountId": "bob"}])]
+    responses["search"] = [search_page({"TGS-1": "ada"})]
+    responses["issue_assignee"] = [assigned]
+    return responses
+
+
+def test_new_issues_are_assigned_from_the_index(jira, monkeypatch):
+    fake = stub_transport(monkeypatch, workload_responses(assigned=respond(status_code=204)))
+
+    assert jira.new_issue(title="Bug", content="It broke") == "TGS-100"
+
+    assert fake.requests[-1][2]["json"] == {"accountId": "bob"}
+    assert fake.params("user_assignable") == [{"project": "TGS", "startAt": 0, "maxResults": 1000}]
+    assert (jira.workload.load("ada"), jira.workload.load("bob")) == (1, 1)
+
+
+@pytest.mark.parametrize(
+    "assigned, error",
+    [
+        (respond(status_code=400), JiraException),
+        (requests.ConnectionError("Connection reset"), requests.ConnectionError),
+    ],
+)
+def test_failed_assignments_are_rolled_back(jira, monkeypatch, assigned, error):
+    stub_transport(monkeypatch, workload_responses(assigned=assigned))
+
+    with pytest.raises(error):
+        jira.new_issue(title="Bug", content="It broke")
+
+    assert (jira.workload.load("ada"), jira.workload.load("bob")) == (1, 0)
+    assert len(jira.workload) == 1
+
+
+def test_done_transitions_and_deletions_close_issues(jira, monkeypatch):
+    stub_transport(
+        monkeypatch,
+        {
+            "issue_transition": [respond(status_code=204)] * 2,
+            "issue_delete": [respond(status_code=204)],
+        },
+    )
+    for issue_key in ("TGS-1", "TGS-2", "TGS-3"):
+        jira.workload.assign(issue_key, "ada")
+
+    in_progress = {"id": "21", "to": {"statusCategory": {"key": "indeterminate"}}}
+    jira.set_issue_transition("TGS-1", in_progress)
+    assert jira.workload.load("ada") == 3
+
+    jira.set_issue_transition("TGS-1", {"id": "31", "to": {"statusCategory": {"key": "done"}}})
+    jira.delete_issue("TGS-2")
+    assert jira.workload.load("ada") == 1
+    assert len(jira.workload) == 1